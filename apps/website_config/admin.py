@@ -1,7 +1,112 @@
-from django.contrib import admin
+import json
+
+from django.contrib import admin, messages
 from django.contrib.auth.models import User, Group
+from django.core.files.storage import default_storage
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.utils.functional import cached_property
 from django.utils.html import format_html
+from .exports import export_response, is_asgi
+from .images import smallest_variant
 from .models import MainCategory, SubCategory, ServiceDetails, Category, OurProject, WorkStep, YouTubeVideo, WhyChooseUs, ClientReview, CallbackRequest
+from .signals import content_changed
+
+
+def preview_url(image, variants):
+    """URL самого маленького варианта изображения, пока вариантов нет - оригинала"""
+    name = smallest_variant(variants)
+    return default_storage.url(name) if name else image.url
+
+
+def preview_img(image, variants, max_width, max_height):
+    """Миниатюра для списков: загружается браузером только при прокрутке до неё"""
+    return format_html(
+        '<img src="{}" loading="lazy" decoding="async" style="max-height: {}px; max-width: {}px;" />',
+        preview_url(image, variants), max_height, max_width,
+    )
+
+
+def estimated_count(queryset):
+    """Оценка числа строк PostgreSQL без COUNT(*) или None, если оценки нет.
+
+    Без фильтров - ``pg_class.reltuples`` (обновляется VACUUM/ANALYZE), с
+    фильтрами - число строк из плана запроса.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    if not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        # -1: таблица ещё не анализировалась
+        return int(row[0]) if row and row[0] >= 0 else None
+    plan = json.loads(queryset.explain(format='json'))
+    return plan[0]['Plan']['Plan Rows']
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор админки для больших таблиц: точный COUNT(*) только для небольших выборок.
+
+    Без фильтров используется оценка ``reltuples``. С фильтрами и поиском оценка
+    планировщика ошибается на порядки (``icontains``, неравномерные данные),
+    поэтому строки считаются точно, но не дальше ``exact_count_below``; оценка
+    плана - только для выборок больше порога и не меньше него.
+    """
+    exact_count_below = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset)
+            if estimate is None or estimate < self.exact_count_below:
+                return super().count
+            return estimate
+        # COUNT(*) по подзапросу с LIMIT: читается не больше порога + 1 строк
+        bounded = queryset.order_by()[:self.exact_count_below + 1].count()
+        if bounded <= self.exact_count_below:
+            return bounded
+        return max(estimated_count(queryset) or 0, bounded)
+
+
+def bulk_set(queryset, **values):
+    """Одним UPDATE изменить строки выборки, где значения ещё другие; возвращает число изменённых.
+
+    ``update()`` не отправляет post_save: об изменении модели сообщается один
+    раз (версии и кэш главной страницы), а не на каждую строку.
+    """
+    with transaction.atomic():
+        count = queryset.exclude(**values).update(**values)
+        if count:
+            content_changed(queryset.model)
+    return count
+
+
+class ExportActionsMixin:
+    """Потоковая выгрузка выбранных строк или всех результатов фильтра (exports.py)"""
+
+    @admin.action(description="Выгрузить в CSV")
+    def export_csv(self, request, queryset):
+        return export_response(queryset, 'csv', asynchronous=is_asgi(request))
+
+    @admin.action(description="Выгрузить в NDJSON")
+    def export_ndjson(self, request, queryset):
+        return export_response(queryset, 'ndjson', asynchronous=is_asgi(request))
+
+
+class LargeTableAdminMixin:
+    """Режим больших таблиц для списков админки.
+
+    Число строк для пагинации оценивается (``EstimatedCountPaginator``), общий
+    счётчик без фильтров и счётчики у фильтров (facets) не считаются.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
 
 
 class ServiceDetailsInline(admin.TabularInline):
@@ -16,7 +121,7 @@ class ServiceDetailsInline(admin.TabularInline):
     def image_preview(self, obj):
         """Предварительный просмотр изображения"""
         if obj.image:
-            return format_html('<img src="{}" style="max-height: 80px; max-width: 150px;" />', obj.image.url)
+            return preview_img(obj.image, obj.image_variants, 150, 80)
         return "Нет изображения"
     
     image_preview.short_description = "Предпросмотр"
@@ -42,26 +147,47 @@ class MainCategoryAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 
+@admin.register(Category)
+class ParentCategoryAdmin(admin.ModelAdmin):
+    """Поиск категорий для autocomplete поля parent (верхние уровни первыми); в меню админки не показывается.
+
+    Только просмотр: autocomplete нужен лишь view-доступ, а категории правятся
+    в MainCategoryAdmin / SubCategoryAdmin с их ограничениями полей.
+    """
+    search_fields = ('name',)
+    ordering = ('depth', 'name')
+
+    def has_module_permission(self, request):
+        return False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(SubCategory)
-class SubCategoryAdmin(admin.ModelAdmin):
+class SubCategoryAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """Админка для подкатегорий"""
-    list_display = ('name', 'parent', 'is_active', 'created_at')
-    list_filter = ('is_active', 'parent', 'created_at')
+    list_display = ('name', 'parent', 'depth', 'is_active', 'created_at')
+    list_filter = ('is_active', 'depth', ('parent', admin.RelatedOnlyFieldListFilter), 'created_at')
+    list_select_related = ('parent',)
     search_fields = ('name',)
     list_editable = ('is_active',)
     fields = ('name', 'parent', 'is_active')
+    # Поиск по мере ввода вместо списка всех категорий в <select>; родителем может быть
+    # и подкатегория (третий уровень), перенос в собственную ветку запрещает Category.clean()
+    autocomplete_fields = ('parent',)
     inlines = [ServiceDetailsInline]
 
     def get_queryset(self, request):
         """Показываем только подкатегории (с родителем)"""
         return super().get_queryset(request).filter(parent__isnull=False)
 
-    def formfield_for_foreignkey(self, db_field, request, **kwargs):
-        """При выборе родительской категории показываем только главные категории"""
-        if db_field.name == "parent":
-            kwargs["queryset"] = Category.objects.filter(parent__isnull=True)
-        return super().formfield_for_foreignkey(db_field, request, **kwargs)
-
 
 @admin.register(OurProject)
 class OurProjectAdmin(admin.ModelAdmin):
@@ -74,7 +200,7 @@ class OurProjectAdmin(admin.ModelAdmin):
     def image_preview(self, obj):
         """Предварительный просмотр изображения"""
         if obj.image:
-            return format_html('<img src="{}" style="max-height: 100px; max-width: 200px;" />', obj.image.url)
+            return preview_img(obj.image, obj.image_variants, 200, 100)
         return "Нет изображения"
     
     image_preview.short_description = "Предпросмотр"
@@ -93,7 +219,7 @@ class WorkStepAdmin(admin.ModelAdmin):
     def image_preview(self, obj):
         """Предварительный просмотр изображения"""
         if obj.image:
-            return format_html('<img src="{}" style="max-height: 100px; max-width: 200px;" />', obj.image.url)
+            return preview_img(obj.image, obj.image_variants, 200, 100)
         return "Нет изображения"
     
     image_preview.short_description = "Предпросмотр"
@@ -111,7 +237,7 @@ class YouTubeVideoAdmin(admin.ModelAdmin):
     def thumbnail_preview(self, obj):
         """Предварительный просмотр обложки"""
         if obj.thumbnail:
-            return format_html('<img src="{}" style="max-height: 100px; max-width: 200px;" />', obj.thumbnail.url)
+            return preview_img(obj.thumbnail, obj.thumbnail_variants, 200, 100)
         return "Нет обложки"
     
     thumbnail_preview.short_description = "Предпросмотр"
@@ -129,15 +255,27 @@ class WhyChooseUsAdmin(admin.ModelAdmin):
 
 
 @admin.register(ClientReview)
-class ClientReviewAdmin(admin.ModelAdmin):
+class ClientReviewAdmin(ExportActionsMixin, LargeTableAdminMixin, admin.ModelAdmin):
     """Админка для отзывов клиентов"""
     list_display = ('full_name', 'rating_stars', 'is_active', 'created_at')
     list_filter = ('is_active', 'rating', 'created_at')
+    date_hierarchy = 'created_at'
     search_fields = ('full_name', 'comment')
-    list_editable = ('is_active',)
+    # Модерация - действиями над выборкой (один UPDATE), а не list_editable построчно
+    actions = ('approve_reviews', 'reject_reviews', 'export_csv', 'export_ndjson')
     fields = ('full_name', 'comment', 'rating', 'is_active')
     readonly_fields = ('rating_stars',)
 
+    @admin.action(description="Опубликовать выбранные отзывы")
+    def approve_reviews(self, request, queryset):
+        count = bulk_set(queryset, is_active=True)
+        self.message_user(request, f"Опубликовано отзывов: {count}", messages.SUCCESS)
+
+    @admin.action(description="Снять выбранные отзывы с публикации")
+    def reject_reviews(self, request, queryset):
+        count = bulk_set(queryset, is_active=False)
+        self.message_user(request, f"Снято с публикации отзывов: {count}", messages.SUCCESS)
+
     def rating_stars(self, obj):
         """Показать рейтинг звездами"""
         stars = '⭐' * obj.rating
@@ -147,15 +285,26 @@ class ClientReviewAdmin(admin.ModelAdmin):
 
 
 @admin.register(CallbackRequest)
-class CallbackRequestAdmin(admin.ModelAdmin):
+class CallbackRequestAdmin(ExportActionsMixin, LargeTableAdminMixin, admin.ModelAdmin):
     """Админка для заявок на обратный звонок"""
     list_display = ('name', 'phone', 'is_processed', 'created_at')
     list_filter = ('is_processed', 'created_at')
+    date_hierarchy = 'created_at'
     search_fields = ('name', 'phone')
-    list_editable = ('is_processed',)
+    actions = ('mark_processed', 'mark_unprocessed', 'export_csv', 'export_ndjson')
     readonly_fields = ('created_at',)
     fields = ('name', 'phone', 'is_processed', 'created_at')
 
+    @admin.action(description="Отметить выбранные заявки обработанными")
+    def mark_processed(self, request, queryset):
+        count = bulk_set(queryset, is_processed=True)
+        self.message_user(request, f"Отмечено обработанными: {count}", messages.SUCCESS)
+
+    @admin.action(description="Вернуть выбранные заявки в необработанные")
+    def mark_unprocessed(self, request, queryset):
+        count = bulk_set(queryset, is_processed=False)
+        self.message_user(request, f"Возвращено в необработанные: {count}", messages.SUCCESS)
+
 
 # Unregister default User and Group models
 try:
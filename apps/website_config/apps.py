@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class WebsiteConfigConfig(AppConfig):
     name = 'apps.website_config'
-    verbose_name = 'Конфигурация сайта'
\ No newline at end of file
+    verbose_name = 'Конфигурация сайта'
+
+    def ready(self):
+        from . import signals, images  # noqa: F401
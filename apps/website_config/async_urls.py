@@ -0,0 +1,38 @@
+"""Маршруты API с нативными async-версиями публичных GET эндпоинтов.
+
+Имена и пути совпадают с ``urls.py``; эндпоинты записи, дерево категорий, рейтинг отзывов и поиск остаются
+синхронными DRF-представлениями. Подключается вместо ``urls.py`` при
+``ASYNC_READ_VIEWS = True`` (имеет смысл только под ASGI-сервером).
+"""
+from django.urls import path
+from . import async_views
+from .views import (
+    CategoryTreeView,
+    IncrementVideoViewsView,
+    ClientReviewSummaryView,
+    ClientReviewCreateView,
+    CallbackRequestCreateView,
+    SearchView,
+    CallbackRequestExportView,
+    ClientReviewExportView
+)
+
+
+urlpatterns = [
+    path('categories/', async_views.main_category_list, name='main-categories-list'),
+    path('categories/tree/', CategoryTreeView.as_view(), name='category-tree'),
+    path('service-details/', async_views.sub_category_service_details, name='service-details'),
+    path('projects/', async_views.our_project_list, name='our-projects-list'),
+    path('work-steps/', async_views.work_step_list, name='work-steps-list'),
+    path('youtube-videos/', async_views.youtube_video_list, name='youtube-videos-list'),
+    path('youtube-videos/increment-views/', IncrementVideoViewsView.as_view(), name='increment-video-views'),
+    path('why-choose-us/', async_views.why_choose_us_list, name='why-choose-us-list'),
+    path('client-reviews/', async_views.client_review_list, name='client-reviews-list'),
+    path('client-reviews/summary/', ClientReviewSummaryView.as_view(), name='client-review-summary'),
+    path('client-reviews/create/', ClientReviewCreateView.as_view(), name='client-review-create'),
+    path('callback-request/', CallbackRequestCreateView.as_view(), name='callback-request-create'),
+    path('homepage/', async_views.homepage_view, name='homepage'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('exports/callback-requests/', CallbackRequestExportView.as_view(), name='callback-requests-export'),
+    path('exports/client-reviews/', ClientReviewExportView.as_view(), name='client-reviews-export'),
+]
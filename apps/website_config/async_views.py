@@ -0,0 +1,223 @@
+"""Нативные async-версии публичных GET эндпоинтов.
+
+Ответы совпадают с синхронными DRF-представлениями из ``views.py`` (те же
+данные, ETag, пагинация и ``filter_backends``: списки строятся из QuerySet
+самого представления, например ``?ordering=``), но запросы к БД выполняются через async ORM
+(``async for``, ``aget``, ``acount``), а сериализация идёт без обращений к БД:
+скомпилированными сериализаторами по строкам ``.values()`` или обычными
+сериализаторами по заранее загруженным (prefetch) объектам. Под ASGI такой
+запрос не занимает поток целиком на время ответа.
+
+Подключаются через ``async_urls.py`` (настройка ``ASYNC_READ_VIEWS``).
+"""
+import functools
+import math
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from . import homepage, versions
+from .fast_serializers import compile_serializer
+from .models import Category, MainCategory, SubCategory, ServiceDetails, OurProject, WorkStep, YouTubeVideo, WhyChooseUs, ClientReview
+from .pagination import CreatedAtKeysetPagination, ServiceDetailsKeysetPagination
+from .serializers import (
+    MainCategoryWithSubsSerializer, ServiceDetailsSerializer, OurProjectSerializer,
+    WorkStepSerializer, YouTubeVideoSerializer, WhyChooseUsSerializer, ClientReviewSerializer
+)
+from .views import (
+    ServiceDetailsBatch, MainCategoryListView, OurProjectListView, WorkStepListView, YouTubeVideoListView,
+    WhyChooseUsListView, ClientReviewListView
+)
+
+MEDIA_TYPE = 'application/json'
+
+
+def json_response(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), content_type=MEDIA_TYPE, status=status)
+
+
+def set_validators(response, etag, last_modified):
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+
+
+def conditional(*models):
+    """Async-аналог ``ConditionalGetMixin``: 304 без выборки, ETag/Last-Modified в ответе"""
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            etag, last_modified = await versions.aget_validators(models, key=versions.request_key(request, MEDIA_TYPE))
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified and int(last_modified.timestamp())
+            )
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                set_validators(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
+
+
+def api_errors(view):
+    """Ошибки DRF (NotFound и т.п.) в том же формате, что и у APIView"""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        except APIException as exc:
+            return json_response({'detail': exc.detail}, status=exc.status_code)
+    return wrapper
+
+
+def view_queryset(view_class, request):
+    """QuerySet синхронного представления после его filter_backends; бэкенды только строят запрос"""
+    view = view_class(request=Request(request), args=(), kwargs={}, format_kwarg=None)
+    return view.filter_queryset(view.get_queryset())
+
+
+async def compiled_list(request, queryset, serializer_class, pagination_class=None):
+    """Async-аналог ``CompiledListMixin.list``"""
+    compiled = compile_serializer(serializer_class)
+    rows = compiled.values(queryset)
+    if pagination_class is not None:
+        paginator = pagination_class()
+        page_rows = paginator.get_page_queryset(rows, request)
+        if page_rows is not None:
+            page = paginator.get_page([row async for row in page_rows])
+            return {'next': paginator.get_next_link(), 'results': compiled.serialize(page, request)}
+    return compiled.serialize([row async for row in rows], request)
+
+
+async def page_number_paginate(request, queryset):
+    """Async-аналог ``PageNumberPagination`` из REST_FRAMEWORK: count/next/previous/results"""
+    page_size = api_settings.PAGE_SIZE
+    count = await queryset.acount()
+    num_pages = max(1, math.ceil(count / page_size))
+    page_number = request.GET.get('page', 1)
+    if page_number in PageNumberPagination.last_page_strings:
+        page_number = num_pages
+    try:
+        page_number = int(page_number)
+    except (TypeError, ValueError):
+        page_number = 0
+    if not 1 <= page_number <= num_pages:
+        raise NotFound(PageNumberPagination.invalid_page_message)
+
+    offset = (page_number - 1) * page_size
+    objects = [obj async for obj in queryset[offset:offset + page_size]]
+    url = request.build_absolute_uri()
+    next_link = replace_query_param(url, 'page', page_number + 1) if page_number < num_pages else None
+    if page_number == 1:
+        previous_link = None
+    elif page_number == 2:
+        previous_link = remove_query_param(url, 'page')
+    else:
+        previous_link = replace_query_param(url, 'page', page_number - 1)
+    return count, next_link, previous_link, objects
+
+
+@require_safe
+@api_errors
+@conditional(Category, ServiceDetails)
+async def main_category_list(request):
+    queryset = view_queryset(MainCategoryListView, request)
+    count, next_link, previous_link, categories = await page_number_paginate(request, queryset)
+    # Подкатегории и детали уже загружены prefetch'ем - сериализатор не обращается к БД
+    results = MainCategoryWithSubsSerializer(categories, many=True, context={'request': request}).data
+    return json_response({'count': count, 'next': next_link, 'previous': previous_link, 'results': results})
+
+
+@require_safe
+@api_errors
+@conditional(Category, ServiceDetails)
+async def sub_category_service_details(request):
+    if 'sub_category_ids' in request.GET or 'category_id' in request.GET:
+        return await service_details_batch(request)
+
+    sub_category_id = request.GET.get('sub_category_id')
+    if not sub_category_id:
+        return json_response({"error": "Параметр sub_category_id обязателен"}, status=400)
+
+    try:
+        sub_category = await SubCategory.objects.aget(id=sub_category_id, is_active=True)
+    except SubCategory.DoesNotExist:
+        return json_response({"error": "Подкатегория не найдена"}, status=404)
+
+    data = {
+        "sub_category_id": sub_category.id,
+        "sub_category_name": sub_category.name,
+    }
+    service_details = ServiceDetails.objects.filter(category=sub_category)
+    result = await compiled_list(request, service_details, ServiceDetailsSerializer, ServiceDetailsKeysetPagination)
+    if isinstance(result, dict):
+        data["service_details"] = result['results']
+        data["next"] = result['next']
+    else:
+        data["service_details"] = result
+    return json_response(data)
+
+
+async def service_details_batch(request):
+    try:
+        batch = ServiceDetailsBatch(request.GET)
+    except ValueError as exc:
+        return json_response({"error": str(exc)}, status=400)
+    sub_categories = [row async for row in batch.sub_categories()]
+    service_details = [row async for row in batch.service_details(sub_categories)] if sub_categories else []
+    response_status, data = batch.response(sub_categories, service_details, request)
+    return json_response(data, status=response_status)
+
+
+@require_safe
+@api_errors
+@conditional(OurProject)
+async def our_project_list(request):
+    return json_response(await compiled_list(
+        request, view_queryset(OurProjectListView, request), OurProjectSerializer, CreatedAtKeysetPagination
+    ))
+
+
+@require_safe
+@conditional(WorkStep)
+async def work_step_list(request):
+    return json_response(await compiled_list(request, view_queryset(WorkStepListView, request), WorkStepSerializer))
+
+
+@require_safe
+@conditional(YouTubeVideo)
+async def youtube_video_list(request):
+    return json_response(await compiled_list(
+        request, view_queryset(YouTubeVideoListView, request), YouTubeVideoSerializer
+    ))
+
+
+@require_safe
+@conditional(WhyChooseUs)
+async def why_choose_us_list(request):
+    return json_response(await compiled_list(
+        request, view_queryset(WhyChooseUsListView, request), WhyChooseUsSerializer
+    ))
+
+
+@require_safe
+@api_errors
+@conditional(ClientReview)
+async def client_review_list(request):
+    return json_response(await compiled_list(
+        request, view_queryset(ClientReviewListView, request), ClientReviewSerializer, CreatedAtKeysetPagination
+    ))
+
+
+@require_safe
+async def homepage_view(request):
+    return HttpResponse(await homepage.aget_payload(), content_type=MEDIA_TYPE)
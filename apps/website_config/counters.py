@@ -0,0 +1,139 @@
+"""Буферизованный счетчик просмотров YouTube видео.
+
+Просмотры копятся в памяти процесса и периодически сбрасываются в БД одним
+``UPDATE ... SET viewers = viewers + CASE ...`` на все накопленные видео.
+Запрос на увеличение просмотров не трогает строку видео, а горячие видео не
+выстраивают запросы в очередь на блокировке строки. При завершении процесса
+буфер сбрасывается (``atexit``), поэтому счетчики остаются точными при
+перезапуске воркеров.
+
+Просмотры - не правка контента: версия видео (ETag списка) и секция главной
+страницы обновляются после сброса не чаще раза в
+``VIDEO_VIEWS_PUBLISH_INTERVAL`` секунд на все воркеры с общим кэшем.
+Иначе каждый сброс каждого воркера менял бы ETag и пересобирал снимок.
+Сброс, пришедшийся на интервал, публикуется позже - на первом тике
+фонового потока после его окончания, даже если новых просмотров нет.
+
+Настройки:
+    VIDEO_VIEWS_FLUSH_INTERVAL - период фонового сброса в секундах
+        (``None`` отключает фоновый поток, сброс только через ``flush()``)
+    VIDEO_VIEWS_FLUSH_THRESHOLD - число накопленных просмотров, после
+        которого фоновый поток сбрасывает буфер досрочно
+    VIDEO_VIEWS_PUBLISH_INTERVAL - минимальный период обновления версии
+        видео после сброса в секундах (``None`` - после каждого сброса)
+"""
+import atexit
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, F, Value, When
+
+from .models import YouTubeVideo
+from .signals import content_changed
+
+logger = logging.getLogger(__name__)
+
+PUBLISH_KEY = 'video-views:published'
+
+
+class ViewCounterBuffer:
+    """Потокобезопасный буфер просмотров с фоновым сбросом"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._total = 0
+        self._wakeup = threading.Event()
+        self._thread = None
+        # Сброс, не опубликованный из-за интервала, публикуется на следующем тике
+        self._publish_pending = False
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'VIDEO_VIEWS_FLUSH_INTERVAL', 5)
+
+    @property
+    def flush_threshold(self):
+        return getattr(settings, 'VIDEO_VIEWS_FLUSH_THRESHOLD', 1000)
+
+    @property
+    def publish_interval(self):
+        return getattr(settings, 'VIDEO_VIEWS_PUBLISH_INTERVAL', 300)
+
+    def add(self, video_ids):
+        """Учесть по одному просмотру для каждого ID из списка"""
+        with self._lock:
+            self._counts.update(video_ids)
+            self._total += len(video_ids)
+            total = self._total
+        if self.flush_interval:
+            self._ensure_thread()
+            if total >= self.flush_threshold:
+                self._wakeup.set()
+
+    def pending(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def flush(self):
+        """Сбросить накопленные просмотры в БД; возвращает число записанных просмотров"""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._total = 0
+        if not counts:
+            if self._publish_pending:
+                self._publish()
+            return 0
+        increment = Case(
+            *[When(id=video_id, then=Value(count)) for video_id, count in counts.items()],
+            default=Value(0),
+        )
+        try:
+            YouTubeVideo.objects.filter(id__in=list(counts)).update(viewers=F('viewers') + increment)
+        except Exception:
+            # Возвращаем просмотры в буфер, чтобы записать их при следующем сбросе
+            with self._lock:
+                self._counts.update(counts)
+                self._total += sum(counts.values())
+            raise
+        self._publish()
+        return sum(counts.values())
+
+    def _publish(self):
+        interval = self.publish_interval
+        # add() удаётся одному воркеру за интервал
+        if interval and not cache.add(PUBLISH_KEY, True, interval):
+            self._publish_pending = True
+            return
+        self._publish_pending = False
+        content_changed(YouTubeVideo)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self._thread is None:
+                atexit.register(self.flush)
+            # Поток создаётся лениво, уже после fork воркера
+            self._thread = threading.Thread(target=self._run, name='video-views-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Не удалось сбросить просмотры видео в БД")
+            finally:
+                connection.close()
+
+
+video_views = ViewCounterBuffer()
@@ -0,0 +1,155 @@
+"""Потоковая выгрузка заявок и отзывов в CSV и NDJSON.
+
+Строки читаются через ``.values_list().iterator(chunk_size=...)`` (на
+PostgreSQL - серверный курсор) и сразу отдаются клиенту через
+``StreamingHttpResponse``: память воркера не зависит от размера выгрузки.
+
+Под ASGI Django собирает синхронный итератор потокового ответа в список
+целиком, поэтому там ответ получает асинхронный итератор: каждый кусок
+строк читается в потоке через ``sync_to_async``.
+"""
+import csv
+import re
+from datetime import datetime, time, timedelta
+
+import django_filters
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import CallbackRequest, ClientReview
+
+EXPORT_FIELDS = {
+    CallbackRequest: ('id', 'name', 'phone', 'is_processed', 'created_at'),
+    ClientReview: ('id', 'full_name', 'comment', 'rating', 'is_active', 'created_at'),
+}
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+CHUNK_SIZE = 2000
+
+# Ячейки CSV с таким началом Excel выполняет как формулы (=HYPERLINK(...) и т.п.)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+# Телефон в обычном виде (+998 90 ...) - не формула, его не экранируем
+PHONE_RE = re.compile(r'^\+[\d\s()-]*$')
+
+
+class Echo:
+    """Файлоподобный объект для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def export_value(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat()
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def csv_value(value, field):
+    """Значение ячейки CSV; текст из публичных форм, похожий на формулу, экранируется апострофом"""
+    value = export_value(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        if not (field == 'phone' and PHONE_RE.match(value)):
+            return "'" + value
+    return value
+
+
+def csv_stream(rows, model, fields):
+    writer = csv.writer(Echo())
+    # BOM: Excel открывает UTF-8 с кириллицей без ручного выбора кодировки
+    yield '\ufeff' + writer.writerow([str(model._meta.get_field(name).verbose_name) for name in fields])
+    for chunk in chunked(rows):
+        yield ''.join(writer.writerow([csv_value(value, field) for value, field in zip(row, fields)]) for row in chunk)
+
+
+def ndjson_stream(rows, fields):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for chunk in chunked(rows):
+        yield ''.join(encoder.encode(dict(zip(fields, row))) + '\n' for row in chunk)
+
+
+def chunked(rows, size=500):
+    """Несколько сотен строк на одну запись в сокет вместо строки на запись"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def is_asgi(request):
+    # DRF оборачивает HttpRequest в свой Request
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+async def aiterate(chunks):
+    """Асинхронный итератор поверх синхронного: курсор БД читается в потоке по одному куску"""
+    pull = sync_to_async(next, thread_sensitive=True)
+    done = object()
+    try:
+        while (chunk := await pull(chunks, done)) is not done:
+            yield chunk
+    finally:
+        # Разрыв соединения: закрыть генератор и серверный курсор в том же потоке
+        await sync_to_async(chunks.close, thread_sensitive=True)()
+
+
+def export_response(queryset, export_format='csv', asynchronous=False):
+    """Потоковый ответ с выгрузкой ``queryset`` в формате 'csv' или 'ndjson'.
+
+    ``asynchronous=True`` - для запросов под ASGI (см. ``is_asgi``).
+    """
+    model = queryset.model
+    fields = EXPORT_FIELDS[model]
+    rows = queryset.order_by('-created_at', '-id').values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+    if export_format == 'ndjson':
+        stream = ndjson_stream(rows, fields)
+    else:
+        stream = csv_stream(rows, model, fields)
+    if asynchronous:
+        stream = aiterate(stream)
+    response = StreamingHttpResponse(stream, content_type=FORMATS[export_format])
+    filename = '%s_%s.%s' % (model._meta.db_table, timezone.localdate().strftime('%Y%m%d'), export_format)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+class DateRangeFilterSet(django_filters.FilterSet):
+    """Период по created_at: границы - локальные даты включительно, фильтр по индексу без приведения к дате"""
+    date_from = django_filters.DateFilter(method='filter_date_from')
+    date_to = django_filters.DateFilter(method='filter_date_to')
+
+    @staticmethod
+    def start_of_day(value):
+        return timezone.make_aware(datetime.combine(value, time.min))
+
+    def filter_date_from(self, queryset, name, value):
+        return queryset.filter(created_at__gte=self.start_of_day(value))
+
+    def filter_date_to(self, queryset, name, value):
+        return queryset.filter(created_at__lt=self.start_of_day(value + timedelta(days=1)))
+
+
+class CallbackRequestExportFilter(DateRangeFilterSet):
+    class Meta:
+        model = CallbackRequest
+        fields = ['is_processed']
+
+
+class ClientReviewExportFilter(DateRangeFilterSet):
+    class Meta:
+        model = ClientReview
+        fields = ['is_active']
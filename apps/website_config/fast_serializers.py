@@ -0,0 +1,125 @@
+"""Скомпилированные read-only сериализаторы для публичных списков.
+
+``compile_serializer`` один раз разбирает поля обычного DRF ``ModelSerializer``
+и строит план преобразования строк ``QuerySet.values()`` в словари. Вывод
+совпадает с ``ModelSerializer`` байт в байт, но без создания экземпляров
+моделей, обхода полей сериализатора и построения URL изображения через
+storage для каждой строки: префикс media URL вычисляется один раз на запрос.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .serializers import ImageSrcsetField, build_srcset
+
+# Поля, значение которых из .values() уже совпадает с выводом DRF
+PLAIN_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.JSONField,
+)
+
+
+class CompiledSerializer:
+    """План сериализации строк ``.values()`` для одного класса сериализатора"""
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        model = serializer_class.Meta.model
+        self.plan = []
+        for name, field in serializer_class().fields.items():
+            if isinstance(field, ImageSrcsetField):
+                kind = 'srcset'
+            elif isinstance(field, serializers.FileField):
+                kind = 'file'
+            elif isinstance(field, serializers.DateTimeField):
+                kind = 'datetime'
+                if getattr(field, 'format', api_settings.DATETIME_FORMAT) != ISO_8601:
+                    raise ImproperlyConfigured(f"{serializer_class.__name__}.{name}: поддерживается только формат ISO 8601")
+            elif isinstance(field, PLAIN_FIELDS):
+                kind = 'plain'
+            else:
+                raise ImproperlyConfigured(
+                    f"{serializer_class.__name__}.{name}: поле {type(field).__name__} не поддерживается"
+                )
+            if kind == 'file':
+                storage = model._meta.get_field(field.source).storage
+            elif kind == 'srcset':
+                storage = default_storage
+            else:
+                storage = None
+            self.plan.append((name, field.source, kind, storage))
+        self.sources = [source for _, source, _, _ in self.plan]
+
+    def values(self, queryset):
+        """QuerySet строк-словарей только с нужными колонками"""
+        return queryset.values(*self.sources)
+
+    def _file_converter(self, storage, request):
+        if not isinstance(storage, FileSystemStorage):
+            def convert(name):
+                if not name:
+                    return None
+                url = storage.url(name)
+                return request.build_absolute_uri(url) if request is not None else url
+            return convert
+
+        prefix = storage.url('')
+        if request is not None:
+            prefix = request.build_absolute_uri(prefix)
+
+        def convert(name):
+            if not name:
+                return None
+            return prefix + filepath_to_uri(name).lstrip('/')
+        return convert
+
+    def _srcset_converter(self, storage, request):
+        url = self._file_converter(storage, request)
+
+        def convert(variants):
+            return build_srcset(variants or {}, url)
+        return convert
+
+    def _datetime_converter(self):
+        field_timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+
+        def convert(value):
+            if not value:
+                return None
+            if field_timezone is not None:
+                value = value.astimezone(field_timezone)
+            value = value.isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+        return convert
+
+    def serialize(self, rows, request=None):
+        """Преобразовать строки ``.values()`` в список словарей как у ``many=True``"""
+        converters = []
+        for name, source, kind, storage in self.plan:
+            if kind == 'file':
+                converters.append((name, source, self._file_converter(storage, request)))
+            elif kind == 'srcset':
+                converters.append((name, source, self._srcset_converter(storage, request)))
+            elif kind == 'datetime':
+                converters.append((name, source, self._datetime_converter()))
+            else:
+                converters.append((name, source, None))
+        return [
+            {name: convert(row[source]) if convert else row[source] for name, source, convert in converters}
+            for row in rows
+        ]
+
+
+@lru_cache(maxsize=None)
+def compile_serializer(serializer_class):
+    return CompiledSerializer(serializer_class)
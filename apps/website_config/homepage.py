@@ -0,0 +1,160 @@
+"""Предварительно собранный снимок главной страницы.
+
+Каждая секция хранится в кэше отдельно в виде готовых JSON-байтов, а итоговый
+ответ ``/api/homepage/`` собирается из них и тоже хранится в кэше. Прогретый
+запрос стоит одно чтение из кэша и ни одного запроса к БД. При изменении
+модели пересобираются только зависящие от неё секции (см. ``signals.py``).
+
+Снимок собирается вне запроса, поэтому ссылки на изображения в нём
+относительные (``/media/...``). Для нескольких воркеров нужен общий кэш.
+
+Пересборки выполняются по очереди под advisory-блокировкой PostgreSQL:
+иначе воркер, пересобравший одну секцию, мог записать итоговый ответ со
+старой копией другой секции, которую параллельно пересобирал другой воркер.
+На других БД (SQLite - один сервер) блокировка - общий lock процесса.
+"""
+import threading
+import zlib
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import connection, transaction
+from rest_framework.renderers import JSONRenderer
+
+from .models import (
+    Category, ServiceDetails, MainCategory, OurProject, WorkStep,
+    YouTubeVideo, WhyChooseUs, ClientReview, ClientReviewSummary
+)
+from .serializers import (
+    MainCategoryWithSubsSerializer, ServiceDetailsSerializer, OurProjectSerializer,
+    WorkStepSerializer, YouTubeVideoSerializer, WhyChooseUsSerializer, ClientReviewSerializer,
+    ClientReviewSummarySerializer
+)
+
+PAYLOAD_KEY = 'homepage:payload'
+SECTION_KEY = 'homepage:section:{}'
+REBUILD_LOCK_ID = zlib.crc32(b'homepage:rebuild')
+_rebuild_lock = threading.Lock()
+
+
+def build_categories():
+    return MainCategoryWithSubsSerializer(MainCategory.objects.active_tree().order_by('-id'), many=True).data
+
+
+def build_service_details():
+    """Детали услуг, сгруппированные по ID активной подкатегории"""
+    details = ServiceDetails.objects.filter(category__parent__isnull=False, category__is_active=True)
+    grouped = {}
+    for detail in details:
+        grouped.setdefault(str(detail.category_id), []).append(detail)
+    return {key: ServiceDetailsSerializer(items, many=True).data for key, items in grouped.items()}
+
+
+def build_projects():
+    return OurProjectSerializer(OurProject.objects.all(), many=True).data
+
+
+def build_work_steps():
+    return WorkStepSerializer(WorkStep.objects.all(), many=True).data
+
+
+def build_youtube_videos():
+    return YouTubeVideoSerializer(YouTubeVideo.objects.all(), many=True).data
+
+
+def build_why_choose_us():
+    return WhyChooseUsSerializer(WhyChooseUs.objects.filter(is_active=True), many=True).data
+
+
+def build_client_reviews():
+    return ClientReviewSerializer(ClientReview.objects.filter(is_active=True), many=True).data
+
+
+def build_client_review_summary():
+    return ClientReviewSummarySerializer(ClientReviewSummary.objects.get_summary()).data
+
+
+# Порядок секций определяет порядок ключей в ответе
+SECTIONS = {
+    'categories': build_categories,
+    'projects': build_projects,
+    'work_steps': build_work_steps,
+    'youtube_videos': build_youtube_videos,
+    'why_choose_us': build_why_choose_us,
+    'client_reviews': build_client_reviews,
+    'client_review_summary': build_client_review_summary,
+    'service_details': build_service_details,
+}
+
+# Какие секции зависят от какой (конкретной, не прокси) модели
+MODEL_SECTIONS = {
+    Category: ('categories', 'service_details'),
+    ServiceDetails: ('categories', 'service_details'),
+    OurProject: ('projects',),
+    WorkStep: ('work_steps',),
+    YouTubeVideo: ('youtube_videos',),
+    WhyChooseUs: ('why_choose_us',),
+    ClientReview: ('client_reviews', 'client_review_summary'),
+}
+
+
+def sections_for_model(model):
+    """Секции снимка, которые нужно пересобрать при изменении модели"""
+    return MODEL_SECTIONS.get(model._meta.concrete_model, ())
+
+
+def render_section(name):
+    return JSONRenderer().render(SECTIONS[name]())
+
+
+def assemble_payload(sections):
+    """Склеить готовые JSON-байты секций в один объект без повторной сериализации"""
+    return b'{' + b','.join(b'"%s":%s' % (name.encode(), sections[name]) for name in SECTIONS) + b'}'
+
+
+@contextmanager
+def rebuild_lock():
+    """Транзакция, в которой пересборки выполняются по очереди"""
+    if connection.vendor == 'postgresql':
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Блокировка до конца транзакции: секции читаются из кэша и БД уже после записи предыдущей пересборки
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [REBUILD_LOCK_ID])
+            yield
+    else:
+        with _rebuild_lock, transaction.atomic():
+            yield
+
+
+def rebuild(names=()):
+    """Пересобрать указанные секции (и отсутствующие в кэше) и сохранить итоговый ответ"""
+    keys = {name: SECTION_KEY.format(name) for name in SECTIONS}
+    with rebuild_lock():
+        cached = cache.get_many(keys.values())
+        sections = {}
+        fresh = {}
+        for name, key in keys.items():
+            if name in names or key not in cached:
+                sections[name] = fresh[key] = render_section(name)
+            else:
+                sections[name] = cached[key]
+        payload = assemble_payload(sections)
+        fresh[PAYLOAD_KEY] = payload
+        cache.set_many(fresh, timeout=None)
+    return payload
+
+
+def get_payload():
+    """Готовый JSON главной страницы; собирается при первом обращении"""
+    payload = cache.get(PAYLOAD_KEY)
+    if payload is None:
+        payload = rebuild()
+    return payload
+
+
+async def aget_payload():
+    """Асинхронный вариант ``get_payload``"""
+    payload = await cache.aget(PAYLOAD_KEY)
+    if payload is None:
+        payload = await sync_to_async(rebuild)()
+    return payload
@@ -0,0 +1,113 @@
+"""Фоновая генерация вариантов изображений при сохранении моделей.
+
+После коммита сохранения новое изображение отправляется в пул процессов
+(``imaging.generate_variants``), а готовые имена файлов записываются в JSON-поле
+модели одним ``UPDATE``. Загрузка в админке не ждёт обработки изображения.
+
+Настройки:
+    IMAGE_VARIANTS_WORKERS - размер пула процессов
+    IMAGE_VARIANTS_SYNC - генерировать варианты сразу в текущем процессе (тесты, команды)
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from . import imaging
+from .models import ServiceDetails, OurProject, WorkStep, YouTubeVideo
+from .signals import content_changed
+
+logger = logging.getLogger(__name__)
+
+# Модель -> (поле изображения, JSON-поле с вариантами)
+IMAGE_FIELDS = {
+    ServiceDetails: ('image', 'image_variants'),
+    OurProject: ('image', 'image_variants'),
+    WorkStep: ('image', 'image_variants'),
+    YouTubeVideo: ('thumbnail', 'thumbnail_variants'),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: дочерние процессы не наследуют потоки и соединения с БД воркера
+            _executor = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_VARIANTS_WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def smallest_variant(variants):
+    """Имя файла самого маленького варианта (для превью) или None"""
+    for key in imaging.VARIANT_FORMATS:
+        widths = (variants or {}).get(key)
+        if widths:
+            return widths[min(widths, key=int)]
+    return None
+
+
+def store_variants(model, pk, image_field, variants_field, variants, notify=True):
+    # Изображение могло смениться, пока строились варианты
+    updated = model.objects.filter(pk=pk, **{image_field: variants['source']}).update(**{variants_field: variants})
+    if updated and notify:
+        content_changed(model)
+    return updated
+
+
+def _wait_and_store(future, model, pk, image_field, variants_field):
+    try:
+        store_variants(model, pk, image_field, variants_field, future.result())
+    except Exception:
+        logger.exception("Не удалось создать варианты изображения %s #%s", model.__name__, pk)
+    finally:
+        connection.close()
+
+
+def build_variants(model, pk, name):
+    """Запустить генерацию вариантов для изображения ``name`` объекта ``pk``"""
+    if not isinstance(default_storage, FileSystemStorage):
+        logger.warning("Варианты изображений поддерживаются только для FileSystemStorage")
+        return
+    if not default_storage.exists(name):
+        logger.warning("Файл изображения %s не найден, варианты не созданы", name)
+        return
+    image_field, variants_field = IMAGE_FIELDS[model]
+    if getattr(settings, 'IMAGE_VARIANTS_SYNC', False):
+        variants = imaging.generate_variants(default_storage.location, name)
+        store_variants(model, pk, image_field, variants_field, variants)
+        return
+    future = get_executor().submit(imaging.generate_variants, default_storage.location, name)
+    threading.Thread(
+        target=_wait_and_store,
+        args=(future, model, pk, image_field, variants_field),
+        name='image-variants',
+        daemon=True,
+    ).start()
+
+
+@receiver(post_save)
+def on_image_saved(sender, instance, **kwargs):
+    model = sender._meta.concrete_model
+    if model not in IMAGE_FIELDS:
+        return
+    image_field, variants_field = IMAGE_FIELDS[model]
+    name = getattr(instance, image_field).name
+    variants = getattr(instance, variants_field) or {}
+    if not name:
+        if variants:
+            model.objects.filter(pk=instance.pk).update(**{variants_field: {}})
+        return
+    if variants.get('source') != name:
+        transaction.on_commit(lambda: build_variants(model, instance.pk, name))
@@ -0,0 +1,82 @@
+"""Генерация уменьшенных вариантов изображений (WebP/JPEG) на Pillow.
+
+Модуль не зависит от Django: функции выполняются в дочерних процессах пула
+(см. ``images.py``) и работают только с путями файловой системы.
+"""
+import hashlib
+import os
+
+from PIL import Image, ImageOps
+
+VARIANT_WIDTHS = (320, 640, 1280)
+
+# Порядок форматов определяет порядок ключей в ответе API
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def file_digest(path):
+    """Короткий хэш содержимого: имена вариантов меняются вместе с оригиналом"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def target_widths(width):
+    """Ширины вариантов без увеличения: мелкие оригиналы получают один вариант"""
+    widths = [w for w in VARIANT_WIDTHS if w < width]
+    return widths or [width]
+
+
+def to_rgb(image):
+    """JPEG не поддерживает прозрачность: подкладываем белый фон"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def generate_variants(media_root, name, variants_dir='variants'):
+    """Создать варианты изображения ``name`` внутри ``media_root``.
+
+    Ориентация из EXIF применяется к пикселям, сами метаданные (EXIF, GPS,
+    ICC) в варианты не записываются. Возвращает словарь
+    ``{'source': name, 'webp': {'320': имя_файла, ...}, 'jpeg': {...}}``
+    с именами относительно ``media_root``.
+    """
+    source_path = os.path.join(media_root, name)
+    stem = os.path.splitext(name)[0]
+    base_name = '%s.%s' % (os.path.join(variants_dir, stem), file_digest(source_path))
+    os.makedirs(os.path.dirname(os.path.join(media_root, base_name)), exist_ok=True)
+
+    result = {'source': name}
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+        for width in target_widths(image.width):
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+            for key, (pil_format, options) in VARIANT_FORMATS.items():
+                variant_name = '%s.w%d.%s' % (base_name, width, key)
+                variant = to_rgb(resized) if pil_format == 'JPEG' else resized
+                variant.save(os.path.join(media_root, variant_name), pil_format, **options)
+                result.setdefault(key, {})[str(width)] = variant_name
+    return result
+
+
+def placeholder(media_root, name, width=1600, height=1067, seed=0):
+    """Создать JPEG-заглушку ``name`` внутри ``media_root`` (градиент, цвет зависит от ``seed``)"""
+    path = os.path.join(media_root, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    start = ((seed * 67) % 256, (seed * 131) % 256, (seed * 197) % 256)
+    gradient = Image.linear_gradient('L').resize((width, height))
+    image = Image.merge('RGB', [gradient.point(lambda v, c=c: (c + v // 2) % 256) for c in start])
+    image.save(path, 'JPEG', quality=85)
+    return name
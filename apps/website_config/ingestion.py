@@ -0,0 +1,269 @@
+"""Отложенная пакетная запись заявок и отзывов (write-behind).
+
+При ``WRITE_BEHIND_INGESTION = True`` эндпоинты создания проверяют данные
+обычными сериализаторами, но вместо ``INSERT`` в отдельной транзакции на
+каждый POST кладут строку в ограниченный буфер процесса. Фоновый поток
+записывает накопленные строки одним ``bulk_create`` по таймеру или при
+достижении порога. Если буфер заполнен, эндпоинт отвечает 429.
+
+Каждая принятая строка до ответа клиенту дописывается в spill-файл
+``<INGESTION_SPILL_DIR>/<имя>.<pid>-<случайный суффикс>.jsonl``: pid в
+контейнерах повторяются, и новый процесс не должен дописывать (а потом
+перезаписывать) файл упавшего предшественника. После записи в БД файл
+переписывается без сохранённых строк. Пока процесс жив, он держит
+``flock`` на своём ``.lock`` файле. Файлы процессов, которые завершились
+аварийно (блокировка свободна), записывает в БД команда
+``recover_ingestion`` при старте сервера и, на всякий случай, фоновый поток
+воркера после первой принятой строки. При штатном завершении процесс сбрасывает буфер и удаляет свои
+файлы. Гарантия - "хотя бы один раз": падение между коммитом и перезаписью
+spill-файла приведёт к повтору строк.
+
+Ответ на отложенную запись имеет ту же форму, но ``id`` и ``created_at`` в
+нём ``null``: строка ещё не вставлена, а время создания ставит ``bulk_create``.
+
+Настройки:
+    WRITE_BEHIND_INGESTION - включить отложенную запись
+    INGESTION_FLUSH_INTERVAL - период фонового сброса в секундах
+        (``None`` отключает фоновый поток, сброс только через ``flush()``)
+    INGESTION_FLUSH_THRESHOLD - число строк, после которого буфер сбрасывается досрочно
+    INGESTION_MAX_PENDING - максимум строк в буфере, дальше 429
+    INGESTION_SPILL_DIR - каталог spill-файлов (локальный диск сервера)
+    INGESTION_FSYNC - ``fsync`` после каждой строки
+"""
+import atexit
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import CallbackRequest, ClientReview
+from .signals import content_changed, is_hidden
+
+logger = logging.getLogger(__name__)
+
+
+class BufferFull(Exception):
+    """Буфер заполнен, запись нужно повторить позже"""
+
+
+class IngestionBuffer:
+    """Потокобезопасный буфер новых строк модели со spill-файлом и фоновым сбросом"""
+
+    def __init__(self, model, name):
+        self.model = model
+        self.name = name
+        self._lock = threading.Lock()
+        self._rows = []
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._token = None
+        self._dir = None
+        self._spill = None
+        self._lock_file = None
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'INGESTION_FLUSH_INTERVAL', 2)
+
+    @property
+    def flush_threshold(self):
+        return getattr(settings, 'INGESTION_FLUSH_THRESHOLD', 200)
+
+    @property
+    def max_pending(self):
+        return getattr(settings, 'INGESTION_MAX_PENDING', 5000)
+
+    @property
+    def spill_dir(self):
+        return settings.INGESTION_SPILL_DIR
+
+    @property
+    def spill_path(self):
+        return os.path.join(self._dir, f'{self.name}.{self._token}.jsonl')
+
+    def add(self, values):
+        """Принять проверенные данные; возвращает несохранённый объект для ответа.
+
+        Бросает ``BufferFull``, если в буфере уже ``INGESTION_MAX_PENDING`` строк.
+        """
+        with self._lock:
+            self._open_spill()
+            if len(self._rows) >= self.max_pending:
+                raise BufferFull()
+            self._write_spill(values)
+            self._rows.append(values)
+            total = len(self._rows)
+        if self.flush_interval:
+            self._ensure_thread()
+            if total >= self.flush_threshold:
+                self._wakeup.set()
+        return self.model(**values)
+
+    def pending(self):
+        with self._lock:
+            return len(self._rows)
+
+    def flush(self):
+        """Записать накопленные строки в БД; возвращает их число"""
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return 0
+        try:
+            self._insert(rows)
+        except Exception:
+            # Возвращаем строки в буфер; spill-файл ещё содержит их
+            with self._lock:
+                self._rows[:0] = rows
+            raise
+        with self._lock:
+            self._rewrite_spill()
+        return len(rows)
+
+    def close(self):
+        """Штатное завершение: сбросить буфер и удалить свои spill- и lock-файлы"""
+        if self._pid != os.getpid():
+            return
+        try:
+            self.flush()
+        except Exception:
+            # Файлы остаются: строки восстановит другой процесс
+            logger.exception("Не удалось записать %s в БД при завершении", self.name)
+            return
+        with self._lock:
+            if self._rows or self._pid != os.getpid():
+                return
+            self._spill.close()
+            for path in (self.spill_path, self._own_lock_path()):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._lock_file.close()
+            self._pid = self._token = self._spill = self._lock_file = None
+
+    def recover(self):
+        """Записать в БД строки из spill-файлов аварийно завершившихся процессов"""
+        recovered = 0
+        for lock_path in glob.glob(os.path.join(self.spill_dir, f'{self.name}.*.lock')):
+            if self._token is not None and lock_path == self._own_lock_path():
+                continue
+            try:
+                lock_file = open(lock_path, 'a')
+            except FileNotFoundError:
+                continue
+            with lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # процесс жив
+                spill_path = lock_path[:-len('.lock')] + '.jsonl'
+                rows = self._read_spill(spill_path)
+                if rows:
+                    self._insert(rows)
+                    recovered += len(rows)
+                    logger.warning("Восстановлено %d строк %s из %s", len(rows), self.name, spill_path)
+                for path in (spill_path, lock_path):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+        return recovered
+
+    def _insert(self, rows):
+        objs = [self.model(**values) for values in rows]
+        with transaction.atomic():
+            self.model.objects.bulk_create(objs)
+        if not all(is_hidden(obj) for obj in objs):
+            content_changed(self.model)
+
+    def _own_lock_path(self):
+        return os.path.join(self._dir, f'{self.name}.{self._token}.lock')
+
+    def _open_spill(self):
+        # Вызывается под self._lock; после fork воркер открывает свои файлы
+        if self._pid == os.getpid():
+            return
+        if self._pid is None:
+            atexit.register(self.close)
+        self._pid = os.getpid()
+        self._token = f'{self._pid}-{uuid.uuid4().hex[:12]}'
+        self._rows = []
+        # Каталог фиксируется: файлы процесса не переезжают при смене настроек
+        self._dir = self.spill_dir
+        os.makedirs(self._dir, exist_ok=True)
+        self._lock_file = open(self._own_lock_path(), 'a')
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        self._spill = open(self.spill_path, 'a', encoding='utf-8')
+
+    def _write_spill(self, values):
+        self._spill.write(json.dumps(values, ensure_ascii=False) + '\n')
+        self._spill.flush()
+        if getattr(settings, 'INGESTION_FSYNC', True):
+            os.fsync(self._spill.fileno())
+
+    def _rewrite_spill(self):
+        if self._spill is None:
+            return
+        temp_path = self.spill_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as temp:
+            for values in self._rows:
+                temp.write(json.dumps(values, ensure_ascii=False) + '\n')
+            temp.flush()
+            os.fsync(temp.fileno())
+        os.replace(temp_path, self.spill_path)
+        self._spill.close()
+        self._spill = open(self.spill_path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def _read_spill(path):
+        rows = []
+        try:
+            with open(path, encoding='utf-8') as spill:
+                for line in spill:
+                    try:
+                        rows.append(json.loads(line))
+                    except ValueError:
+                        # Недописанная последняя строка при падении процесса
+                        logger.warning("Пропущена повреждённая строка в %s", path)
+        except FileNotFoundError:
+            pass
+        return rows
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            # Поток создаётся лениво, уже после fork воркера
+            self._thread = threading.Thread(target=self._run, name=f'{self.name}-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            self.recover()
+        except Exception:
+            logger.exception("Не удалось восстановить %s из spill-файлов", self.name)
+        finally:
+            connection.close()
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Не удалось записать %s в БД", self.name)
+            finally:
+                connection.close()
+
+
+callback_requests = IngestionBuffer(CallbackRequest, 'callback_requests')
+client_reviews = IngestionBuffer(ClientReview, 'client_reviews')
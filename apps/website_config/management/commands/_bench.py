@@ -0,0 +1,7 @@
+"""Общие функции для команд бенчмарков"""
+
+
+def percentile(values, fraction):
+    """Значение на позиции ``fraction`` (0..1) в отсортированной выборке"""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
@@ -0,0 +1,197 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.website_config import urls
+from apps.website_config.management.commands._bench import percentile
+from apps.website_config.models import SubCategory, YouTubeVideo
+from apps.website_config.seeding import DEFAULT_VOLUME, seed
+
+STAFF_ENDPOINTS = {'callback-requests-export', 'client-reviews-export'}
+# Полнотекстовый поиск есть только в PostgreSQL, на других БД эндпоинт отвечает 501
+POSTGRESQL_ENDPOINTS = {'search'}
+
+# Свой кэш процесса: cache.clear() бенчмарка не очищает общий кэш работающих воркеров
+BENCH_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-api'}}
+
+
+def request_spec(name, context):
+    """(метод, параметры или тело) для эндпоинта; остальные - GET без параметров"""
+    if name == 'service-details':
+        return 'get', {'sub_category_id': context['sub_category_id']}
+    if name == 'increment-video-views':
+        return 'post', {'ids': context['video_ids']}
+    if name == 'client-review-create':
+        return 'post', {'full_name': 'Бенчмарк', 'comment': 'Отзыв', 'rating': 5}
+    if name == 'callback-request-create':
+        return 'post', {'name': 'Бенчмарк', 'phone': '+998901234567'}
+    if name == 'search':
+        return 'get', {'q': 'работа'}
+    return 'get', None
+
+
+class Command(BaseCommand):
+    help = (
+        'Создать данные во временной транзакции и замерить все эндпоинты apps/website_config/urls.py: '
+        'p50/p95/p99, SQL-запросов на запрос и пик выделенной памяти. Результат - JSON для сравнения между коммитами'
+    )
+
+    def add_arguments(self, parser):
+        for key, default in DEFAULT_VOLUME.items():
+            parser.add_argument(f'--{key.replace("_", "-")}', type=int, default=default, help=f'Объём: {key}')
+        parser.add_argument('--iterations', type=int, default=200, help='Запросов на эндпоинт')
+        parser.add_argument('--warmup', type=int, default=10, help='Запросов прогрева на эндпоинт')
+        parser.add_argument('--endpoint', action='append', help='Только указанные имена URL')
+        parser.add_argument('--output', help='Файл для JSON результата ("-" - stdout)')
+
+    def handle(self, *args, **options):
+        volume = {key: options[key] for key in DEFAULT_VOLUME}
+        names = [pattern.name for pattern in urls.urlpatterns]
+        if options['endpoint']:
+            unknown = set(options['endpoint']) - set(names)
+            if unknown:
+                raise CommandError(f'Неизвестные эндпоинты: {", ".join(sorted(unknown))}')
+            names = [name for name in names if name in options['endpoint']]
+        unsupported = sorted(POSTGRESQL_ENDPOINTS & set(names)) if connection.vendor != 'postgresql' else []
+        if unsupported:
+            if options['endpoint']:
+                raise CommandError(f'Не поддерживаются на {connection.vendor}: {", ".join(unsupported)}')
+            names = [name for name in names if name not in unsupported]
+            self.stdout.write(f'Пропущены (только PostgreSQL): {", ".join(unsupported)}')
+
+        # Бенчмарк измеряет приложение, а не лимиты: скорости throttling с запасом
+        rates = {scope: '1000000/s' for scope in settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {})}
+        overrides = override_settings(
+            REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates},
+            WRITE_BEHIND_INGESTION=False,
+            VIDEO_VIEWS_FLUSH_INTERVAL=None,
+            DEBUG=False,
+            CACHES=BENCH_CACHES,
+        )
+        results = {}
+        with overrides, transaction.atomic():
+            cache.clear()
+            created = seed(volume)
+            context = {
+                'sub_category_id': SubCategory.objects.filter(is_active=True).values_list('id', flat=True).first(),
+                'video_ids': list(YouTubeVideo.objects.values_list('id', flat=True)[:5]),
+            }
+            client = Client()
+            # Выгрузки доступны только сотрудникам; пользователь удаляется вместе с транзакцией.
+            # Публичные эндпоинты замеряются без сессии, как у посетителей сайта
+            staff_client = Client()
+            staff_client.force_login(User.objects.create_superuser('bench_api', 'bench@example.com', None))
+            self.stdout.write(f'{"Эндпоинт":<28}{"":<6}{"p50":>9}{"p95":>9}{"p99":>9}')
+            for name in names:
+                results[name] = self.measure(
+                    staff_client if name in STAFF_ENDPOINTS else client,
+                    name, context, options['iterations'], options['warmup'],
+                )
+                self.report(name, results[name])
+            transaction.set_rollback(True)
+        cache.clear()
+
+        report = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'commit': self.git_commit(),
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'iterations': options['iterations'],
+                'volume': volume,
+                'created': created,
+                'skipped': unsupported,
+            },
+            'endpoints': results,
+        }
+        if options['output'] == '-':
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        elif options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Результат записан в {options["output"]}'))
+
+    def measure(self, client, name, context, iterations, warmup):
+        method, data = request_spec(name, context)
+        path = reverse(name)
+
+        def call():
+            # Всё выполняется в одной откатываемой транзакции: on_commit колбэки (версии, пересборка
+            # главной, сводка отзывов) выполняются сразу и входят в замер, как после коммита в продакшене
+            with TestCase.captureOnCommitCallbacks(execute=True):
+                if method == 'get':
+                    response = client.get(path, data)
+                    if response.streaming:
+                        # Потоковый ответ (выгрузки) формируется только при чтении
+                        response.content_length = sum(len(chunk) for chunk in response.streaming_content)
+                    return response
+                return client.post(path, data, content_type='application/json')
+
+        response = call()
+        for _ in range(warmup):
+            call()
+        if response.status_code >= 400:
+            raise CommandError(f'{name}: ответ {response.status_code} {response.content[:200]!r}')
+
+        latencies = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - started)
+
+        # Число запросов и память - отдельными проходами, чтобы не искажать время
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            call()
+        # Следующий запрос (request_started) очистит queries_log - считаем сразу
+        query_count = len(queries)
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            call()
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'method': method.upper(),
+            'path': path,
+            'status': response.status_code,
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+            'queries': query_count,
+            'peak_alloc_kib': round(peak / 1024, 1),
+        }
+
+    def report(self, name, result):
+        self.stdout.write(
+            f'{name:<28}{result["method"]:<6}{result["p50_ms"]:>9.2f}{result["p95_ms"]:>9.2f}'
+            f'{result["p99_ms"]:>9.2f} мс{result["queries"]:>5} SQL{result["peak_alloc_kib"]:>10.1f} KiB'
+        )
+
+    @staticmethod
+    def git_commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from apps.website_config.models import SubCategory
+from apps.website_config.management.commands._bench import percentile
+
+SYNC_URLCONF = 'apps.website_config.urls'
+ASYNC_URLCONF = 'apps.website_config.async_urls'
+
+READ_ENDPOINTS = (
+    'main-categories-list',
+    'service-details',
+    'our-projects-list',
+    'work-steps-list',
+    'youtube-videos-list',
+    'why-choose-us-list',
+    'client-reviews-list',
+    'homepage',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить публичные GET эндпоинты: синхронные под WSGI (пул потоков), '
+        'синхронные под ASGI и нативные async под ASGI. Использует уже созданные данные '
+        '(см. create_fake_data)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400, help='Количество запросов на режим')
+        parser.add_argument('--concurrency', type=int, default=20, help='Одновременных запросов')
+        parser.add_argument('--endpoint', action='append', choices=READ_ENDPOINTS, help='Только указанные эндпоинты')
+
+    def handle(self, *args, **options):
+        sub_category_id = SubCategory.objects.filter(is_active=True).values_list('id', flat=True).first()
+        if sub_category_id is None:
+            raise CommandError('Нет данных: сначала выполните create_fake_data')
+        self.sub_category_id = sub_category_id
+        names = options['endpoint'] or READ_ENDPOINTS
+        total = options['requests']
+        concurrency = options['concurrency']
+
+        modes = (
+            ('sync / WSGI', SYNC_URLCONF, self.run_wsgi),
+            ('sync / ASGI', SYNC_URLCONF, self.run_asgi),
+            ('async / ASGI', ASYNC_URLCONF, self.run_asgi),
+        )
+        self.stdout.write(f'Запросов: {total}, одновременно: {concurrency}, эндпоинтов: {len(names)}')
+        self.stdout.write(f'{"Режим":<16}{"запросов/с":>12}{"p50, мс":>10}{"p95, мс":>10}{"p99, мс":>10}')
+        for title, urlconf, runner in modes:
+            with override_settings(ROOT_URLCONF=urlconf):
+                paths = [self.get_path(name) for name in names]
+                paths = [paths[i % len(paths)] for i in range(total)]
+                runner(paths[:concurrency], concurrency)  # прогрев
+                started = time.perf_counter()
+                latencies = runner(paths, concurrency)
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{title:<16}{total / elapsed:>12,.0f}'
+                f'{percentile(latencies, 0.50) * 1000:>10.1f}'
+                f'{percentile(latencies, 0.95) * 1000:>10.1f}'
+                f'{percentile(latencies, 0.99) * 1000:>10.1f}'
+            )
+        self.stdout.write(self.style.SUCCESS('Готово (время ответа без сети и HTTP-сервера)'))
+
+    def get_path(self, name):
+        path = reverse(name)
+        if name == 'service-details':
+            path += f'?sub_category_id={self.sub_category_id}'
+        return path
+
+    @staticmethod
+    def ensure_ok(response, path):
+        if response.status_code != 200:
+            raise CommandError(f'{path}: ответ {response.status_code}')
+
+    def run_wsgi(self, paths, concurrency):
+        """Синхронный обработчик в пуле потоков, как gunicorn --threads"""
+        local = threading.local()
+
+        def request(path):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client()
+            started = time.perf_counter()
+            response = client.get(path)
+            latency = time.perf_counter() - started
+            self.ensure_ok(response, path)
+            return latency
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(request, paths))
+
+    def run_asgi(self, paths, concurrency):
+        """ASGI обработчик в одном event loop, как uvicorn"""
+        async def run():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def request(path):
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.get(path)
+                    latency = time.perf_counter() - started
+                self.ensure_ok(response, path)
+                return latency
+
+            return await asyncio.gather(*(request(path) for path in paths))
+
+        return asyncio.run(run())
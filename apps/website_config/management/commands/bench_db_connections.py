@@ -0,0 +1,110 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connection, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.urls import reverse
+
+from config.database import pool_stats
+from apps.website_config.management.commands._bench import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить время ответа при новом соединении на каждый запрос, постоянных '
+        'соединениях (CONN_MAX_AGE + CONN_HEALTH_CHECKS) и пуле psycopg'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Количество запросов на режим')
+        parser.add_argument('--concurrency', type=int, default=4, help='Потоков (как gunicorn --threads)')
+        parser.add_argument('--pool-size', type=int, default=4, help='max_size пула для режима pool')
+        parser.add_argument(
+            '--endpoint', action='append', help='Имя URL из apps/website_config/urls.py (по умолчанию work-steps-list)'
+        )
+
+    def handle(self, *args, **options):
+        self.paths = [reverse(name) for name in options['endpoint'] or ['work-steps-list']]
+        database = connections.settings[DEFAULT_DB_ALIAS]
+        original = {key: database.get(key) for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS', 'OPTIONS')}
+
+        modes = [
+            ('без постоянных', {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'OPTIONS': {}}),
+            ('CONN_MAX_AGE=60', {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True, 'OPTIONS': {}}),
+        ]
+        if connection.vendor == 'postgresql':
+            pool = {'min_size': 1, 'max_size': options['pool_size'], 'timeout': 10}
+            modes.append(('pool', {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'OPTIONS': {'pool': pool}}))
+
+        self.stdout.write(f'{"Режим":<18}{"запросов/с":>12}{"p50, мс":>10}{"p95, мс":>10}{"соединений":>12}')
+        try:
+            for title, overrides in modes:
+                connections.close_all()
+                database.update(overrides)
+                self.run_mode(title, options['requests'], options['concurrency'])
+        finally:
+            connections.close_all()
+            if connection.vendor == 'postgresql':
+                connection.close_pool()
+            database.update(original)
+        self.stdout.write(self.style.SUCCESS('Готово (время ответа без сети и HTTP-сервера)'))
+
+    def run_mode(self, title, total, concurrency):
+        opened = []
+
+        def counter(**kwargs):
+            opened.append(1)
+
+        connection_created.connect(counter)
+        local = threading.local()
+
+        def request(index):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client()
+            path = self.paths[index % len(self.paths)]
+            started = time.perf_counter()
+            # Жизненный цикл соединения как у настоящего запроса (request_started / request_finished)
+            close_old_connections()
+            response = client.get(path)
+            close_old_connections()
+            latency = time.perf_counter() - started
+            if response.status_code != 200:
+                raise CommandError(f'{path}: ответ {response.status_code}')
+            return latency
+
+        barrier = threading.Barrier(concurrency)
+
+        def release(_):
+            # По одному вызову в каждом потоке: закрыть его соединения
+            barrier.wait()
+            connections.close_all()
+
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(request, range(concurrency)))  # прогрев
+                opened.clear()
+                started = time.perf_counter()
+                latencies = list(executor.map(request, range(total)))
+                elapsed = time.perf_counter() - started
+                stats = pool_stats()
+                list(executor.map(release, range(concurrency)))
+        finally:
+            connection_created.disconnect(counter)
+
+        # В режиме пула connection_created срабатывает при каждой выдаче соединения из пула
+        connects = stats['connections'] if stats else len(opened)
+        self.stdout.write(
+            f'{title:<18}{total / elapsed:>12,.0f}'
+            f'{percentile(latencies, 0.50) * 1000:>10.2f}'
+            f'{percentile(latencies, 0.95) * 1000:>10.2f}'
+            f'{connects:>12}'
+        )
+        if stats:
+            self.stdout.write(
+                f'    пул: размер {stats["size"]}/{stats["max_size"]}, занято {stats["in_use"]}, '
+                f'ожидают {stats["waiting"]}, ожидание всего {stats["wait_ms"]} мс'
+            )
@@ -0,0 +1,75 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from apps.website_config.fast_serializers import compile_serializer
+from apps.website_config.models import OurProject, WorkStep, YouTubeVideo, WhyChooseUs, ClientReview
+from apps.website_config.serializers import (
+    OurProjectSerializer, WorkStepSerializer, YouTubeVideoSerializer, WhyChooseUsSerializer, ClientReviewSerializer
+)
+
+
+def make_rows(count):
+    """Несохранённые объекты для всех публичных списков"""
+    return {
+        OurProjectSerializer: [OurProject(image=f'projects/{i}.jpg') for i in range(count)],
+        WorkStepSerializer: [
+            WorkStep(step_number=1000 + i, title=f'Шаг {i}', description='Описание шага', image=f'work_steps/{i}.jpg')
+            for i in range(count)
+        ],
+        YouTubeVideoSerializer: [
+            YouTubeVideo(title=f'Видео {i}', youtube_url='https://youtu.be/x', thumbnail=f'youtube_thumbnails/{i}.jpg')
+            for i in range(count)
+        ],
+        WhyChooseUsSerializer: [WhyChooseUs(title=f'Пункт {i}', description='Описание', order=i) for i in range(count)],
+        ClientReviewSerializer: [ClientReview(full_name=f'Клиент {i}', comment='Отзыв', rating=5) for i in range(count)],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Сравнить скорость ModelSerializer и скомпилированных сериализаторов (строк в секунду)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Количество строк на модель')
+        parser.add_argument('--repeat', type=int, default=3, help='Количество повторов (берётся лучший)')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = options['repeat']
+        request = RequestFactory().get('/api/', HTTP_HOST='localhost')
+
+        # Данные создаются во временной транзакции и откатываются в конце
+        with transaction.atomic():
+            for serializer_class, objects in make_rows(rows).items():
+                serializer_class.Meta.model.objects.bulk_create(objects, batch_size=1000)
+
+            self.stdout.write(f'{"Сериализатор":<26}{"DRF, строк/с":>16}{"compiled, строк/с":>20}{"ускорение":>12}')
+            for serializer_class in make_rows(0):
+                queryset = serializer_class.Meta.model.objects.all()
+                compiled = compile_serializer(serializer_class)
+
+                def drf():
+                    return serializer_class(queryset.all(), many=True, context={'request': request}).data
+
+                def fast():
+                    return compiled.serialize(compiled.values(queryset.all()), request)
+
+                drf_rate = rows / self._best(drf, repeat)
+                fast_rate = rows / self._best(fast, repeat)
+                self.stdout.write(
+                    f'{serializer_class.__name__:<26}{drf_rate:>16,.0f}{fast_rate:>20,.0f}{fast_rate / drf_rate:>11.1f}x'
+                )
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Готово (время включает выборку из БД)'))
+
+    @staticmethod
+    def _best(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
@@ -0,0 +1,49 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from apps.website_config import imaging
+from apps.website_config.images import IMAGE_FIELDS, store_variants
+from apps.website_config.signals import content_changed
+
+
+class Command(BaseCommand):
+    help = 'Создать уменьшенные варианты для уже загруженных изображений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='Количество процессов')
+        parser.add_argument('--force', action='store_true', help='Пересоздать варианты даже если они уже есть')
+
+    def handle(self, *args, **options):
+        pending = []
+        for model, (image_field, variants_field) in IMAGE_FIELDS.items():
+            rows = model.objects.exclude(**{image_field: ''}).exclude(**{f'{image_field}__isnull': True})
+            for pk, name, variants in rows.values_list('pk', image_field, variants_field):
+                if options['force'] or (variants or {}).get('source') != name:
+                    pending.append((model, pk, name))
+
+        self.stdout.write(f'Изображений для обработки: {len(pending)}')
+        done = failed = 0
+        changed_models = set()
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = {
+                pool.submit(imaging.generate_variants, default_storage.location, name): (model, pk)
+                for model, pk, name in pending
+            }
+            for future in as_completed(futures):
+                model, pk = futures[future]
+                image_field, variants_field = IMAGE_FIELDS[model]
+                try:
+                    if store_variants(model, pk, image_field, variants_field, future.result(), notify=False):
+                        changed_models.add(model)
+                    done += 1
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'{model.__name__} #{pk}: {exc}')
+
+        # Одно событие на модель вместо события на каждое изображение
+        for model in changed_models:
+            content_changed(model)
+        self.stdout.write(self.style.SUCCESS(f'Готово: {done}, ошибок: {failed}'))
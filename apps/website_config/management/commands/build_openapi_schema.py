@@ -0,0 +1,25 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from config import schema
+
+
+class Command(BaseCommand):
+    help = (
+        'Собрать OpenAPI схему (все языки, YAML и JSON, с .gz вариантами) в OPENAPI_SCHEMA_DIR. '
+        'Запускать при деплое: без DEBUG /schema/ отдаёт только собранную схему'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', help='Каталог (по умолчанию OPENAPI_SCHEMA_DIR)')
+
+    def handle(self, *args, **options):
+        directory = options['output_dir'] or schema.schema_dir()
+        manifest = schema.build(directory)
+        for language, names in manifest['files'].items():
+            for name in names.values():
+                size = os.path.getsize(os.path.join(directory, name))
+                compressed = os.path.getsize(os.path.join(directory, name + '.gz'))
+                self.stdout.write(f'  {name}: {size} байт, gzip {compressed} байт')
+        self.stdout.write(self.style.SUCCESS(f'Схема версии {manifest["version"]} записана в {directory}'))
@@ -1,289 +1,176 @@
-from django.core.management.base import BaseCommand
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import cycle
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.website_config import imaging, seeding
 from apps.website_config.models import (
-    MainCategory, SubCategory, ServiceDetails, 
-    OurProject, WorkStep, YouTubeVideo, WhyChooseUs, ClientReview
+    Category, WorkStep, YouTubeVideo, WhyChooseUs, ClientReview, ClientReviewSummary, CallbackRequest
 )
+from apps.website_config.signals import content_changed
 
+CATEGORIES = {
+    'Эконом ремонт': [
+        'Поклейка обоев', 'Натяжные потолки', 'Точечное освещение', 'Укладка ламината', 'Установка дверей',
+    ],
+    'Стандартный ремонт': ['Подготовительные работы', 'Электромонтажные', 'Сантехнические, Отделочные'],
+    'Дизайнерский ремонт': [
+        'Планировочное решение', 'Концепция интерьера', '3D-визуализация', 'Рабочая документация',
+    ],
+    'Ландшафтное освещение': ['Подсветка', 'Охранное', 'Архивное', 'Маркировочное'],
+}
 
-class Command(BaseCommand):
-    help = 'Создать тестовые данные для всех моделей'
+WORK_STEPS = [
+    ('Вы направляете техническое задание', 'любым удобным способом электронная почта, мессенджеры'),
+    ('Мы ознакомимся с планом', 'и приезжаем на объект для проведения контрольных замеров и подготовки сметы'),
+    ('Совместно обсуждаем проект и прочие вопросы', 'в любом удобном формате (он/офлайн)'),
+    ('Согласовываем сметы, подписываем договор', 'и выходим на объект'),
+    ('Выполняем работы на объекте', 'взаимодействуя с вами, технадзором, субподрядчиками, надзорными службами'),
+]
 
-    def handle(self, *args, **kwargs):
-        self.stdout.write(self.style.SUCCESS('Начинаем создание тестовых данных...'))
+VIDEOS = [('Ремонт трехкомнатной квартиры', 'https://www.youtube.com/watch?v=dQw4w9WgXcQ', 356)] * 4
 
-        # Очистка существующих данных
-        self.stdout.write('Очистка существующих данных...')
-        ClientReview.objects.all().delete()
-        WhyChooseUs.objects.all().delete()
-        YouTubeVideo.objects.all().delete()
-        WorkStep.objects.all().delete()
-        OurProject.objects.all().delete()
-        ServiceDetails.objects.all().delete()
-        SubCategory.objects.all().delete()
-        MainCategory.objects.all().delete()
+WHY_CHOOSE_US = [
+    ('ДОСТУПНОСТЬ', '6 дневная рабочая неделя (с понедельника по субботу), рабочий день длится 8 часов.'),
+    (
+        'ПРОФЕССИОНАЛИЗМ',
+        'Вопросы задаем только по делу. Не оставляем лишние дополнительных работ. Выполняем функцию техзаказчика',
+    ),
+    (
+        'УДОБСТВО',
+        'Работаем с дизайнерскими материалами. Любая форма оплаты. Предоставляем закрывающие документы. '
+        'Приедем для замеров на объект.',
+    ),
+    (
+        'ГАРАНТИИ',
+        'Гарантийный срок по ГК РФ. Сервисное обслуживание. Страхование на период СМР. Финансовая ответственность',
+    ),
+    (
+        'ВНИМАТЕЛЬНОСТЬ',
+        'К пожеланиям заказчика. На совещаниях о проектных правках. Обращаем внимание на детали и мелочи. '
+        'Всегда убираем за собой мусор.',
+    ),
+    (
+        'ОТВЕТСТВЕННОСТЬ',
+        'Перед взятыми на себя обязательствами. За соблюдение сроков. Поддерживаем культуру производства работ. '
+        'Контролируем качество выполнения работ.',
+    ),
+]
 
-        # Создание главных категорий
-        self.stdout.write('Создание главных категорий...')
-        ekonom = MainCategory.objects.create(
-            name='Эконом ремонт',
-            is_active=True
-        )
-        
-        standart = MainCategory.objects.create(
-            name='Стандартный ремонт',
-            is_active=True
-        )
-        
-        dizain = MainCategory.objects.create(
-            name='Дизайнерский ремонт',
-            is_active=True
-        )
-        
-        landshaft = MainCategory.objects.create(
-            name='Ландшафтное освещение',
-            is_active=True
-        )
+REVIEWS = [
+    (
+        'Иванов Сергей Владимирович',
+        'Хочу поблагодарить компанию ПВВ Строй! Я доволен все мои направлений нет. '
+        'Мой проект закончили даже раньше срока.',
+    ),
+    ('Николай Власович', 'Все понравилось, спасибо, сделали работу быстро и качественно рекомендую!'),
+    (
+        'Стрелков Евгений Юрьевич',
+        'Спасибо большое за работу! Установили фундамент быстро, качественно провели монтаж. '
+        'Работа сделана оперативно, ребята приятные, отзывчивые!',
+    ),
+    (
+        'Вадим Алексеев',
+        'Работа выполнена на высоком уровне, аккуратно и качественно, все сделали очень быстро. '
+        'обращайтесь только к ним!',
+    ),
+]
 
-        # Создание подкатегорий для Эконом ремонт
-        self.stdout.write('Создание подкатегорий для Эконом ремонт...')
-        SubCategory.objects.create(
-            name='Поклейка обоев',
-            parent=ekonom,
-            is_active=True
-        )
-        
-        SubCategory.objects.create(
-            name='Натяжные потолки',
-            parent=ekonom,
-            is_active=True
-        )
-        
-        SubCategory.objects.create(
-            name='Точечное освещение',
-            parent=ekonom,
-            is_active=True
-        )
-        
-        SubCategory.objects.create(
-            name='Укладка ламината',
-            parent=ekonom,
-            is_active=True
-        )
-        
-        SubCategory.objects.create(
-            name='Установка дверей',
-            parent=ekonom,
-            is_active=True
-        )
 
-        # Создание подкатегорий для Стандартный ремонт
-        self.stdout.write('Создание подкатегорий для Стандартный ремонт...')
-        SubCategory.objects.create(
-            name='Подготовительные работы',
-            parent=standart,
-            is_active=True
-        )
-        
-        SubCategory.objects.create(
-            name='Электромонтажные',
-            parent=standart,
-            is_active=True
-        )
-        
-        SubCategory.objects.create(
-            name='Сантехнические, Отделочные',
-            parent=standart,
-            is_active=True
-        )
+class Command(BaseCommand):
+    help = (
+        'Создать тестовые данные для всех моделей. С --scale N дополнительно создаются '
+        'сгенерированные строки (N x объём по умолчанию из seeding.py), например --scale 100 - десятки тысяч строк'
+    )
 
-        # Создание подкатегорий для Дизайнерский ремонт
-        self.stdout.write('Создание подкатегорий для Дизайнерский ремонт...')
-        SubCategory.objects.create(
-            name='Планировочное решение',
-            parent=dizain,
-            is_active=True
-        )
-        
-        SubCategory.objects.create(
-            name='Концепция интерьера',
-            parent=dizain,
-            is_active=True
-        )
-        
-        SubCategory.objects.create(
-            name='3D-визуализация',
-            parent=dizain,
-            is_active=True
-        )
-        
-        SubCategory.objects.create(
-            name='Рабочая документация',
-            parent=dizain,
-            is_active=True
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=0, help='Множитель сгенерированных данных (0 - только демо-данные)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Строк в одном INSERT / транзакции')
+        parser.add_argument('--images', type=int, default=0, help='Создать столько изображений-заглушек (0 - без изображений)')
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='Процессов для заглушек')
+        parser.add_argument(
+            '--include-callbacks', action='store_true',
+            help='С --scale: очистить заявки на звонок (реальные заявки клиентов!) и создать сгенерированные',
         )
 
-        # Создание подкатегорий для Ландшафтное освещение
-        self.stdout.write('Создание подкатегорий для Ландшафтное освещение...')
-        SubCategory.objects.create(
-            name='Подсветка',
-            parent=landshaft,
-            is_active=True
-        )
-        
-        SubCategory.objects.create(
-            name='Охранное',
-            parent=landshaft,
-            is_active=True
-        )
-        
-        SubCategory.objects.create(
-            name='Архивное',
-            parent=landshaft,
-            is_active=True
-        )
-        
-        SubCategory.objects.create(
-            name='Маркировочное',
-            parent=landshaft,
-            is_active=True
-        )
+    def handle(self, *args, **options):
+        if options['scale'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--scale не может быть отрицательным, --batch-size должен быть положительным')
+        started = time.perf_counter()
+        self.stdout.write(self.style.SUCCESS('Начинаем создание тестовых данных...'))
 
-        # Создание шагов работы
-        self.stdout.write('Создание шагов работы...')
-        WorkStep.objects.create(
-            step_number=1,
-            title='Вы направляете техническое задание',
-            description='любым удобным способом электронная почта, мессенджеры'
-        )
-        
-        WorkStep.objects.create(
-            step_number=2,
-            title='Мы ознакомимся с планом',
-            description='и приезжаем на объект для проведения контрольных замеров и подготовки сметы'
-        )
-        
-        WorkStep.objects.create(
-            step_number=3,
-            title='Совместно обсуждаем проект и прочие вопросы',
-            description='в любом удобном формате (он/офлайн)'
-        )
-        
-        WorkStep.objects.create(
-            step_number=4,
-            title='Согласовываем сметы, подписываем договор',
-            description='и выходим на объект'
-        )
-        
-        WorkStep.objects.create(
-            step_number=5,
-            title='Выполняем работы на объекте',
-            description='взаимодействуя с вами, технадзором, субподрядчиками, надзорными службами'
-        )
+        # Очистка одним TRUNCATE вместо загрузки каждого объекта через .delete()
+        self.stdout.write('Очистка существующих данных...')
+        # Заявки - реальные обращения клиентов: очищаются только по явному флагу
+        include_callbacks = options['scale'] and options['include_callbacks']
+        seeding.truncate(seeding.SEEDED_MODELS + ((CallbackRequest,) if include_callbacks else ()))
 
-        # Создание YouTube видео
-        self.stdout.write('Создание YouTube видео...')
-        YouTubeVideo.objects.create(
-            title='Ремонт трехкомнатной квартиры',
-            youtube_url='https://www.youtube.com/watch?v=dQw4w9WgXcQ',
-            viewers=356
-        )
-        
-        YouTubeVideo.objects.create(
-            title='Ремонт трехкомнатной квартиры',
-            youtube_url='https://www.youtube.com/watch?v=dQw4w9WgXcQ',
-            viewers=356
-        )
-        
-        YouTubeVideo.objects.create(
-            title='Ремонт трехкомнатной квартиры',
-            youtube_url='https://www.youtube.com/watch?v=dQw4w9WgXcQ',
-            viewers=356
-        )
-        
-        YouTubeVideo.objects.create(
-            title='Ремонт трехкомнатной квартиры',
-            youtube_url='https://www.youtube.com/watch?v=dQw4w9WgXcQ',
-            viewers=356
-        )
+        images = self.create_images(options['images'], options['workers']) if options['images'] else None
 
-        # Создание преимуществ (Почему выбирают нас)
-        self.stdout.write('Создание преимуществ...')
-        WhyChooseUs.objects.create(
-            title='ДОСТУПНОСТЬ',
-            description='6 дневная рабочая неделя (с понедельника по субботу), рабочий день длится 8 часов.',
-            order=1,
-            is_active=True
-        )
-        
-        WhyChooseUs.objects.create(
-            title='ПРОФЕССИОНАЛИЗМ',
-            description='Вопросы задаем только по делу. Не оставляем лишние дополнительных работ. Выполняем функцию техзаказчика',
-            order=2,
-            is_active=True
-        )
-        
-        WhyChooseUs.objects.create(
-            title='УДОБСТВО',
-            description='Работаем с дизайнерскими материалами. Любая форма оплаты. Предоставляем закрывающие документы. Приедем для замеров на объект.',
-            order=3,
-            is_active=True
-        )
-        
-        WhyChooseUs.objects.create(
-            title='ГАРАНТИИ',
-            description='Гарантийный срок по ГК РФ. Сервисное обслуживание. Страхование на период СМР. Финансовая ответственность',
-            order=4,
-            is_active=True
-        )
-        
-        WhyChooseUs.objects.create(
-            title='ВНИМАТЕЛЬНОСТЬ',
-            description='К пожеланиям заказчика. На совещаниях о проектных правках. Обращаем внимание на детали и мелочи. Всегда убираем за собой мусор.',
-            order=5,
-            is_active=True
-        )
-        
-        WhyChooseUs.objects.create(
-            title='ОТВЕТСТВЕННОСТЬ',
-            description='Перед взятыми на себя обязательствами. За соблюдение сроков. Поддерживаем культуру производства работ. Контролируем качество выполнения работ.',
-            order=6,
-            is_active=True
-        )
+        self.stdout.write('Создание демо-данных...')
+        self.create_demo_data(images)
 
-        # Создание отзывов клиентов
-        self.stdout.write('Создание отзывов клиентов...')
-        ClientReview.objects.create(
-            full_name='Иванов Сергей Владимирович',
-            comment='Хочу поблагодарить компанию ПВВ Строй! Я доволен все мои направлений нет. Мой проект закончили даже раньше срока.',
-            rating=5,
-            is_active=True
-        )
-        
-        ClientReview.objects.create(
-            full_name='Николай Власович',
-            comment='Все понравилось, спасибо, сделали работу быстро и качественно рекомендую!',
-            rating=5,
-            is_active=True
-        )
-        
-        ClientReview.objects.create(
-            full_name='Стрелков Евгений Юрьевич',
-            comment='Спасибо большое за работу! Установили фундамент быстро, качественно провели монтаж. Работа сделана оперативно, ребята приятные, отзывчивые!',
-            rating=5,
-            is_active=True
-        )
-        
-        ClientReview.objects.create(
-            full_name='Вадим Алексеев',
-            comment='Работа выполнена на высоком уровне, аккуратно и качественно, все сделали очень быстро. обращайтесь только к ним!',
-            rating=5,
-            is_active=True
-        )
+        if options['scale']:
+            volume = seeding.scaled_volume(options['scale'])
+            if not include_callbacks:
+                volume['callbacks'] = 0
+            self.stdout.write(f'Создание сгенерированных данных (--scale {options["scale"]})...')
+            created = seeding.seed(volume, batch_size=options['batch_size'], images=images)
+            for key, count in created.items():
+                self.stdout.write(f'  + {key}: {count}')
 
-        self.stdout.write(self.style.SUCCESS('Тестовые данные успешно созданы!'))
-        self.stdout.write(f'  - Главных категорий: {MainCategory.objects.count()}')
-        self.stdout.write(f'  - Подкатегорий: {SubCategory.objects.count()}')
+        # bulk_create не отправляет post_save: одно уведомление на модель (версии и кэш главной)
+        with transaction.atomic():
+            # TRUNCATE обходит поддержку сводки рейтинга: пересчёт одним GROUP BY
+            ClientReviewSummary.objects.rebuild()
+            for model in seeding.SEEDED_MODELS:
+                content_changed(model)
+
+        self.stdout.write(self.style.SUCCESS(f'Тестовые данные успешно созданы за {time.perf_counter() - started:.1f} с'))
+        self.stdout.write(f'  - Главных категорий: {Category.objects.filter(parent__isnull=True).count()}')
+        self.stdout.write(f'  - Подкатегорий: {Category.objects.filter(parent__isnull=False).count()}')
         self.stdout.write(f'  - Шагов работы: {WorkStep.objects.count()}')
         self.stdout.write(f'  - YouTube видео: {YouTubeVideo.objects.count()}')
         self.stdout.write(f'  - Преимуществ: {WhyChooseUs.objects.count()}')
         self.stdout.write(f'  - Отзывов клиентов: {ClientReview.objects.count()}')
+        if images:
+            self.stdout.write('Варианты изображений: python manage.py build_image_variants')
+
+    def create_images(self, count, workers):
+        self.stdout.write(f'Создание изображений-заглушек ({count}, процессов: {workers})...')
+        names = [f'placeholders/placeholder_{i:04d}.jpg' for i in range(count)]
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [
+                pool.submit(imaging.placeholder, default_storage.location, name, seed=i)
+                for i, name in enumerate(names)
+            ]
+            return [future.result() for future in futures]
+
+    def create_demo_data(self, images):
+        image = cycle(images or [''])
+        with transaction.atomic():
+            mains = Category.objects.bulk_create([Category(name=name, is_active=True) for name in CATEGORIES])
+            Category.objects.bulk_create([
+                Category(name=name, parent=main, is_active=True)
+                for main in mains for name in CATEGORIES[main.name]
+            ])
+            WorkStep.objects.bulk_create([
+                WorkStep(step_number=number, title=title, description=description, image=next(image))
+                for number, (title, description) in enumerate(WORK_STEPS, start=1)
+            ])
+            YouTubeVideo.objects.bulk_create([
+                YouTubeVideo(title=title, youtube_url=url, viewers=viewers, thumbnail=next(image) or None)
+                for title, url, viewers in VIDEOS
+            ])
+            WhyChooseUs.objects.bulk_create([
+                WhyChooseUs(title=title, description=description, order=order, is_active=True)
+                for order, (title, description) in enumerate(WHY_CHOOSE_US, start=1)
+            ])
+            ClientReview.objects.bulk_create([
+                ClientReview(full_name=full_name, comment=comment, rating=5, is_active=True)
+                for full_name, comment in REVIEWS
+            ])
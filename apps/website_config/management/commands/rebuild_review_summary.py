@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.website_config.models import ClientReview, ClientReviewSummary
+from apps.website_config.signals import content_changed
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать сводку рейтинга отзывов с нуля (после ручных правок в БД или TRUNCATE)'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            previous = ClientReviewSummary.objects.lock()
+            summary = ClientReviewSummary.objects.rebuild()
+            # Версия отзывов (ETag) и секция главной страницы обновляются после коммита
+            content_changed(ClientReview)
+
+        if previous is not None and (previous.count, previous.rating_sum, previous.histogram) != (
+            summary.count, summary.rating_sum, summary.histogram
+        ):
+            self.stdout.write(self.style.WARNING(
+                f'Сводка расходилась с отзывами: было {previous.count} / {previous.rating_sum} '
+                f'{previous.histogram}'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Отзывов: {summary.count}, средняя оценка: {summary.average}, по звёздам: {summary.histogram}'
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.website_config import ingestion
+
+
+class Command(BaseCommand):
+    help = (
+        'Записать в БД заявки и отзывы из spill-файлов аварийно завершившихся процессов '
+        '(INGESTION_SPILL_DIR). Запускать при старте сервера: файлы работающих процессов не трогаются'
+    )
+
+    def handle(self, *args, **options):
+        for buffer in (ingestion.callback_requests, ingestion.client_reviews):
+            recovered = buffer.recover()
+            self.stdout.write(f'{buffer.name}: восстановлено {recovered}')
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website_config', '0010_callbackrequest_alter_clientreview_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100, unique=True, verbose_name='Модель')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Версия')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Версия контента',
+                'verbose_name_plural': 'Версии контента',
+                'db_table': 'content_versions',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='callbackrequest',
+            options={'ordering': ['-created_at'], 'verbose_name': 'Заявка на звонок', 'verbose_name_plural': '08. Заявки на обратный звонок'},
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:20
+
+from django.contrib.postgres import operations as postgres_operations
+from django.db import migrations, models
+
+
+class AddIndexConcurrently(postgres_operations.AddIndexConcurrently):
+    """CREATE INDEX CONCURRENTLY в PostgreSQL (запись в таблицу не блокируется), обычный CREATE INDEX на других БД"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+    # CONCURRENTLY нельзя выполнять в транзакции
+    atomic = False
+
+    dependencies = [
+        ('website_config', '0012_image_variants'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='callbackrequest',
+            index=models.Index(fields=['is_processed', '-created_at', '-id'], name='callbacks_processed_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='category',
+            index=models.Index(condition=models.Q(('is_active', True), ('parent__isnull', True)), fields=['-id'], name='categories_main_active_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='category',
+            index=models.Index(condition=models.Q(('is_active', True), ('parent__isnull', False)), fields=['parent', 'name'], name='categories_sub_active_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='clientreview',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at', '-id'], name='client_reviews_active_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='clientreview',
+            index=models.Index(fields=['is_active', '-created_at', '-id'], name='client_reviews_moder_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='ourproject',
+            index=models.Index(fields=['-created_at', '-id'], name='our_projects_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='servicedetails',
+            index=models.Index(fields=['category', 'order', 'created_at', 'id'], name='service_details_category_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='whychooseus',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['order', 'created_at'], name='why_choose_us_active_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='youtubevideo',
+            index=models.Index(fields=['-created_at'], name='youtube_videos_created_idx'),
+        ),
+    ]
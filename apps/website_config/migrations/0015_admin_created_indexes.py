@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:35
+
+from django.contrib.postgres import operations as postgres_operations
+from django.db import migrations, models
+
+
+class AddIndexConcurrently(postgres_operations.AddIndexConcurrently):
+    """CREATE INDEX CONCURRENTLY в PostgreSQL (запись в таблицу не блокируется), обычный CREATE INDEX на других БД"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+    # CONCURRENTLY нельзя выполнять в транзакции
+    atomic = False
+
+    dependencies = [
+        ('website_config', '0014_search_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='callbackrequest',
+            index=models.Index(fields=['-created_at', '-id'], name='callbacks_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='clientreview',
+            index=models.Index(fields=['-created_at', '-id'], name='client_reviews_created_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:45
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def build_summary(apps, schema_editor):
+    ClientReview = apps.get_model('website_config', 'ClientReview')
+    ClientReviewSummary = apps.get_model('website_config', 'ClientReviewSummary')
+    histogram = dict(
+        ClientReview.objects.filter(is_active=True).order_by().values_list('rating').annotate(count=models.Count('pk'))
+    )
+    ClientReviewSummary.objects.update_or_create(pk=1, defaults={
+        'count': sum(histogram.values()),
+        'rating_sum': sum(rating * count for rating, count in histogram.items()),
+        **{f'rating_{rating}': histogram.get(rating, 0) for rating in range(1, 6)},
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website_config', '0016_category_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientReviewSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Отзывов')),
+                ('rating_sum', models.PositiveBigIntegerField(default=0, verbose_name='Сумма оценок')),
+                ('rating_1', models.PositiveIntegerField(default=0, verbose_name='1 звезда')),
+                ('rating_2', models.PositiveIntegerField(default=0, verbose_name='2 звезды')),
+                ('rating_3', models.PositiveIntegerField(default=0, verbose_name='3 звезды')),
+                ('rating_4', models.PositiveIntegerField(default=0, verbose_name='4 звезды')),
+                ('rating_5', models.PositiveIntegerField(default=0, verbose_name='5 звёзд')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Сводка рейтинга отзывов',
+                'verbose_name_plural': 'Сводка рейтинга отзывов',
+                'db_table': 'client_review_summary',
+            },
+        ),
+        migrations.AlterField(
+            model_name='clientreview',
+            name='rating',
+            field=models.IntegerField(default=5, help_text='От 1 до 5 звезд', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)], verbose_name='Рейтинг'),
+        ),
+        migrations.RunPython(build_summary, migrations.RunPython.noop),
+    ]
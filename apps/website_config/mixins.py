@@ -0,0 +1,79 @@
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from . import versions
+from .fast_serializers import compile_serializer
+
+
+class NotModified(Exception):
+    """Ответ 304 до выполнения запроса и сериализации"""
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """Условные GET-запросы (If-None-Match / If-Modified-Since) для read-only API.
+
+    Валидатор строится по версиям моделей из ``conditional_models`` (см.
+    ``versions.py``). Если клиент прислал актуальный ETag или дату, view
+    отвечает 304 сразу после проверки прав, не выполняя выборку и сериализацию.
+    """
+    conditional_models = ()
+
+    def get_conditional_models(self):
+        return self.conditional_models
+
+    def get_validator_key(self, request):
+        return versions.request_key(request, request.accepted_media_type)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = self.last_modified = None
+        if request.method not in ('GET', 'HEAD'):
+            return
+        self.etag, self.last_modified = versions.get_validators(
+            self.get_conditional_models(), key=self.get_validator_key(request)
+        )
+        response = get_conditional_response(
+            request._request,
+            etag=self.etag,
+            last_modified=int(self.last_modified.timestamp()) if self.last_modified else None,
+        )
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'etag', None) and response.status_code in (200, 304):
+            response.headers['ETag'] = self.etag
+            if self.last_modified:
+                response.headers['Last-Modified'] = http_date(self.last_modified.timestamp())
+        return response
+
+
+class CompiledListMixin:
+    """Быстрый read-only ``list()`` через скомпилированный сериализатор.
+
+    Строки выбираются через ``.values()`` и сериализуются планом из
+    ``fast_serializers.py``; ответ совпадает с ``serializer_class`` байт в байт.
+    ``use_compiled_serializer = False`` возвращает обычный путь DRF.
+    """
+    use_compiled_serializer = True
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_compiled_serializer:
+            return super().list(request, *args, **kwargs)
+        compiled = compile_serializer(self.get_serializer_class())
+        queryset = compiled.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(compiled.serialize(page, request))
+        return Response(compiled.serialize(queryset, request))
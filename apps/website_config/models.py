@@ -1,28 +1,179 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import models, transaction
+from django.db.models.functions import Cast, Concat, Substr
+from django.utils import timezone
+
+
+PATH_SEPARATOR = '/'
+
+
+def category_path(parent_path, pk):
+    """Материализованный путь узла: ID от корня через '/', с завершающим '/' ('1/5/9/')"""
+    return f'{parent_path}{pk}{PATH_SEPARATOR}'
+
+
+class CategoryQuerySet(models.QuerySet):
+    def subtree(self, node, depth=None, include_self=True):
+        """Поддерево узла одним запросом по индексу path (диапазон LIKE 'путь%').
+
+        ``depth`` - сколько уровней под узлом включать (None - все).
+        """
+        queryset = self.filter(path__startswith=node.path)
+        if not include_self:
+            queryset = queryset.filter(depth__gt=node.depth)
+        if depth is not None:
+            queryset = queryset.filter(depth__lte=node.depth + depth)
+        return queryset
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk_create не вызывает save(): пути новых строк заполняются UPDATE на уровень дерева"""
+        with transaction.atomic(using=self.db, savepoint=False):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            Category.objects.fill_paths()
+        pks = [obj.pk for obj in objs if obj.pk is not None]
+        paths = {pk: (path, depth) for pk, path, depth in Category.objects.filter(pk__in=pks).values_list('pk', 'path', 'depth')}
+        for obj in objs:
+            obj.path, obj.depth = paths.get(obj.pk, (obj.path, obj.depth))
+        return objs
+
+    def fill_paths(self):
+        """Заполнить path и depth строк выборки без пути; родители должны иметь путь или быть в выборке"""
+        pending = self.filter(path='')
+        pending.filter(parent__isnull=True).update(
+            path=Concat(Cast('id', models.CharField()), models.Value(PATH_SEPARATOR)), depth=0,
+        )
+        parent = Category.objects.filter(pk=models.OuterRef('parent_id')).order_by()
+        # Каждый UPDATE заполняет следующий уровень: детей строк, у которых путь уже есть.
+        # parent_id IN (подзапрос) без JOIN и без списка ID: план остаётся линейным на больших пачках
+        while pending.filter(parent__in=Category.objects.exclude(path='').values('pk')).update(
+            path=Concat(
+                models.Subquery(parent.values('path')),
+                Cast('id', models.CharField()),
+                models.Value(PATH_SEPARATOR),
+            ),
+            depth=models.Subquery(parent.values('depth')) + 1,
+        ):
+            pass
 
 
 class Category(models.Model):
-    """Базовая модель категории"""
+    """Базовая модель категории.
+
+    Иерархия произвольной глубины хранится материализованным путём ``path``
+    (ID предков и самого узла) и глубиной ``depth``: поддерево, предки и
+    хлебные крошки выбираются одним индексным запросом без рекурсии. Путь
+    поддерживается в ``save()`` (включая перенос ветки) и в ``bulk_create``;
+    ``update(parent=...)`` путь не пересчитывает.
+    """
     name = models.CharField(max_length=255, verbose_name="Название")
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children', verbose_name="Родительская категория")
+    path = models.CharField(max_length=255, default='', editable=False, verbose_name="Путь")
+    depth = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name="Уровень")
     is_active = models.BooleanField(default=True, verbose_name="Активна")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
 
+    objects = CategoryQuerySet.as_manager()
+
     class Meta:
         db_table = 'categories'
         verbose_name = "Категория"
         verbose_name_plural = "Категории"
         ordering = ['name']
+        indexes = [
+            # Активные главные категории (список и главная страница, ORDER BY id DESC)
+            models.Index(
+                fields=['-id'], name='categories_main_active_idx',
+                condition=models.Q(parent__isnull=True, is_active=True),
+            ),
+            # Активные подкатегории для prefetch по parent_id IN (...)
+            models.Index(
+                fields=['parent', 'name'], name='categories_sub_active_idx',
+                condition=models.Q(parent__isnull=False, is_active=True),
+            ),
+            # GIN-индекс полнотекстового поиска (search.py) - в миграции 0014_search_indexes, только PostgreSQL
+            # Поддеревья: path LIKE 'путь%' при любой сортировке (collation) базы
+            models.Index(fields=['path'], name='categories_path_idx', opclasses=['varchar_pattern_ops']),
+        ]
 
     def __str__(self):
         return self.name
 
-
-class MainCategoryManager(models.Manager):
+    @property
+    def ancestor_ids(self):
+        """ID предков от корня, без запроса к БД"""
+        return [int(pk) for pk in self.path.split(PATH_SEPARATOR)[:-2]]
+
+    def get_ancestors(self):
+        """Предки от корня одним запросом по первичному ключу"""
+        return Category.objects.filter(pk__in=self.ancestor_ids).order_by('depth')
+
+    def get_breadcrumbs(self):
+        """Предки и сам узел от корня"""
+        return Category.objects.filter(pk__in=self.ancestor_ids + [self.pk]).order_by('depth')
+
+    def get_descendants(self, depth=None):
+        return Category.objects.subtree(self, depth=depth, include_self=False)
+
+    def is_in_path(self, path):
+        """Узел - один из узлов пути ``path`` (сам узел или предок)"""
+        return f'{PATH_SEPARATOR}{self.pk}{PATH_SEPARATOR}' in PATH_SEPARATOR + path
+
+    def clean(self):
+        super().clean()
+        if self.pk and self.parent_id:
+            parent_path = Category.objects.filter(pk=self.parent_id).values_list('path', flat=True).first() or ''
+            if self.is_in_path(parent_path):
+                raise ValidationError({'parent': 'Категорию нельзя перенести в саму себя или в её подкатегорию'})
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            self.update_path()
+
+    def update_path(self):
+        """Пересчитать путь узла и одним UPDATE перенести его поддерево (после переноса ветки)"""
+        rows = dict(
+            (pk, (path, depth))
+            for pk, path, depth in Category.objects.select_for_update()
+            .filter(pk__in=[self.pk, self.parent_id]).values_list('pk', 'path', 'depth')
+        )
+        old_path, old_depth = rows[self.pk]
+        if self.parent_id is None:
+            new_path, new_depth = category_path('', self.pk), 0
+        else:
+            parent_path, parent_depth = rows[self.parent_id]
+            if self.is_in_path(parent_path):
+                raise ValueError('Категорию нельзя перенести в саму себя или в её подкатегорию')
+            new_path, new_depth = category_path(parent_path, self.pk), parent_depth + 1
+        if (new_path, new_depth) != (old_path, old_depth):
+            if old_path:
+                Category.objects.filter(path__startswith=old_path).update(
+                    path=Concat(models.Value(new_path), Substr('path', len(old_path) + 1)),
+                    depth=models.F('depth') + (new_depth - old_depth),
+                )
+            else:
+                Category.objects.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+        self.path, self.depth = new_path, new_depth
+
+
+class MainCategoryManager(models.Manager.from_queryset(CategoryQuerySet)):
     def get_queryset(self):
         return super().get_queryset().filter(parent__isnull=True)
 
+    def active_tree(self):
+        """Активные главные категории вместе с активными подкатегориями и их деталями.
+
+        Всё дерево загружается за фиксированное число запросов (категории,
+        подкатегории, детали) независимо от размера каталога. Подкатегории
+        доступны в атрибуте ``active_sub_categories``.
+        """
+        sub_categories = SubCategory.objects.filter(is_active=True).prefetch_related('service_details')
+        return self.get_queryset().filter(is_active=True).prefetch_related(
+            models.Prefetch('children', queryset=sub_categories, to_attr='active_sub_categories')
+        )
+
 
 class MainCategory(Category):
     """Прокси модель для главных категорий"""
@@ -34,7 +185,7 @@ class MainCategory(Category):
         verbose_name_plural = "01. Главные категории"
 
 
-class SubCategoryManager(models.Manager):
+class SubCategoryManager(models.Manager.from_queryset(CategoryQuerySet)):
     def get_queryset(self):
         return super().get_queryset().filter(parent__isnull=False)
 
@@ -53,6 +204,7 @@ class ServiceDetails(models.Model):
     """Детали услуг для подкатегорий"""
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='service_details', verbose_name="Категория")
     image = models.ImageField(upload_to='services/details/', verbose_name="Изображение")
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Варианты изображения")
     order = models.IntegerField(default=0, verbose_name="Порядок")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
 
@@ -61,6 +213,9 @@ class ServiceDetails(models.Model):
         verbose_name = "Деталь услуги"
         verbose_name_plural = "Детали услуг"
         ordering = ['order', 'created_at']
+        indexes = [
+            models.Index(fields=['category', 'order', 'created_at', 'id'], name='service_details_category_idx'),
+        ]
 
     def __str__(self):
         return f"Деталь для {self.category.name}"
@@ -69,6 +224,7 @@ class ServiceDetails(models.Model):
 class OurProject(models.Model):
     """Наши проекты - галерея проектов"""
     image = models.ImageField(upload_to='projects/', verbose_name="Изображение")
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Варианты изображения")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
 
     class Meta:
@@ -76,6 +232,9 @@ class OurProject(models.Model):
         verbose_name = "Наш проект"
         verbose_name_plural = "03. Наши проекты"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='our_projects_created_idx'),
+        ]
 
     def __str__(self):
         return f"Проект #{self.id}"
@@ -87,6 +246,7 @@ class WorkStep(models.Model):
     title = models.CharField(max_length=255, verbose_name="Заголовок")
     description = models.TextField(verbose_name="Описание")
     image = models.ImageField(upload_to='work_steps/', verbose_name="Изображение")
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Варианты изображения")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
 
     class Meta:
@@ -104,6 +264,7 @@ class YouTubeVideo(models.Model):
     title = models.CharField(max_length=255, verbose_name="Название")
     youtube_url = models.URLField(verbose_name="Ссылка YouTube")
     thumbnail = models.ImageField(upload_to='youtube_thumbnails/', blank=True, null=True, verbose_name="Обложка")
+    thumbnail_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Варианты обложки")
     viewers = models.IntegerField(default=0, verbose_name="Просмотров")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
 
@@ -112,6 +273,9 @@ class YouTubeVideo(models.Model):
         verbose_name = "YouTube видео"
         verbose_name_plural = "05. YouTube видео"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='youtube_videos_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -130,29 +294,215 @@ class WhyChooseUs(models.Model):
         verbose_name = "Преимущество"
         verbose_name_plural = "06. Почему выбирают нас"
         ordering = ['order', 'created_at']
+        indexes = [
+            models.Index(
+                fields=['order', 'created_at'], name='why_choose_us_active_idx',
+                condition=models.Q(is_active=True),
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
 
+RATINGS = range(1, 6)
+
+
+def rating_histogram(queryset):
+    """{рейтинг: число строк} одним GROUP BY"""
+    return dict(queryset.order_by().values_list('rating').annotate(count=models.Count('pk')))
+
+
+class ClientReviewQuerySet(models.QuerySet):
+    """Массовые операции с отзывами поддерживают сводку рейтинга в той же транзакции"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db, savepoint=False):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            added = {}
+            for obj in objs:
+                if obj.is_active:
+                    added[obj.rating] = added.get(obj.rating, 0) + 1
+            if added:
+                ClientReviewSummary.objects.apply(added=added)
+        return objs
+
+    def update(self, **kwargs):
+        if not {'is_active', 'rating'} & set(kwargs):
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db, savepoint=False):
+            ClientReviewSummary.objects.lock()
+            is_active = kwargs.get('is_active')
+            if 'rating' in kwargs or not isinstance(is_active, bool):
+                # Выражения и смена рейтинга - редкий случай: сводка пересчитывается целиком
+                count = super().update(**kwargs)
+                ClientReviewSummary.objects.rebuild()
+                return count
+            # Публикация / снятие: меняют вклад только строки с другим значением is_active
+            changed = rating_histogram(self.exclude(is_active=is_active))
+            count = super().update(**kwargs)
+            if changed:
+                ClientReviewSummary.objects.apply(**{'added' if is_active else 'removed': changed})
+        return count
+
+    def delete(self):
+        with transaction.atomic(using=self.db, savepoint=False):
+            ClientReviewSummary.objects.lock()
+            removed = rating_histogram(self.filter(is_active=True))
+            result = super().delete()
+            if removed:
+                ClientReviewSummary.objects.apply(removed=removed)
+        return result
+
+
 class ClientReview(models.Model):
-    """Отзывы клиентов"""
+    """Отзывы клиентов.
+
+    Сводка рейтинга опубликованных отзывов (``ClientReviewSummary``)
+    обновляется в той же транзакции при ``save()``, ``delete()`` и массовых
+    операциях ``bulk_create`` / ``update`` / ``delete`` менеджера.
+    """
     full_name = models.CharField(max_length=255, verbose_name="ФИО клиента")
     comment = models.TextField(verbose_name="Отзыв")
     rating = models.IntegerField(default=5, verbose_name="Рейтинг", 
-                                 help_text="От 1 до 5 звезд")
+                                 help_text="От 1 до 5 звезд",
+                                 validators=[MinValueValidator(RATINGS[0]), MaxValueValidator(RATINGS[-1])])
     is_active = models.BooleanField(default=True, verbose_name="Активно")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
 
+    objects = ClientReviewQuerySet.as_manager()
+
     class Meta:
         db_table = 'client_reviews'
         verbose_name = "Отзыв клиента"
         verbose_name_plural = "07. Отзывы клиентов"
         ordering = ['-created_at']
+        indexes = [
+            # Опубликованные отзывы, новые первыми (включая keyset-пагинацию по -created_at, -id)
+            models.Index(
+                fields=['-created_at', '-id'], name='client_reviews_active_idx',
+                condition=models.Q(is_active=True),
+            ),
+            # Модерация в админке: is_active + сортировка по дате
+            models.Index(fields=['is_active', '-created_at', '-id'], name='client_reviews_moder_idx'),
+            # Админка без фильтров и date_hierarchy по created_at
+            models.Index(fields=['-created_at', '-id'], name='client_reviews_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.full_name} - {self.rating}★"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {'is_active', 'rating'} & set(update_fields):
+            return super().save(*args, **kwargs)
+        if self._state.adding and not self.is_active:
+            # Новый отзыв на модерации (форма на сайте) сводку не меняет
+            return super().save(*args, **kwargs)
+        with transaction.atomic(using=kwargs.get('using')):
+            # Блокировка сводки упорядочивает конкурирующие изменения: прежнее состояние читается из БД
+            ClientReviewSummary.objects.lock()
+            previous = None
+            if self.pk is not None:
+                previous = ClientReview.objects.filter(pk=self.pk, is_active=True).values_list('rating', flat=True).first()
+            super().save(*args, **kwargs)
+            current = self.rating if self.is_active else None
+            if previous != current:
+                ClientReviewSummary.objects.apply(
+                    added={current: 1} if current is not None else {},
+                    removed={previous: 1} if previous is not None else {},
+                )
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            ClientReviewSummary.objects.lock()
+            previous = ClientReview.objects.filter(pk=self.pk, is_active=True).values_list('rating', flat=True).first()
+            result = super().delete(*args, **kwargs)
+            if previous is not None:
+                ClientReviewSummary.objects.apply(removed={previous: 1})
+        return result
+
+
+class ClientReviewSummaryManager(models.Manager):
+    def lock(self):
+        """Заблокировать строку сводки до конца транзакции"""
+        return self.select_for_update().filter(pk=ClientReviewSummary.SINGLETON_ID).first()
+
+    def apply(self, added=None, removed=None):
+        """Прибавить / вычесть рейтинги ``{рейтинг: число отзывов}`` одним UPDATE"""
+        delta = {}
+        for histogram, sign in ((added or {}, 1), (removed or {}, -1)):
+            for rating, count in histogram.items():
+                delta[rating] = delta.get(rating, 0) + sign * count
+        delta = {rating: count for rating, count in delta.items() if count}
+        if not delta:
+            return
+        values = {
+            'count': models.F('count') + sum(delta.values()),
+            'rating_sum': models.F('rating_sum') + sum(rating * count for rating, count in delta.items()),
+            'updated_at': timezone.now(),
+        }
+        for rating, count in delta.items():
+            if rating in RATINGS:
+                values[f'rating_{rating}'] = models.F(f'rating_{rating}') + count
+        if not self.filter(pk=ClientReviewSummary.SINGLETON_ID).update(**values):
+            # Строки нет (например, после TRUNCATE): считаем с нуля, изменения транзакции уже видны
+            self.rebuild()
+
+    def rebuild(self):
+        """Пересчитать сводку по всем опубликованным отзывам"""
+        histogram = rating_histogram(ClientReview.objects.filter(is_active=True))
+        summary, _ = self.update_or_create(pk=ClientReviewSummary.SINGLETON_ID, defaults={
+            'count': sum(histogram.values()),
+            'rating_sum': sum(rating * count for rating, count in histogram.items()),
+            **{f'rating_{rating}': histogram.get(rating, 0) for rating in RATINGS},
+        })
+        return summary
+
+    def get_summary(self):
+        """Сводка одним чтением по первичному ключу (при отсутствии строки - пересчёт)"""
+        summary = self.filter(pk=ClientReviewSummary.SINGLETON_ID).first()
+        if summary is None:
+            summary = self.rebuild()
+        return summary
+
+
+class ClientReviewSummary(models.Model):
+    """Сводка рейтинга опубликованных отзывов: число, сумма и распределение по звёздам.
+
+    Единственная строка поддерживается инкрементально (см. ``ClientReview``),
+    поэтому чтение не зависит от числа отзывов. Пересчёт с нуля:
+    ``python manage.py rebuild_review_summary``.
+    """
+    SINGLETON_ID = 1
+
+    count = models.PositiveIntegerField(default=0, verbose_name="Отзывов")
+    rating_sum = models.PositiveBigIntegerField(default=0, verbose_name="Сумма оценок")
+    rating_1 = models.PositiveIntegerField(default=0, verbose_name="1 звезда")
+    rating_2 = models.PositiveIntegerField(default=0, verbose_name="2 звезды")
+    rating_3 = models.PositiveIntegerField(default=0, verbose_name="3 звезды")
+    rating_4 = models.PositiveIntegerField(default=0, verbose_name="4 звезды")
+    rating_5 = models.PositiveIntegerField(default=0, verbose_name="5 звёзд")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+
+    objects = ClientReviewSummaryManager()
+
+    class Meta:
+        db_table = 'client_review_summary'
+        verbose_name = "Сводка рейтинга отзывов"
+        verbose_name_plural = "Сводка рейтинга отзывов"
+
+    def __str__(self):
+        return f"{self.count} отзывов, {self.average}★"
+
+    @property
+    def average(self):
+        return round(self.rating_sum / self.count, 2) if self.count else None
+
+    @property
+    def histogram(self):
+        return {rating: getattr(self, f'rating_{rating}') for rating in RATINGS}
+
 
 class CallbackRequest(models.Model):
     """Заявки на обратный звонок"""
@@ -166,6 +516,27 @@ class CallbackRequest(models.Model):
         verbose_name = "Заявка на звонок"
         verbose_name_plural = "08. Заявки на обратный звонок"
         ordering = ['-created_at']
+        indexes = [
+            # Админка: фильтр is_processed + сортировка по дате
+            models.Index(fields=['is_processed', '-created_at', '-id'], name='callbacks_processed_idx'),
+            # Админка без фильтров и date_hierarchy по created_at
+            models.Index(fields=['-created_at', '-id'], name='callbacks_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.phone}"
+
+
+class ContentVersion(models.Model):
+    """Версия контента модели для условных GET-запросов (ETag / Last-Modified)"""
+    model = models.CharField(max_length=100, unique=True, verbose_name="Модель")
+    version = models.PositiveBigIntegerField(default=0, verbose_name="Версия")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+
+    class Meta:
+        db_table = 'content_versions'
+        verbose_name = "Версия контента"
+        verbose_name_plural = "Версии контента"
+
+    def __str__(self):
+        return f"{self.model} v{self.version}"
@@ -0,0 +1,163 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_value(value):
+    # Полная точность: DjangoJSONEncoder обрезает микросекунды до миллисекунд
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не поддерживается в курсоре')
+
+
+class KeysetPagination(BasePagination):
+    """Опциональная keyset (cursor) пагинация по индексируемой сортировке.
+
+    Включается только если в запросе есть ``cursor`` или ``page_size``; без
+    них список отдаётся целиком, как раньше. Следующая страница выбирается
+    условием ``WHERE (поля сортировки) > (значения последней строки)``, поэтому
+    время ответа не зависит от номера страницы (без OFFSET). Курсор - base64
+    от значений сортировки последней строки; ``id`` добавляется к сортировке
+    для однозначности.
+    """
+    ordering = ('-created_at',)
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    invalid_cursor_message = 'Неверный курсор'
+
+    def get_ordering(self):
+        ordering = list(self.ordering)
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+
+    def get_page_size(self, params):
+        try:
+            page_size = int(params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def encode_cursor(self, position):
+        data = json.dumps(position, default=_encode_value, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode_cursor(self, cursor, model, ordering):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            position = json.loads(raw)
+            if not isinstance(position, list) or len(position) != len(ordering):
+                raise ValueError
+            return [model._meta.get_field(name).to_python(value) for (name, _), value in zip(ordering, position)]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def build_filter(self, ordering, position):
+        """(a, b, id) после позиции с учётом направления каждого поля"""
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(ordering, position):
+            condition |= Q(**equal, **{f'{name}__{"lt" if descending else "gt"}': value})
+            equal[name] = value
+        # Граница по первому полю позволяет использовать индекс как диапазон
+        (first, descending), first_value = ordering[0], position[0]
+        return Q(**{f'{first}__{"lte" if descending else "gte"}': first_value}) & condition
+
+    @staticmethod
+    def get_position(row, ordering):
+        if isinstance(row, dict):
+            return [row[name] for name, _ in ordering]
+        return [getattr(row, name) for name, _ in ordering]
+
+    def get_page_queryset(self, queryset, request):
+        """Срез QuerySet для текущей страницы или None, если пагинация не запрошена.
+
+        Выборку выполняет вызывающий код (синхронно или через ``async for``),
+        после чего строки передаются в ``get_page``.
+        """
+        params = getattr(request, 'query_params', request.GET)
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        self.ordering_fields = self.get_ordering()
+        queryset = queryset.order_by(*[('-' if descending else '') + name for name, descending in self.ordering_fields])
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            position = self.decode_cursor(cursor, queryset.model, self.ordering_fields)
+            queryset = queryset.filter(self.build_filter(self.ordering_fields, position))
+
+        self.page_length = self.get_page_size(params)
+        return queryset[:self.page_length + 1]
+
+    def get_page(self, rows):
+        """Обрезать лишнюю строку и запомнить курсор следующей страницы"""
+        self.next_cursor = None
+        if len(rows) > self.page_length:
+            rows = rows[:self.page_length]
+            self.next_cursor = self.encode_cursor(self.get_position(rows[-1], self.ordering_fields))
+        return rows
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request)
+        if page_queryset is None:
+            return None
+        return self.get_page(list(page_queryset))
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Курсор следующей страницы (из поля next)',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Размер страницы (до {self.max_page_size}); без cursor и page_size список отдаётся целиком',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+class CreatedAtKeysetPagination(KeysetPagination):
+    """Новые записи первыми (проекты, отзывы)"""
+    ordering = ('-created_at',)
+
+
+class ServiceDetailsKeysetPagination(KeysetPagination):
+    """Галерея деталей услуг в порядке Meta.ordering"""
+    ordering = ('order', 'created_at')
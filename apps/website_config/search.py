@@ -0,0 +1,49 @@
+"""Полнотекстовый поиск PostgreSQL по контенту сайта.
+
+Документ строки - ``tsvector`` по двум конфигурациям: ``russian`` (со
+стеммингом) и ``simple`` (без стемминга, для узбекского текста: словаря
+узбекского языка в PostgreSQL нет). Вектор не хранится в таблице, а
+индексируется GIN-индексом по выражению ``document(...)`` (создаётся
+миграцией ``0014_search_indexes`` и только в PostgreSQL, в состояние моделей
+не входит): PostgreSQL сам поддерживает индекс при любой записи, включая ``bulk_create``
+и ``update()``. Запрос должен строить то же выражение, иначе индекс не
+используется.
+
+Документы приводятся к нижнему регистру самим PostgreSQL по LC_CTYPE базы:
+для кириллицы база должна быть создана с UTF-8 локалью (например,
+``ru_RU.UTF-8`` или ``C.UTF-8``), в локали ``C`` поиск по кириллице
+становится чувствительным к регистру.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchVector
+
+SEARCH_CONFIGS = ('russian', 'simple')
+
+
+def document(*fields):
+    """Вектор документа; ``fields`` - пары (поле, вес 'A'..'D')"""
+    vectors = [
+        SearchVector(field, config=config, weight=weight)
+        for field, weight in fields
+        for config in SEARCH_CONFIGS
+    ]
+    vector = vectors[0]
+    for other in vectors[1:]:
+        vector = vector + other
+    return vector
+
+
+def query(text):
+    """Запрос в синтаксисе веб-поиска («фраза в кавычках», -исключение, or) по обеим конфигурациям"""
+    # Регистр приводится в Python: не зависит от LC_CTYPE базы
+    text = text.lower()
+    queries = [SearchQuery(text, config=config, search_type='websearch') for config in SEARCH_CONFIGS]
+    result = queries[0]
+    for other in queries[1:]:
+        result = result | other
+    return result
+
+
+CATEGORY_DOCUMENT = document(('name', 'A'))
+WORK_STEP_DOCUMENT = document(('title', 'A'), ('description', 'B'))
+WHY_CHOOSE_US_DOCUMENT = document(('title', 'A'), ('description', 'B'))
+CLIENT_REVIEW_DOCUMENT = document(('comment', 'B'), ('full_name', 'C'))
@@ -0,0 +1,117 @@
+"""Массовое создание данных для бенчмарков и тестовых стендов.
+
+Все строки создаются через ``bulk_create`` пачками, без сигналов
+``post_save``: генерация вариантов изображений и пересборка кэша главной
+страницы не запускаются на каждую строку. Объекты строятся генераторами,
+поэтому в памяти одновременно находится не больше одной пачки.
+"""
+from itertools import cycle, islice
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from .models import (
+    Category, ServiceDetails, OurProject, WorkStep, YouTubeVideo, WhyChooseUs, ClientReview, CallbackRequest,
+)
+
+DEFAULT_VOLUME = {
+    'main_categories': 10,
+    'sub_categories': 5,  # на главную категорию
+    'service_details': 4,  # на подкатегорию
+    'projects': 200,
+    'work_steps': 5,
+    'videos': 50,
+    'why_choose_us': 6,
+    'reviews': 500,
+    'callbacks': 200,
+}
+# Эти объёмы заданы на родителя и при масштабировании не умножаются
+PER_PARENT = {'sub_categories', 'service_details'}
+
+# Модели контента в порядке создания (для очистки и уведомления об изменениях)
+SEEDED_MODELS = (Category, ServiceDetails, OurProject, WorkStep, YouTubeVideo, WhyChooseUs, ClientReview)
+
+
+def scaled_volume(scale):
+    """DEFAULT_VOLUME, умноженный на ``scale`` (объёмы на родителя остаются прежними)"""
+    return {key: value if key in PER_PARENT else value * scale for key, value in DEFAULT_VOLUME.items()}
+
+
+def truncate(models, reset_sequences=True):
+    """Очистить таблицы одним TRUNCATE (PostgreSQL) без загрузки объектов в коллектор каскадов.
+
+    Сигналы удаления не отправляются: вызывающий код сам сообщает об изменениях.
+    """
+    tables = [model._meta.db_table for model in models]
+    with transaction.atomic():
+        connection.ops.execute_sql_flush(
+            connection.ops.sql_flush(no_style(), tables, reset_sequences=reset_sequences)
+        )
+
+
+def bulk_create(model, objects, batch_size=1000):
+    """Создать объекты из итератора пачками по ``batch_size``; каждая пачка - своя транзакция"""
+    objects = iter(objects)
+    created = 0
+    while batch := list(islice(objects, batch_size)):
+        with transaction.atomic():
+            model.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def seed(volume=None, batch_size=1000, images=None):
+    """Создать данные в объёме ``volume`` (см. DEFAULT_VOLUME); возвращает число строк по моделям.
+
+    ``images`` - имена файлов в хранилище, которые по кругу назначаются полям
+    изображений (по умолчанию поля пустые).
+    """
+    volume = {**DEFAULT_VOLUME, **(volume or {})}
+    image = cycle(images) if images else cycle([''])
+    created = {}
+
+    # Главные категории и подкатегории нужны целиком: на них ссылаются следующие уровни
+    mains = Category.objects.bulk_create(
+        [Category(name=f'Категория {i + 1}', is_active=True) for i in range(volume['main_categories'])],
+        batch_size=batch_size,
+    )
+    subs = Category.objects.bulk_create(
+        [
+            Category(name=f'{main.name}.{j + 1}', parent=main, is_active=True)
+            for main in mains for j in range(volume['sub_categories'])
+        ],
+        batch_size=batch_size,
+    )
+    created['categories'] = len(mains) + len(subs)
+    created['service_details'] = bulk_create(ServiceDetails, (
+        ServiceDetails(category=sub, image=next(image), order=k)
+        for sub in subs for k in range(volume['service_details'])
+    ), batch_size)
+    created['projects'] = bulk_create(OurProject, (
+        OurProject(image=next(image)) for _ in range(volume['projects'])
+    ), batch_size)
+    first_step = (WorkStep.objects.order_by('-step_number').values_list('step_number', flat=True).first() or 0) + 1
+    created['work_steps'] = bulk_create(WorkStep, (
+        WorkStep(step_number=first_step + i, title=f'Шаг {first_step + i}', description='Описание шага', image=next(image))
+        for i in range(volume['work_steps'])
+    ), batch_size)
+    created['videos'] = bulk_create(YouTubeVideo, (
+        YouTubeVideo(
+            title=f'Видео {i + 1}', youtube_url='https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+            thumbnail=next(image) or None, viewers=i,
+        )
+        for i in range(volume['videos'])
+    ), batch_size)
+    created['why_choose_us'] = bulk_create(WhyChooseUs, (
+        WhyChooseUs(title=f'Преимущество {i + 1}', description='Описание преимущества', order=i)
+        for i in range(volume['why_choose_us'])
+    ), batch_size)
+    created['reviews'] = bulk_create(ClientReview, (
+        ClientReview(full_name=f'Клиент {i + 1}', comment='Отличная работа', rating=5 - i % 3, is_active=i % 4 != 0)
+        for i in range(volume['reviews'])
+    ), batch_size)
+    created['callbacks'] = bulk_create(CallbackRequest, (
+        CallbackRequest(name=f'Клиент {i + 1}', phone=f'+99890{i % 10000000:07d}', is_processed=i % 3 == 0)
+        for i in range(volume['callbacks'])
+    ), batch_size)
+    return created
@@ -1,13 +1,46 @@
+from django.core.files.storage import default_storage
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
-from .models import MainCategory, SubCategory, ServiceDetails, Category, OurProject, WorkStep, YouTubeVideo, WhyChooseUs, ClientReview, CallbackRequest
+from .imaging import VARIANT_FORMATS
+from .models import MainCategory, SubCategory, ServiceDetails, Category, OurProject, WorkStep, YouTubeVideo, WhyChooseUs, ClientReview, ClientReviewSummary, CallbackRequest
+
+
+def build_srcset(variants, url):
+    """srcset-строки по форматам: {"webp": "<url> 320w, <url> 640w", "jpeg": "..."}"""
+    return {
+        key: ', '.join(
+            f'{url(name)} {width}w' for width, name in sorted(variants[key].items(), key=lambda item: int(item[0]))
+        )
+        for key in VARIANT_FORMATS
+        if variants.get(key)
+    }
+
+
+@extend_schema_field({'type': 'object', 'additionalProperties': {'type': 'string'}})
+class ImageSrcsetField(serializers.Field):
+    """Уменьшенные варианты изображения в виде srcset-строк для <picture>/<img>"""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+
+        def url(name):
+            location = default_storage.url(name)
+            return request.build_absolute_uri(location) if request is not None else location
+
+        return build_srcset(value or {}, url)
 
 
 class ServiceDetailsSerializer(serializers.ModelSerializer):
     """Serializer для деталей услуг"""
+    image_srcset = ImageSrcsetField(source='image_variants')
     
     class Meta:
         model = ServiceDetails
-        fields = ['id', 'image', 'order', 'created_at']
+        fields = ['id', 'image', 'image_srcset', 'order', 'created_at']
 
 
 class SubCategorySerializer(serializers.ModelSerializer):
@@ -29,32 +62,47 @@ class MainCategoryWithSubsSerializer(serializers.ModelSerializer):
     
     def get_sub_category_list(self, obj):
         """Получаем список подкатегорий для главной категории"""
-        subcategories = SubCategory.objects.filter(parent=obj, is_active=True)
+        # Подкатегории уже загружены через MainCategory.objects.active_tree()
+        subcategories = getattr(obj, 'active_sub_categories', None)
+        if subcategories is None:
+            subcategories = SubCategory.objects.filter(parent=obj, is_active=True)
         return SubCategorySerializer(subcategories, many=True, context=self.context).data
 
 
 class OurProjectSerializer(serializers.ModelSerializer):
     """Serializer для наших проектов"""
+    image_srcset = ImageSrcsetField(source='image_variants')
     
     class Meta:
         model = OurProject
-        fields = ['id', 'image', 'created_at']
+        fields = ['id', 'image', 'image_srcset', 'created_at']
 
 
 class WorkStepSerializer(serializers.ModelSerializer):
     """Serializer для шагов работы"""
+    image_srcset = ImageSrcsetField(source='image_variants')
     
     class Meta:
         model = WorkStep
-        fields = ['id', 'step_number', 'title', 'description', 'image', 'created_at']
+        fields = ['id', 'step_number', 'title', 'description', 'image', 'image_srcset', 'created_at']
 
 
 class YouTubeVideoSerializer(serializers.ModelSerializer):
     """Serializer для YouTube видео"""
+    thumbnail_srcset = ImageSrcsetField(source='thumbnail_variants')
     
     class Meta:
         model = YouTubeVideo
-        fields = ['id', 'title', 'youtube_url', 'thumbnail', 'viewers', 'created_at']
+        fields = ['id', 'title', 'youtube_url', 'thumbnail', 'thumbnail_srcset', 'viewers', 'created_at']
+
+
+class VideoViewsBatchSerializer(serializers.Serializer):
+    """Serializer для пакета просмотров видео"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
 
 
 class WhyChooseUsSerializer(serializers.ModelSerializer):
@@ -88,6 +136,21 @@ class ClientReviewCreateSerializer(serializers.ModelSerializer):
         return value
 
 
+class ClientReviewSummarySerializer(serializers.ModelSerializer):
+    """Serializer для сводки рейтинга отзывов"""
+    average = serializers.FloatField(read_only=True, allow_null=True)
+    histogram = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ClientReviewSummary
+        fields = ['count', 'average', 'histogram']
+
+    @extend_schema_field(serializers.DictField(child=serializers.IntegerField()))
+    def get_histogram(self, obj):
+        """Число отзывов по звёздам: {"1": ..., "5": ...}"""
+        return {str(rating): count for rating, count in obj.histogram.items()}
+
+
 class CallbackRequestSerializer(serializers.ModelSerializer):
     """Serializer для заявок на обратный звонок"""
     
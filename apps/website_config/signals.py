@@ -0,0 +1,60 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import homepage, versions
+
+_pending = threading.local()
+
+
+def content_changed(model):
+    """Отметить изменение контента модели.
+
+    После коммита транзакции версия модели увеличивается, а затронутые секции
+    главной страницы пересобираются — один раз, сколько бы объектов в
+    транзакции ни изменилось.
+    """
+    model = model._meta.concrete_model
+    if model not in homepage.MODEL_SECTIONS:
+        return
+    pending = getattr(_pending, 'models', None)
+    if pending is None:
+        pending = _pending.models = set()
+    pending.add(model)
+    # Первый сработавший колбэк забирает все накопленные модели, остальные ничего не делают
+    transaction.on_commit(_flush_pending)
+
+
+def _flush_pending():
+    models = getattr(_pending, 'models', None)
+    if not models:
+        return
+    _pending.models = set()
+    versions.bump(models)
+    sections = set()
+    for model in models:
+        sections.update(homepage.sections_for_model(model))
+    homepage.rebuild(sections)
+
+
+def is_hidden(instance):
+    """Объект снят с публикации (``is_active=False``) и не виден в публичных ответах"""
+    return getattr(instance, 'is_active', True) is False
+
+
+@receiver(post_save)
+def on_content_saved(sender, instance, created, **kwargs):
+    # Новый скрытый объект (например, отзыв на модерации из публичной формы)
+    # опубликованный контент не меняет: ни версии, ни пересборки секций
+    if created and is_hidden(instance):
+        return
+    content_changed(sender)
+
+
+@receiver(post_delete)
+def on_content_deleted(sender, instance, **kwargs):
+    if is_hidden(instance):
+        return
+    content_changed(sender)
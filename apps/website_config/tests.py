@@ -1,3 +1,1452 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from config.cache import TieredCache, cache_settings
+from config.database import database_settings, pool_stats
+from config.metrics import cache_counters
+
+from . import counters, homepage, ingestion, throttling, versions
+from .counters import video_views
+from .fast_serializers import compile_serializer
+from .pagination import CreatedAtKeysetPagination
+from .ingestion import IngestionBuffer
+from .models import Category, MainCategory, SubCategory, ServiceDetails, OurProject, WorkStep, YouTubeVideo, WhyChooseUs, ClientReview, ClientReviewSummary, CallbackRequest, ContentVersion
+from .serializers import (
+    OurProjectSerializer, WorkStepSerializer, YouTubeVideoSerializer, WhyChooseUsSerializer, ClientReviewSerializer
+)
+from .views import YouTubeVideoListView
+
+
+def create_category_tree(main_count, sub_count, details_count):
+    """Создать каталог заданного размера"""
+    for i in range(main_count):
+        main = MainCategory.objects.create(name=f'Категория {i}')
+        for j in range(sub_count):
+            sub = SubCategory.objects.create(name=f'Подкатегория {i}.{j}', parent=main)
+            for k in range(details_count):
+                ServiceDetails.objects.create(category=sub, image=f'services/details/{i}-{j}-{k}.jpg', order=k)
+        # Неактивные подкатегории не должны попадать в ответ
+        SubCategory.objects.create(name=f'Скрытая {i}', parent=main, is_active=False)
+
+
+class MainCategoryListQueryCountTests(TestCase):
+    """Дерево категорий загружается за фиксированное число запросов"""
+
+    def test_query_count_does_not_grow_with_catalogue(self):
+        create_category_tree(main_count=1, sub_count=1, details_count=1)
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(reverse('main-categories-list'))
+        self.assertEqual(response.status_code, 200)
+
+        create_category_tree(main_count=10, sub_count=5, details_count=4)
+        with self.assertNumQueries(len(small.captured_queries)):
+            response = self.client.get(reverse('main-categories-list'))
+        self.assertEqual(response.status_code, 200)
+
+        results = response.json()['results']
+        self.assertEqual(len(results), 11)
+        self.assertEqual(len(results[0]['sub_category_list']), 5)
+        self.assertEqual(len(results[0]['sub_category_list'][0]['service_details']), 4)
+
+    def test_inactive_sub_categories_are_hidden(self):
+        create_category_tree(main_count=1, sub_count=2, details_count=0)
+        response = self.client.get(reverse('main-categories-list'))
+        names = [sub['name'] for sub in response.json()['results'][0]['sub_category_list']]
+        self.assertEqual(names, ['Подкатегория 0.0', 'Подкатегория 0.1'])
+
+
+class CategoryTreeTests(TestCase):
+    """Иерархия произвольной глубины на материализованном пути"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.repair = Category.objects.create(name='Ремонт')
+        cls.finishing = Category.objects.create(name='Отделка', parent=cls.repair)
+        cls.walls = Category.objects.create(name='Стены', parent=cls.finishing)
+        cls.wallpaper = Category.objects.create(name='Обои', parent=cls.walls)
+        cls.hidden = Category.objects.create(name='Скрытая', parent=cls.repair, is_active=False)
+        Category.objects.create(name='Под скрытой', parent=cls.hidden)
+        cls.design = Category.objects.create(name='Дизайн')
+
+    def test_paths(self):
+        self.wallpaper.refresh_from_db()
+        ids = [self.repair.id, self.finishing.id, self.walls.id, self.wallpaper.id]
+        self.assertEqual(self.wallpaper.path, ''.join(f'{pk}/' for pk in ids))
+        self.assertEqual(self.wallpaper.depth, 3)
+        self.assertEqual(self.wallpaper.ancestor_ids, ids[:-1])
+
+    def test_single_query_lookups(self):
+        with self.assertNumQueries(1):
+            self.assertEqual([c.name for c in self.wallpaper.get_breadcrumbs()], ['Ремонт', 'Отделка', 'Стены', 'Обои'])
+        with self.assertNumQueries(1):
+            self.assertEqual([c.name for c in self.wallpaper.get_ancestors()], ['Ремонт', 'Отделка', 'Стены'])
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                sorted(c.name for c in self.finishing.get_descendants()), ['Обои', 'Стены']
+            )
+        with self.assertNumQueries(1):
+            self.assertEqual([c.name for c in self.repair.get_descendants(depth=1)], ['Отделка', 'Скрытая'])
+
+    def test_move_subtree(self):
+        self.walls.parent = self.design
+        self.walls.save()
+        self.wallpaper.refresh_from_db()
+        self.assertEqual(self.wallpaper.path, f'{self.design.id}/{self.walls.id}/{self.wallpaper.id}/')
+        self.assertEqual(self.wallpaper.depth, 2)
+        self.assertEqual([c.name for c in self.finishing.get_descendants()], [])
+
+        self.walls.parent = None
+        self.walls.save()
+        self.wallpaper.refresh_from_db()
+        self.assertEqual((self.wallpaper.path, self.wallpaper.depth), (f'{self.walls.id}/{self.wallpaper.id}/', 1))
+
+    def test_move_into_own_subtree(self):
+        self.finishing.parent = self.wallpaper
+        with self.assertRaises(ValidationError):
+            self.finishing.full_clean()
+        with self.assertRaises(ValueError):
+            self.finishing.save()
+
+    def test_bulk_create_fills_paths(self):
+        main = Category.objects.bulk_create([Category(name='Новая')])[0]
+        sub = Category.objects.bulk_create([Category(name='Вторая', parent=main)])[0]
+        third = Category.objects.bulk_create([Category(name='Третья', parent=sub)])[0]
+        self.assertEqual(third.path, f'{main.id}/{sub.id}/{third.id}/')
+        self.assertEqual(Category.objects.get(id=third.id).depth, 2)
+
+    def test_tree_endpoint(self):
+        url = reverse('category-tree')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        tree = response.json()
+        self.assertEqual([node['name'] for node in tree], ['Дизайн', 'Ремонт'])
+        repair = tree[1]
+        # Ветка под неактивной категорией не отдаётся
+        self.assertEqual([node['name'] for node in repair['children']], ['Отделка'])
+        self.assertEqual(repair['children'][0]['children'][0]['children'][0]['name'], 'Обои')
+
+        with self.assertNumQueries(3):  # версии (ETag), корень, поддерево
+            response = self.client.get(url, {'root': self.finishing.id, 'depth': 1})
+        node, = response.json()
+        self.assertEqual((node['name'], node['depth']), ('Отделка', 1))
+        self.assertEqual([child['name'] for child in node['children']], ['Стены'])
+        self.assertEqual(node['children'][0]['children'], [])
+
+        self.assertEqual(self.client.get(url, {'depth': 0}).json()[1]['children'], [])
+        self.assertEqual(self.client.get(url, {'root': self.hidden.id}).status_code, 404)
+        self.assertEqual(self.client.get(url, {'depth': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'depth': -1}).status_code, 400)
+
+
+class ServiceDetailsBatchTests(TestCase):
+    """Галереи нескольких подкатегорий одним запросом к API и двумя запросами к БД"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_category_tree(main_count=2, sub_count=3, details_count=2)
+        cls.main = MainCategory.objects.order_by('id').first()
+        cls.subs = list(SubCategory.objects.filter(parent=cls.main, is_active=True).order_by('id'))
+        cls.hidden = SubCategory.objects.get(parent=cls.main, is_active=False)
+
+    def test_ids(self):
+        ids = [self.subs[2].id, self.subs[0].id, self.hidden.id, 0]
+        with self.assertNumQueries(3):  # версии (ETag), подкатегории, детали
+            response = self.client.get(reverse('service-details'), {'sub_category_ids': ','.join(map(str, ids))})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(list(data['results']), [str(self.subs[2].id), str(self.subs[0].id)])
+        self.assertEqual(data['not_found'], [self.hidden.id, 0])
+        gallery = data['results'][str(self.subs[0].id)]
+        single = self.client.get(reverse('service-details'), {'sub_category_id': self.subs[0].id}).json()
+        self.assertEqual(gallery, single)
+
+    def test_parent_category(self):
+        with self.assertNumQueries(3):
+            data = self.client.get(reverse('service-details'), {'category_id': self.main.id}).json()
+        self.assertEqual(data['category_id'], self.main.id)
+        self.assertEqual(len(data['results']), 3)
+        self.assertEqual(data['not_found'], [])
+        self.assertTrue(all(len(item['service_details']) == 2 for item in data['results'].values()))
+
+    def test_errors(self):
+        url = reverse('service-details')
+        response = self.client.get(url, {'sub_category_ids': f'{self.hidden.id},0'})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['not_found'], [self.hidden.id, 0])
+        self.assertEqual(self.client.get(url, {'category_id': self.subs[0].id}).status_code, 404)
+        for params in [
+            {'sub_category_ids': '1,x'},
+            {'sub_category_ids': ','.join(str(i) for i in range(1, 102))},
+            {'sub_category_ids': '1', 'category_id': '1'},
+            {'sub_category_ids': '1', 'page_size': '3'},
+        ]:
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+
+
+class HomepageSnapshotTests(TestCase):
+    """Снимок главной страницы отдаётся из кэша и пересобирается по сигналам"""
+
+    def setUp(self):
+        cache.clear()
+        create_category_tree(main_count=2, sub_count=2, details_count=1)
+
+    def test_warm_request_makes_no_queries(self):
+        self.client.get(reverse('homepage'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('homepage'))
+        data = response.json()
+        self.assertEqual(list(data), [
+            'categories', 'projects', 'work_steps', 'youtube_videos',
+            'why_choose_us', 'client_reviews', 'client_review_summary', 'service_details',
+        ])
+        self.assertEqual(len(data['categories']), 2)
+        self.assertEqual(len(data['service_details']), 4)
+
+    def test_only_affected_section_is_rebuilt(self):
+        self.client.get(reverse('homepage'))
+        # Файла нет на диске: варианты изображения не создаются, это только предупреждение
+        with self.assertLogs('apps.website_config.images', 'WARNING'), self.captureOnCommitCallbacks(execute=True):
+            project = OurProject.objects.create(image='projects/1.jpg')
+        with self.assertNumQueries(0):
+            data = self.client.get(reverse('homepage')).json()
+        self.assertEqual([item['id'] for item in data['projects']], [project.id])
+
+        # Пересборка секции проектов не трогает дерево категорий
+        with self.captureOnCommitCallbacks() as callbacks:
+            project.delete()
+        with CaptureQueriesContext(connection) as rebuild:
+            for callback in callbacks:
+                callback()
+        rebuilt_tables = ' '.join(query['sql'] for query in rebuild.captured_queries)
+        # Пересборки разных воркеров не пересекаются
+        if connection.vendor == 'postgresql':
+            self.assertIn('pg_advisory_xact_lock', rebuilt_tables)
+        self.assertIn('our_projects', rebuilt_tables)
+        self.assertNotIn('categories', rebuilt_tables)
+        self.assertEqual(self.client.get(reverse('homepage')).json()['projects'], [])
+
+    def test_rebuild_without_advisory_locks(self):
+        # SQLite: блокировка процесса вместо pg_advisory_xact_lock
+        with mock.patch.object(connection, 'vendor', 'sqlite'), CaptureQueriesContext(connection) as queries:
+            payload = homepage.rebuild()
+        self.assertNotIn('pg_advisory', ' '.join(query['sql'] for query in queries.captured_queries))
+        self.assertEqual(len(json.loads(payload)['categories']), 2)
+
+    def test_hidden_review_does_not_rebuild(self):
+        # Отзыв из публичной формы ждёт модерации: снимок и версии не меняются
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                reverse('client-review-create'), {'full_name': 'Клиент', 'comment': 'Отзыв', 'rating': 5}
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(callbacks, [])
+        with self.captureOnCommitCallbacks() as callbacks:
+            ClientReview.objects.get().delete()
+        self.assertEqual(callbacks, [])
+        with self.captureOnCommitCallbacks() as callbacks:
+            ClientReview.objects.create(full_name='Клиент', comment='Отзыв', rating=5, is_active=True)
+        self.assertEqual(len(callbacks), 1)
+
+
+class ConditionalGetTests(TestCase):
+    """Списки отвечают 304 по ETag / Last-Modified без выборки данных"""
+
+    def test_not_modified_until_content_changes(self):
+        url = reverse('our-projects-list')
+        with self.assertLogs('apps.website_config.images', 'WARNING'), self.captureOnCommitCallbacks(execute=True):
+            OurProject.objects.create(image='projects/1.jpg')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        self.assertIn('Last-Modified', response.headers)
+
+        # Один запрос к таблице версий, без выборки проектов
+        with self.assertNumQueries(1):
+            response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+
+        response = self.client.get(url, headers={'If-Modified-Since': response.headers['Last-Modified']})
+        self.assertEqual(response.status_code, 304)
+
+        with self.assertLogs('apps.website_config.images', 'WARNING'), self.captureOnCommitCallbacks(execute=True):
+            OurProject.objects.create(image='projects/2.jpg')
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_etag_depends_on_query_string(self):
+        create_category_tree(main_count=1, sub_count=2, details_count=1)
+        first_id, second_id = SubCategory.objects.filter(is_active=True).values_list('id', flat=True)
+        url = reverse('service-details')
+        first = self.client.get(url, {'sub_category_id': first_id})
+        second = self.client.get(url, {'sub_category_id': second_id})
+        self.assertNotEqual(first.headers['ETag'], second.headers['ETag'])
+
+    def test_bump_upserts_in_one_query(self):
+        ContentVersion.objects.all().delete()
+        # Первая запись версии и увеличение существующей - один и тот же запрос
+        with self.assertNumQueries(1):
+            versions.bump([OurProject, WorkStep])
+        with self.assertNumQueries(1):
+            versions.bump([OurProject])
+        self.assertEqual(
+            dict(ContentVersion.objects.values_list('model', 'version')),
+            {'website_config.ourproject': 2, 'website_config.workstep': 1},
+        )
+
+
+@override_settings(VIDEO_VIEWS_FLUSH_INTERVAL=None)
+class VideoViewsCounterTests(TestCase):
+    """Просмотры копятся в буфере и записываются одним пакетным UPDATE"""
+
+    def setUp(self):
+        video_views.flush()
+        video_views._publish_pending = False
+        self.first = YouTubeVideo.objects.create(title='Первое', youtube_url='https://youtu.be/1', viewers=10)
+        self.second = YouTubeVideo.objects.create(title='Второе', youtube_url='https://youtu.be/2')
+
+    def test_increment_does_not_touch_database(self):
+        url = reverse('increment-video-views')
+        with self.assertNumQueries(0):
+            response = self.client.post(f'{url}?id={self.first.id}')
+            self.client.post(url, {'ids': [self.first.id, self.second.id]}, content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(video_views.pending(), {self.first.id: 2, self.second.id: 1})
+
+        with self.assertNumQueries(1):
+            self.assertEqual(video_views.flush(), 3)
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.viewers, self.second.viewers), (12, 1))
+        self.assertEqual(video_views.pending(), {})
+
+    def test_flushes_publish_at_most_once_per_interval(self):
+        cache.delete(counters.PUBLISH_KEY)
+        with self.captureOnCommitCallbacks() as first:
+            video_views.add([self.first.id])
+            video_views.flush()
+        with self.captureOnCommitCallbacks() as second:
+            video_views.add([self.first.id])
+            video_views.flush()
+        # Версия видео и снимок обновились только после первого сброса
+        self.assertEqual((len(first), len(second)), (1, 0))
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.viewers, 12)
+
+        # Интервал истёк: второй сброс публикуется на следующем тике, даже без новых просмотров
+        with self.captureOnCommitCallbacks() as idle:
+            video_views.flush()
+        self.assertEqual(idle, [])
+        cache.delete(counters.PUBLISH_KEY)
+        with self.captureOnCommitCallbacks() as trailing:
+            video_views.flush()
+        with self.captureOnCommitCallbacks() as nothing_pending:
+            video_views.flush()
+        self.assertEqual((len(trailing), len(nothing_pending)), (1, 0))
+
+    def test_invalid_ids_are_rejected(self):
+        url = reverse('increment-video-views')
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.client.post(f'{url}?id=abc').status_code, 400)
+        self.assertEqual(video_views.pending(), {})
+
+
+class CompiledSerializerTests(TestCase):
+    """Скомпилированные сериализаторы дают тот же JSON, что и ModelSerializer"""
+
+    def setUp(self):
+        OurProject.objects.create(image='projects/фото объекта 1.jpg')
+        OurProject.objects.create(
+            image='projects/a+b&c (2).JPG',
+            image_variants={
+                'source': 'projects/a+b&c (2).JPG',
+                'jpeg': {'640': 'variants/projects/a+b&c (2).ab12.w640.jpeg', '320': 'variants/projects/a+b&c (2).ab12.w320.jpeg'},
+                'webp': {'320': 'variants/projects/a+b&c (2).ab12.w320.webp'},
+            },
+        )
+        WorkStep.objects.create(step_number=1, title='Шаг', description='Описание', image='work_steps/1.png')
+        YouTubeVideo.objects.create(title='С обложкой', youtube_url='https://youtu.be/1', thumbnail='youtube_thumbnails/1.jpg')
+        YouTubeVideo.objects.create(title='Без обложки', youtube_url='https://youtu.be/2', viewers=7)
+        WhyChooseUs.objects.create(title='ГАРАНТИИ', description='Гарантийный срок', order=2)
+        ClientReview.objects.create(full_name='Иванов', comment='Спасибо!', rating=4)
+
+    def test_output_is_byte_identical(self):
+        request = RequestFactory().get('/api/', HTTP_HOST='pbb.example')
+        renderer = JSONRenderer()
+        for serializer_class in (
+            OurProjectSerializer, WorkStepSerializer, YouTubeVideoSerializer, WhyChooseUsSerializer, ClientReviewSerializer
+        ):
+            queryset = serializer_class.Meta.model.objects.all()
+            compiled = compile_serializer(serializer_class)
+            for context_request in (request, None):
+                with self.subTest(serializer=serializer_class.__name__, request=context_request):
+                    expected = serializer_class(queryset, many=True, context={'request': context_request}).data
+                    actual = compiled.serialize(compiled.values(queryset), context_request)
+                    self.assertEqual(renderer.render(actual), renderer.render(expected))
+
+
+class ImageVariantsTests(TestCase):
+    """При сохранении изображения создаются уменьшенные варианты без EXIF"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name, IMAGE_VARIANTS_SYNC=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.media_root = media_root.name
+
+    def make_photo(self, width, height):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: повернуть на 90°
+        exif[0x010F] = 'PhoneMaker'
+        buffer = io.BytesIO()
+        Image.new('RGB', (width, height), (200, 100, 50)).save(buffer, 'JPEG', exif=exif)
+        return ContentFile(buffer.getvalue(), name='photo.jpg')
+
+    def test_variants_are_generated_on_save(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            project = OurProject.objects.create(image=self.make_photo(1600, 900))
+        project.refresh_from_db()
+        variants = project.image_variants
+        self.assertEqual(variants['source'], project.image.name)
+        # После поворота по EXIF ширина оригинала 900: вариант 1280 не создаётся
+        self.assertEqual(sorted(variants['webp'], key=int), ['320', '640'])
+
+        with Image.open(os.path.join(self.media_root, variants['jpeg']['640'])) as variant:
+            self.assertEqual(variant.size, (640, 1138))
+            self.assertEqual(len(variant.getexif()), 0)
+
+        data = self.client.get(reverse('our-projects-list')).json()
+        srcset = data[0]['image_srcset']
+        self.assertEqual(list(srcset), ['webp', 'jpeg'])
+        self.assertTrue(srcset['webp'].startswith('http://testserver/media/variants/projects/'))
+        self.assertTrue(srcset['webp'].endswith('.w640.webp 640w'))
+
+    def test_small_images_are_not_upscaled(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            project = OurProject.objects.create(image=self.make_photo(200, 100))
+        project.refresh_from_db()
+        self.assertEqual(list(project.image_variants['jpeg']), ['100'])
+
+
+class MediaServeTests(TestCase):
+    """Отдача медиа с Range, условными запросами и кэш-заголовками"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        os.makedirs(os.path.join(media_root.name, 'variants', 'projects'))
+        with open(os.path.join(media_root.name, 'projects.bin'), 'wb') as target:
+            target.write(bytes(range(256)) * 4)
+        with open(os.path.join(media_root.name, 'variants', 'projects', 'a.0123456789ab.w320.webp'), 'wb') as target:
+            target.write(b'webp')
+        with open(os.path.join(media_root.name, 'price.csv.gz'), 'wb') as target:
+            target.write(gzip.compress(b'price'))
+
+    def read(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_and_conditional_requests(self):
+        response = self.client.get('/media/projects.bin')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.read(response)), 1024)
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+        self.assertEqual(response.headers['Cache-Control'], 'public, max-age=3600')
+
+        cached = self.client.get('/media/projects.bin', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(cached.status_code, 304)
+
+    def test_range_requests(self):
+        response = self.client.get('/media/projects.bin', headers={'Range': 'bytes=10-19'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.headers['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(self.read(response), bytes(range(10, 20)))
+
+        response = self.client.get('/media/projects.bin', headers={'Range': 'bytes=-4'})
+        self.assertEqual(self.read(response), bytes(range(252, 256)))
+
+        response = self.client.get('/media/projects.bin', headers={'Range': 'bytes=2000-'})
+        self.assertEqual(response.status_code, 416)
+
+        # Устаревший If-Range: отдаём файл целиком
+        response = self.client.get('/media/projects.bin', headers={'Range': 'bytes=0-1', 'If-Range': '"old"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_versioned_files_are_immutable(self):
+        response = self.client.get('/media/variants/projects/a.0123456789ab.w320.webp')
+        self.assertEqual(response.headers['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response.headers['Content-Type'], 'image/webp')
+
+    def test_compressed_files_are_served_as_is(self):
+        # Без Content-Encoding клиент не распакует файл и Range считается по сжатым байтам
+        for headers in ({}, {'Range': 'bytes=0-1'}):
+            response = self.client.get('/media/price.csv.gz', headers=headers)
+            self.assertEqual(response.headers['Content-Type'], 'application/gzip')
+            self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(self.read(response), b'\x1f\x8b')
+
+    def test_missing_and_outside_files(self):
+        self.assertEqual(self.client.get('/media/missing.jpg').status_code, 404)
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+
+    @override_settings(MEDIA_SERVE_MODE='x-accel-redirect')
+    def test_x_accel_redirect(self):
+        response = self.client.get('/media/variants/projects/a.0123456789ab.w320.webp')
+        self.assertEqual(response.headers['X-Accel-Redirect'], '/protected-media/variants/projects/a.0123456789ab.w320.webp')
+        self.assertEqual(response.content, b'')
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor-пагинация включается параметром и проходит список без пропусков"""
+
+    def collect(self, url, params):
+        ids = []
+        response = self.client.get(url, params)
+        while True:
+            data = response.json()
+            ids.extend(item['id'] for item in data['results'])
+            if not data['next']:
+                return ids
+            response = self.client.get(data['next'])
+
+    def test_projects_pages_cover_list_with_equal_timestamps(self):
+        OurProject.objects.bulk_create([OurProject(image='') for _ in range(25)])
+        # Половина записей с одинаковым временем: порядок определяет id
+        OurProject.objects.filter(id__in=OurProject.objects.order_by('id').values('id')[:12]).update(
+            created_at=OurProject.objects.earliest('created_at').created_at
+        )
+        expected = list(OurProject.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+        url = reverse('our-projects-list')
+        self.assertEqual(len(self.client.get(url).json()), 25)
+        self.assertEqual(self.collect(url, {'page_size': 10}), expected)
+
+    def test_service_details_pages(self):
+        create_category_tree(main_count=1, sub_count=1, details_count=7)
+        sub = SubCategory.objects.get(is_active=True)
+        ServiceDetails.objects.filter(category=sub, order__gte=4).update(order=0)
+        expected = list(
+            ServiceDetails.objects.filter(category=sub).order_by('order', 'created_at', 'id').values_list('id', flat=True)
+        )
+        url = reverse('service-details')
+        ids = []
+        params = {'sub_category_id': sub.id, 'page_size': 3}
+        while True:
+            data = self.client.get(url, params).json()
+            ids.extend(item['id'] for item in data['service_details'])
+            if not data['next']:
+                break
+            params['cursor'] = data['next'].split('cursor=')[1].split('&')[0]
+        self.assertEqual(ids, expected)
+        self.assertNotIn('next', self.client.get(url, {'sub_category_id': sub.id}).json())
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('client-reviews-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+# URLconf для AsyncReadViewsTests: async-маршруты под тем же префиксом, что и в config.urls
+urlpatterns = [path('api/', include('apps.website_config.async_urls'))]
+
+
+@override_settings(ROOT_URLCONF='apps.website_config.tests')
+class AsyncReadViewsTests(TestCase):
+    """Async-версии эндпоинтов отдают те же данные, что и синхронные"""
+
+    def setUp(self):
+        cache.clear()
+        create_category_tree(main_count=2, sub_count=2, details_count=3)
+        OurProject.objects.bulk_create([OurProject(image='') for _ in range(5)])
+        WhyChooseUs.objects.create(title='Пункт', description='Описание', order=1)
+        ClientReview.objects.create(full_name='Клиент', comment='Отзыв', rating=5, is_active=True)
+
+    def get_pair(self, name, params=None):
+        async_response = self.client.get(reverse(name), params)
+        with override_settings(ROOT_URLCONF='config.urls'):
+            sync_response = self.client.get(reverse(name), params)
+        return sync_response, async_response
+
+    def test_same_payload_as_sync_views(self):
+        sub = SubCategory.objects.filter(is_active=True).first()
+        endpoints = [
+            ('main-categories-list', None),
+            ('service-details', {'sub_category_id': sub.id}),
+            ('service-details', {'category_id': sub.parent_id}),
+            ('our-projects-list', None),
+            ('our-projects-list', {'page_size': 100}),
+            ('work-steps-list', None),
+            ('youtube-videos-list', None),
+            ('why-choose-us-list', None),
+            ('client-reviews-list', None),
+            ('homepage', None),
+            # filter_backends синхронных представлений (OrderingFilter)
+            ('main-categories-list', {'ordering': 'name'}),
+            ('our-projects-list', {'ordering': 'id'}),
+            ('work-steps-list', {'ordering': '-step_number'}),
+            ('why-choose-us-list', {'ordering': '-id'}),
+            ('client-reviews-list', {'ordering': 'rating'}),
+        ]
+        for name, params in endpoints:
+            with self.subTest(name, params=params):
+                sync_response, async_response = self.get_pair(name, params)
+                self.assertEqual(async_response.status_code, 200)
+                self.assertEqual(async_response.json(), sync_response.json())
+
+    def test_errors_match_sync_views(self):
+        for name, params in [
+            ('service-details', None),
+            ('service-details', {'sub_category_id': 0}),
+            ('service-details', {'sub_category_ids': '0'}),
+            ('service-details', {'sub_category_ids': 'x'}),
+            ('client-reviews-list', {'cursor': 'not-a-cursor'}),
+            ('main-categories-list', {'page': 2}),
+        ]:
+            with self.subTest(name, params=params):
+                sync_response, async_response = self.get_pair(name, params)
+                self.assertEqual(async_response.status_code, sync_response.status_code)
+                self.assertEqual(async_response.json(), sync_response.json())
+
+    async def test_conditional_get_under_asgi(self):
+        url = reverse('our-projects-list')
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 5)
+
+        cached = await self.async_client.get(url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+
+class WriteBehindIngestionTests(TestCase):
+    """Заявки копятся в буфере со spill-файлом и записываются одним bulk_create"""
+
+    def setUp(self):
+        self.spill_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spill_dir, ignore_errors=True)
+        overrides = override_settings(
+            WRITE_BEHIND_INGESTION=True,
+            INGESTION_FLUSH_INTERVAL=None,
+            INGESTION_MAX_PENDING=3,
+            INGESTION_SPILL_DIR=self.spill_dir,
+            INGESTION_FSYNC=False,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        throttling._stores.clear()
+        self.buffer = IngestionBuffer(CallbackRequest, 'callback_requests')
+        patcher = mock.patch.object(ingestion, 'callback_requests', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.discard_buffer)
+
+    def discard_buffer(self):
+        # Несохранённые строки теста не должны попасть в БД из atexit
+        self.buffer._rows = []
+        self.buffer.close()
+
+    def post_callback(self, index):
+        return self.client.post(
+            reverse('callback-request-create'), {'name': f'Клиент {index}', 'phone': '+998 90 123 45 67'}
+        )
+
+    def test_accepted_rows_are_flushed_in_one_batch(self):
+        response = self.post_callback(1)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(set(response.json()['callback']), {'id', 'name', 'phone', 'created_at'})
+        # Время создания ставит bulk_create, в ответе его ещё нет
+        self.assertIsNone(response.json()['callback']['created_at'])
+        self.post_callback(2)
+        self.assertFalse(CallbackRequest.objects.exists())
+        self.assertEqual(len(IngestionBuffer._read_spill(self.buffer.spill_path)), 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.buffer.flush(), 2)
+        inserts = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "callback_requests"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(CallbackRequest.objects.count(), 2)
+        self.assertEqual(IngestionBuffer._read_spill(self.buffer.spill_path), [])
+
+    def test_full_buffer_returns_429(self):
+        for index in range(3):
+            self.assertEqual(self.post_callback(index).status_code, 201)
+        response = self.post_callback(4)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_recover_orphaned_spill_file(self):
+        # Файлы процесса, который упал, не сбросив буфер: блокировку никто не держит
+        with open(os.path.join(self.spill_dir, 'callback_requests.999999.jsonl'), 'w') as spill:
+            spill.write('{"name": "Клиент", "phone": "+998901234567"}\n{"name": "Недопис')
+        open(os.path.join(self.spill_dir, 'callback_requests.999999.lock'), 'w').close()
+
+        # При старте сервера, без единого нового POST
+        output = io.StringIO()
+        with self.assertLogs('apps.website_config.ingestion', 'WARNING'):
+            call_command('recover_ingestion', stdout=output)
+        self.assertIn('callback_requests: восстановлено 1', output.getvalue())
+        self.assertEqual(CallbackRequest.objects.get().name, 'Клиент')
+        self.assertEqual(os.listdir(self.spill_dir), [])
+
+    def test_reused_pid_does_not_overwrite_predecessor_spill(self):
+        # Упавший процесс контейнера с тем же pid, что у текущего
+        predecessor = os.path.join(self.spill_dir, f'callback_requests.{os.getpid()}.jsonl')
+        with open(predecessor, 'w') as spill:
+            spill.write('{"name": "Предшественник", "phone": "+998901234567"}\n')
+        open(predecessor[:-len('.jsonl')] + '.lock', 'w').close()
+
+        self.post_callback(1)
+        self.assertNotEqual(self.buffer.spill_path, predecessor)
+        self.buffer.flush()
+        self.assertEqual(len(IngestionBuffer._read_spill(predecessor)), 1)
+        with self.assertLogs('apps.website_config.ingestion', 'WARNING'):
+            self.assertEqual(self.buffer.recover(), 1)
+        self.assertEqual(CallbackRequest.objects.count(), 2)
+
+        # Штатное завершение не оставляет файлов
+        self.buffer.close()
+        self.assertEqual(os.listdir(self.spill_dir), [])
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'callback_request': '2/min', 'callback_request_total': '3/min'},
+})
+class TokenBucketThrottleTests(TestCase):
+    """Лимиты по IP и на эндпоинт без обращений к основной БД"""
+
+    def setUp(self):
+        throttling._stores.clear()
+        self.addCleanup(throttling._stores.clear)
+
+    def post_callback(self, ip, **headers):
+        return self.client.post(
+            reverse('callback-request-create'), {'name': 'Клиент', 'phone': '+998901234567'}, REMOTE_ADDR=ip,
+            headers=headers,
+        )
+
+    def test_per_ip_and_endpoint_limits(self):
+        self.assertEqual(self.post_callback('10.0.0.1').status_code, 201)
+        self.assertEqual(self.post_callback('10.0.0.1').status_code, 201)
+        with CaptureQueriesContext(connection) as queries:
+            rejected = self.post_callback('10.0.0.1')
+        self.assertEqual(rejected.status_code, 429)
+        self.assertEqual(rejected['Retry-After'], '30')
+        self.assertEqual(len(queries), 0)
+
+        # Отказ по IP не расходует общий лимит эндпоинта
+        self.assertEqual(self.post_callback('10.0.0.2').status_code, 201)
+        self.assertEqual(self.post_callback('10.0.0.3').status_code, 429)
+        self.assertEqual(CallbackRequest.objects.count(), 3)
+
+    def test_forwarded_for_is_not_trusted_by_default(self):
+        # Подставной X-Forwarded-For не создаёт новое ведро
+        for i, status_code in enumerate((201, 201, 429)):
+            response = self.post_callback('10.0.0.1', x_forwarded_for=f'192.0.2.{i}')
+            self.assertEqual(response.status_code, status_code)
+
+    def test_forwarded_for_behind_proxy(self):
+        rest_framework = {**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}
+        with override_settings(REST_FRAMEWORK=rest_framework):
+            # Все запросы приходят с адреса nginx, клиент - последний адрес в X-Forwarded-For
+            self.assertEqual(self.post_callback('10.0.0.9', x_forwarded_for='198.51.100.1, 192.0.2.1').status_code, 201)
+            self.assertEqual(self.post_callback('10.0.0.9', x_forwarded_for='192.0.2.1').status_code, 201)
+            self.assertEqual(self.post_callback('10.0.0.9', x_forwarded_for='192.0.2.1').status_code, 429)
+            self.assertEqual(self.post_callback('10.0.0.9', x_forwarded_for='192.0.2.2').status_code, 201)
+
+    def test_sqlite_store_is_shared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'buckets.sqlite3')
+            first, second = throttling.SQLiteBucketStore(path), throttling.SQLiteBucketStore(path)
+            self.assertEqual(first.take('key', 2, 1 / 60, 1000.0), 0)
+            self.assertEqual(second.take('key', 2, 1 / 60, 1000.0), 0)
+            self.assertAlmostEqual(first.take('key', 2, 1 / 60, 1000.0), 60)
+            self.assertEqual(second.take('key', 2, 1 / 60, 1060.0), 0)
+
+    def test_sqlite_store_fails_open(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'buckets.sqlite3')
+            store = throttling.SQLiteBucketStore(path)
+            store.take('key', 1, 1 / 60, 1000.0)
+            # Другой воркер держит запись дольше timeout
+            blocker = sqlite3.connect(path, isolation_level=None)
+            blocker.execute('BEGIN IMMEDIATE')
+            self.addCleanup(blocker.close)
+            store._local.db.execute('PRAGMA busy_timeout = 10')
+            with self.assertLogs('apps.website_config.throttling', 'WARNING'):
+                self.assertEqual(store.take('key', 1, 1 / 60, 1000.0), 0)
+                self.assertAlmostEqual(store.take('key', 1, 1 / 60, 1000.0), 60)
+            blocker.execute('ROLLBACK')
+            # Файл освободился: снова общее ведро, где токен уже взят
+            self.assertAlmostEqual(store.take('key', 1, 1 / 60, 1000.0), 60)
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN-планы проверяются только на PostgreSQL')
+class QueryPlanTests(TestCase):
+    """Запросы представлений используют индексы, а не Seq Scan + Sort, на большом наборе данных"""
+
+    @classmethod
+    def setUpTestData(cls):
+        mains = Category.objects.bulk_create(
+            [Category(name=f'Главная {i}', is_active=i % 5 == 0) for i in range(500)]
+        )
+        subs = Category.objects.bulk_create([
+            Category(name=f'Подкатегория {i}', parent=mains[i % len(mains)], is_active=i % 2 == 0)
+            for i in range(10000)
+        ])
+        ServiceDetails.objects.bulk_create(
+            [ServiceDetails(category=subs[i % len(subs)], image='', order=i % 7) for i in range(30000)]
+        )
+        OurProject.objects.bulk_create([OurProject(image='') for _ in range(20000)])
+        WorkStep.objects.bulk_create(
+            [WorkStep(step_number=i, title='Шаг', description='Описание', image='') for i in range(5000)]
+        )
+        YouTubeVideo.objects.bulk_create(
+            [YouTubeVideo(title=f'Видео {i}', youtube_url='https://youtu.be/x') for i in range(20000)]
+        )
+        WhyChooseUs.objects.bulk_create(
+            [WhyChooseUs(title='Пункт', description='', order=i, is_active=i % 50 == 0) for i in range(20000)]
+        )
+        ClientReview.objects.bulk_create([
+            ClientReview(full_name='Клиент', comment='Отзыв', rating=5, is_active=i % 10 == 0)
+            for i in range(20000)
+        ])
+        CallbackRequest.objects.bulk_create([
+            CallbackRequest(name='Клиент', phone='+998901234567', is_processed=i % 10 != 0)
+            for i in range(20000)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.sub_category = SubCategory.objects.filter(is_active=True).first()
+
+    def assertNoSeqScanSort(self, queryset):
+        plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+        nodes = list(plan_nodes(plan))
+        node_types = {node['Node Type'] for node in nodes}
+        scanned = {node.get('Relation Name') for node in nodes if node['Node Type'] == 'Seq Scan'}
+        self.assertFalse(
+            scanned and 'Sort' in node_types,
+            f'Seq Scan по {scanned} с сортировкой:\n{queryset.explain()}',
+        )
+
+    def changelist_queryset(self, model, params):
+        request = RequestFactory().get('/admin/', params)
+        request.user = User(is_superuser=True, is_staff=True)
+        changelist = admin.site._registry[model].get_changelist_instance(request)
+        return changelist.queryset[:changelist.list_per_page]
+
+    def test_public_querysets(self):
+        paginator = CreatedAtKeysetPagination()
+        youtube_view = YouTubeVideoListView(request=Request(RequestFactory().get('/')), format_kwarg=None)
+        querysets = {
+            'main-categories-list': MainCategory.objects.active_tree().order_by('-id')[:20],
+            'sub-categories-prefetch': SubCategory.objects.filter(
+                is_active=True, parent__in=list(MainCategory.objects.filter(is_active=True).values_list('id', flat=True)[:20])
+            ),
+            'service-details': ServiceDetails.objects.filter(category=self.sub_category),
+            'our-projects-list': OurProject.objects.order_by('-created_at', '-id')[:paginator.page_size + 1],
+            # Порядок и фильтры самого представления; список отдаётся целиком, а срез в тесте
+            # проверяет, что первые строки читаются по индексу created_at без сортировки таблицы
+            'youtube-videos-list': youtube_view.filter_queryset(youtube_view.get_queryset())[:100],
+            'why-choose-us-list': WhyChooseUs.objects.filter(is_active=True),
+            'client-reviews-list': ClientReview.objects.filter(is_active=True),
+            'client-reviews-page': ClientReview.objects.filter(is_active=True).order_by('-created_at', '-id')[:21],
+        }
+        for name, queryset in querysets.items():
+            with self.subTest(name):
+                self.assertNoSeqScanSort(queryset)
+
+    def test_admin_changelists(self):
+        year = str(CallbackRequest.objects.first().created_at.year)
+        cases = [
+            (CallbackRequest, {'is_processed__exact': '0'}),
+            (CallbackRequest, {}),
+            (CallbackRequest, {'created_at__year': year}),
+            (ClientReview, {'is_active__exact': '0'}),
+            (ClientReview, {}),
+        ]
+        for model, params in cases:
+            with self.subTest(model.__name__, params=params):
+                self.assertNoSeqScanSort(self.changelist_queryset(model, params))
+
+    def test_admin_estimated_counts(self):
+        request = RequestFactory().get('/admin/')
+        request.user = User(is_superuser=True, is_staff=True)
+        model_admin = admin.site._registry[CallbackRequest]
+        with CaptureQueriesContext(connection) as queries:
+            changelist = model_admin.get_changelist_instance(request)
+        self.assertFalse([query['sql'] for query in queries if 'COUNT(' in query['sql']])
+        self.assertAlmostEqual(changelist.result_count, 20000, delta=2000)
+
+        # Небольшая выборка считается точно
+        request = RequestFactory().get('/admin/', {'is_processed__exact': '0'})
+        request.user = User(is_superuser=True, is_staff=True)
+        self.assertEqual(model_admin.get_changelist_instance(request).result_count, 2000)
+
+        # Оценка плана для поиска не используется: 3 найденные строки - 3, а не тысячи
+        CallbackRequest.objects.bulk_create([CallbackRequest(name='Редкий', phone='+998901234567') for _ in range(3)])
+        request = RequestFactory().get('/admin/', {'q': 'Редкий'})
+        request.user = User(is_superuser=True, is_staff=True)
+        with mock.patch('apps.website_config.admin.estimated_count', return_value=15000):
+            self.assertEqual(model_admin.get_changelist_instance(request).result_count, 3)
+
+    def test_category_subtree(self):
+        main = MainCategory.objects.get(name='Главная 7')
+        plan = json.loads(Category.objects.subtree(main).explain(format='json'))[0]['Plan']
+        self.assertIn('categories_path_idx', {node.get('Index Name') for node in plan_nodes(plan)})
+        # Пути заполнены и для строк из bulk_create
+        self.assertEqual(Category.objects.subtree(main, include_self=False).count(), 20)
+
+    def test_search(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('search'), {'q': 'отзыв'})
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + queries.captured_queries[-1]['sql'])
+            nodes = list(plan_nodes(cursor.fetchone()[0][0]['Plan']))
+        self.assertFalse([node['Relation Name'] for node in nodes if node['Node Type'] == 'Seq Scan'])
+        self.assertLessEqual(
+            {'categories_search_idx', 'work_steps_search_idx', 'why_choose_us_search_idx', 'client_reviews_search_idx'},
+            {node.get('Index Name') for node in nodes},
+        )
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Полнотекстовый поиск работает только на PostgreSQL')
+class SearchTests(TestCase):
+    """/api/search/: ранжированные результаты по всем типам контента"""
+
+    @classmethod
+    def setUpTestData(cls):
+        main = Category.objects.create(name='Эконом ремонт')
+        Category.objects.create(name='Укладка ламината', parent=main)
+        Category.objects.create(name='Скрытый ламинат', parent=main, is_active=False)
+        WorkStep.objects.create(step_number=1, title='Замер', description='укладка ламината и плитки', image='')
+        WhyChooseUs.objects.create(title='Гарантии', description='Гарантия на ламинат два года', order=1)
+        ClientReview.objects.create(full_name='Алишер', comment='Уложили ламинат ровно, rahmat', rating=5)
+        ClientReview.objects.create(full_name='Скрытый', comment='ламинат', rating=1, is_active=False)
+
+    def search(self, **params):
+        response = self.client.get(reverse('search'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_ranked_results_across_types(self):
+        results = self.search(q='ламинат')
+        self.assertEqual(
+            {result['type'] for result in results}, {'category', 'work_step', 'why_choose_us', 'client_review'}
+        )
+        # Совпадение в заголовке (вес A) выше совпадений в тексте; неактивные строки не ищутся
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0]['title'], 'Укладка ламината')
+        ranks = [result['rank'] for result in results]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+
+    def test_best_match_among_many(self):
+        # Частое слово: лучший по rank отзыв добавлен последним, после сотен совпадений
+        ClientReview.objects.bulk_create([
+            ClientReview(full_name='Клиент', comment=f'Отзыв {i}: ламинат', rating=5) for i in range(600)
+        ])
+        best = ClientReview.objects.create(full_name='Ламинат', comment='ламинат, ламинат и снова ламинат', rating=5)
+        results = self.search(q='ламинат', type='client_review', limit=1)
+        self.assertEqual(results[0]['id'], best.id)
+
+    def test_uzbek_words_and_type_filter(self):
+        # Для узбекского нет словаря: слово ищется конфигурацией simple без стемминга
+        results = self.search(q='RAHMAT', type='client_review')
+        self.assertEqual([result['title'] for result in results], ['Алишер'])
+        self.assertEqual(self.search(q='ламинат', type='category', limit=1)[0]['type'], 'category')
+
+    def test_validation(self):
+        self.assertEqual(self.client.get(reverse('search')).status_code, 400)
+        self.assertEqual(self.client.get(reverse('search'), {'q': 'x', 'type': 'video'}).status_code, 400)
+
+
+class LargeTableAdminTests(TestCase):
+    """Списки админки: связанные строки одним запросом, autocomplete родительских категорий"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        create_category_tree(main_count=10, sub_count=3, details_count=0)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_subcategory_changelist_query_count(self):
+        url = reverse('admin:website_config_subcategory_changelist')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        # Без list_select_related - по запросу на каждую из 40 строк
+        self.assertLess(len(queries), 15)
+
+    def test_parent_autocomplete(self):
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'website_config', 'model_name': 'subcategory', 'field_name': 'parent', 'term': 'атегория 1',
+        })
+        # Родителем может быть и подкатегория; главные категории - первыми
+        texts = [item['text'] for item in response.json()['results']]
+        self.assertEqual(texts[0], 'Категория 1')
+        self.assertIn('Подкатегория 1.0', texts)
+
+    def test_parent_category_admin_is_read_only(self):
+        request = RequestFactory().get('/admin/')
+        request.user = self.user
+        model_admin = admin.site._registry[Category]
+        self.assertTrue(model_admin.has_view_permission(request))  # нужно autocomplete
+        self.assertFalse(model_admin.has_add_permission(request))
+        self.assertFalse(model_admin.has_change_permission(request))
+        self.assertFalse(model_admin.has_delete_permission(request))
+
+        category = Category.objects.filter(parent__isnull=True).first()
+        count = Category.objects.count()
+        self.client.post(reverse('admin:website_config_category_add'), {'name': 'Новая'})
+        self.client.post(reverse('admin:website_config_category_change', args=[category.pk]), {'name': 'Изменено'})
+        self.client.post(reverse('admin:website_config_category_delete', args=[category.pk]), {'post': 'yes'})
+        category.refresh_from_db()
+        self.assertNotEqual(category.name, 'Изменено')
+        self.assertEqual(Category.objects.count(), count)
+
+    def test_callbacks_changelist(self):
+        CallbackRequest.objects.create(name='Клиент', phone='+998901234567')
+        response = self.client.get(reverse('admin:website_config_callbackrequest_changelist'))
+        self.assertContains(response, 'Клиент')
+
+
+class ModerationActionsTests(TestCase):
+    """Действия модерации: один UPDATE на всю выборку и одно событие изменения контента"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def run_action(self, model, action, params='', selected=(), select_across=False):
+        url = reverse(f'admin:website_config_{model._meta.model_name}_changelist') + params
+        data = {'action': action, 'index': 0, '_selected_action': [str(pk) for pk in selected]}
+        if select_across:
+            data['select_across'] = '1'
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(url, data, follow=True)
+        self.assertEqual(response.status_code, 200)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "%s"' % model._meta.db_table)]
+        return response, updates
+
+    def test_approve_filter_results(self):
+        reviews = ClientReview.objects.bulk_create(
+            [ClientReview(full_name=f'Клиент {i}', comment='Отзыв', rating=5, is_active=False) for i in range(30)]
+        )
+        with mock.patch('apps.website_config.signals.versions.bump') as bump:
+            response, updates = self.run_action(
+                ClientReview, 'approve_reviews', '?is_active__exact=0', selected=[reviews[0].pk], select_across=True
+            )
+        self.assertContains(response, 'Опубликовано отзывов: 30')
+        self.assertEqual(len(updates), 1)
+        self.assertFalse(ClientReview.objects.filter(is_active=False).exists())
+        bump.assert_called_once()
+        self.assertIn(ClientReview, bump.call_args.args[0])
+
+    def test_mark_selected_processed(self):
+        callbacks = CallbackRequest.objects.bulk_create(
+            [CallbackRequest(name=f'Клиент {i}', phone='+998901234567') for i in range(5)]
+        )
+        response, updates = self.run_action(CallbackRequest, 'mark_processed', selected=[c.pk for c in callbacks[:3]])
+        self.assertContains(response, 'Отмечено обработанными: 3')
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(CallbackRequest.objects.filter(is_processed=True).count(), 3)
+
+
+class ClientReviewSummaryTests(TestCase):
+    """Сводка рейтинга поддерживается при любых изменениях отзывов и читается одной строкой"""
+
+    def assertSummary(self, count, rating_sum, histogram):
+        summary = ClientReviewSummary.objects.get_summary()
+        self.assertEqual(
+            (summary.count, summary.rating_sum, summary.histogram),
+            (count, rating_sum, {rating: histogram.get(rating, 0) for rating in range(1, 6)}),
+        )
+        # Инкрементальная сводка совпадает с пересчётом с нуля
+        self.assertEqual(ClientReviewSummary.objects.rebuild().histogram, summary.histogram)
+
+    def test_save_and_delete(self):
+        review = ClientReview.objects.create(full_name='Клиент', comment='Отзыв', rating=4, is_active=False)
+        self.assertSummary(0, 0, {})
+        review.is_active = True
+        review.save()
+        self.assertSummary(1, 4, {4: 1})
+        review.rating = 2
+        review.save()
+        self.assertSummary(1, 2, {2: 1})
+        ClientReview.objects.create(full_name='Клиент', comment='Отзыв', rating=5)
+        self.assertSummary(2, 7, {2: 1, 5: 1})
+        review.delete()
+        self.assertSummary(1, 5, {5: 1})
+        review = ClientReview.objects.create(full_name='Клиент', comment='Отзыв', rating=3)
+        review.is_active = False
+        review.save()
+        self.assertSummary(1, 5, {5: 1})
+
+    def test_bulk_operations(self):
+        ClientReview.objects.bulk_create([
+            ClientReview(full_name=f'Клиент {i}', comment='Отзыв', rating=i % 5 + 1, is_active=i % 2 == 0)
+            for i in range(10)
+        ])
+        self.assertSummary(5, 15, {1: 1, 3: 1, 5: 1, 2: 1, 4: 1})
+        ClientReview.objects.filter(rating__gte=4).update(is_active=True)
+        self.assertSummary(7, 24, {1: 1, 2: 1, 3: 1, 4: 2, 5: 2})
+        ClientReview.objects.filter(rating=1).update(rating=5)
+        self.assertSummary(7, 28, {2: 1, 3: 1, 4: 2, 5: 3})
+        ClientReview.objects.filter(rating=5).delete()
+        self.assertSummary(4, 13, {2: 1, 3: 1, 4: 2})
+
+    def test_moderation_action(self):
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+        reviews = ClientReview.objects.bulk_create(
+            [ClientReview(full_name='Клиент', comment='Отзыв', rating=4, is_active=False) for _ in range(3)]
+        )
+        self.client.post(reverse('admin:website_config_clientreview_changelist'), {
+            'action': 'approve_reviews', 'index': 0, '_selected_action': [str(r.pk) for r in reviews[:2]],
+        })
+        self.assertSummary(2, 8, {4: 2})
+
+    def test_ingestion_flush(self):
+        buffer = IngestionBuffer(ClientReview, 'client_reviews')
+        with override_settings(INGESTION_SPILL_DIR=tempfile.mkdtemp(), INGESTION_FLUSH_INTERVAL=None):
+            self.addCleanup(shutil.rmtree, settings.INGESTION_SPILL_DIR, ignore_errors=True)
+            buffer.add({'full_name': 'Клиент', 'comment': 'Отзыв', 'rating': 5, 'is_active': True})
+            buffer.flush()
+        self.assertSummary(1, 5, {5: 1})
+
+    def test_endpoint_and_repair_command(self):
+        ClientReview.objects.bulk_create([
+            ClientReview(full_name='Клиент', comment='Отзыв', rating=rating) for rating in (5, 5, 4)
+        ])
+        with self.assertNumQueries(2):  # версии (ETag) и строка сводки
+            response = self.client.get(reverse('client-review-summary'))
+        self.assertEqual(response.json(), {
+            'count': 3, 'average': 4.67, 'histogram': {'1': 0, '2': 0, '3': 0, '4': 1, '5': 2},
+        })
+
+        ClientReviewSummary.objects.update(count=0, rating_sum=0, rating_5=0)
+        out = io.StringIO()
+        call_command('rebuild_review_summary', stdout=out)
+        self.assertIn('Сводка расходилась', out.getvalue())
+        self.assertSummary(3, 14, {4: 1, 5: 2})
+
+
+class ExportTests(TestCase):
+    """Потоковая выгрузка заявок и отзывов: эндпоинты для сотрудников и действия админки"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        CallbackRequest.objects.bulk_create([
+            CallbackRequest(name=f'Клиент {i}', phone='+998901234567', is_processed=i % 2 == 0) for i in range(6)
+        ])
+        CallbackRequest.objects.filter(name='Клиент 0').update(created_at=timezone.now() - timedelta(days=30))
+
+    def export(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8-sig')
+
+    def test_staff_only(self):
+        self.assertIn(self.client.get(reverse('callback-requests-export')).status_code, (401, 403))
+
+    def test_csv_with_filters(self):
+        self.client.force_login(self.user)
+        today = timezone.localdate().isoformat()
+        rows = list(csv.reader(io.StringIO(self.export('callback-requests-export', is_processed='true', date_from=today))))
+        self.assertEqual(rows[0], ['ID', 'Имя', 'Телефон', 'Обработано', 'Дата создания'])
+        self.assertEqual(sorted(row[1] for row in rows[1:]), ['Клиент 2', 'Клиент 4'])
+        self.assertEqual({row[3] for row in rows[1:]}, {'1'})
+
+    def test_ndjson(self):
+        self.client.force_login(self.user)
+        ClientReview.objects.create(full_name='Алишер', comment='Спасибо\nза работу', rating=5, is_active=False)
+        lines = self.export('client-reviews-export', output='ndjson', is_active='false').splitlines()
+        self.assertEqual([json.loads(line)['comment'] for line in lines], ['Спасибо\nза работу'])
+        self.assertEqual(self.client.get(reverse('client-reviews-export'), {'output': 'xlsx'}).status_code, 400)
+
+    def test_csv_formula_injection(self):
+        self.client.force_login(self.user)
+        ClientReview.objects.create(full_name='@SUM(A1)', comment='=HYPERLINK("http://x")', rating=5)
+        CallbackRequest.objects.create(name='-2+3', phone='=1234567890')
+        review = list(csv.reader(io.StringIO(self.export('client-reviews-export'))))[1]
+        self.assertEqual(review[1:3], ["'@SUM(A1)", '\'=HYPERLINK("http://x")'])
+        rows = list(csv.reader(io.StringIO(self.export('callback-requests-export'))))
+        self.assertIn(["'-2+3", "'=1234567890"], [row[1:3] for row in rows])
+        self.assertIn(['Клиент 1', '+998901234567'], [row[1:3] for row in rows])
+
+    async def test_asgi_stream_is_async(self):
+        # Под ASGI синхронный итератор был бы собран в список целиком
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('callback-requests-export'), {'output': 'ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEqual(len(lines), 6)
+
+    def test_admin_action(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('admin:website_config_callbackrequest_changelist'), {
+            'action': 'export_csv', 'index': 0, 'select_across': '1',
+            '_selected_action': [CallbackRequest.objects.first().pk],
+        })
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 7)
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    """Подключение к БД настраивается переменными окружения"""
+
+    def test_persistent_connections_by_default(self):
+        database = database_settings({'DB_HOST': 'db', 'DB_PORT': '6432'})
+        self.assertEqual((database['HOST'], database['PORT']), ('db', 6432))
+        self.assertEqual(database['CONN_MAX_AGE'], 60)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+        self.assertNotIn('OPTIONS', database)
+
+    def test_pool(self):
+        database = database_settings({'DB_POOL': '1', 'DB_POOL_MAX_SIZE': '20'})
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertEqual(database['OPTIONS']['pool'], {'min_size': 2, 'max_size': 20, 'timeout': 10.0})
+        self.assertIsNone(pool_stats())
+
+    def test_sqlite_migrate_from_scratch(self):
+        # Цепочка миграций применяется и на SQLite (DB_ENGINE=sqlite), не только на PostgreSQL
+        with tempfile.TemporaryDirectory() as directory:
+            environ = {**os.environ, 'DB_ENGINE': 'sqlite', 'DB_NAME': os.path.join(directory, 'db.sqlite3')}
+            result = subprocess.run(
+                [sys.executable, 'manage.py', 'migrate', '--no-input'],
+                cwd=settings.BASE_DIR, env=environ, capture_output=True, text=True,
+            )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('website_config.0017_client_review_summary... OK', result.stdout)
+
+
+TIERED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tiered-shared'},
+    # Два экземпляра над одним общим уровнем - как два воркера
+    'worker_a': {'BACKEND': 'config.cache.TieredCache', 'LOCATION': 'shared', 'OPTIONS': {'MAX_ENTRIES': 2}},
+    'worker_b': {'BACKEND': 'config.cache.TieredCache', 'LOCATION': 'shared', 'OPTIONS': {'MAX_ENTRIES': 2}},
+}
+
+
+@override_settings(CACHES=TIERED_CACHES)
+class TieredCacheTests(SimpleTestCase):
+    """LRU процесса перед общим кэшем: согласованность между воркерами, вытеснение, счётчики"""
+
+    def setUp(self):
+        self.a, self.b = caches['worker_a'], caches['worker_b']
+        for worker in (self.a, self.b):
+            worker.clear()
+            worker._counters = dict.fromkeys(TieredCache.counter_names, 0)
+
+    def test_settings(self):
+        config = cache_settings({'CACHE_DIR': '/tmp/pbb-cache', 'CACHE_LOCAL_MAX_ENTRIES': '50'})
+        self.assertEqual(config['default']['BACKEND'], 'config.cache.TieredCache')
+        self.assertEqual(config['default']['OPTIONS']['MAX_ENTRIES'], 50)
+        self.assertEqual(config['shared']['LOCATION'], '/tmp/pbb-cache')
+        redis = cache_settings({'CACHE_REDIS_URL': 'redis://cache:6379/1', 'CACHE_LOCAL_MAX_ENTRIES': '0'})
+        self.assertEqual(redis['default']['BACKEND'], 'django.core.cache.backends.redis.RedisCache')
+        # Без CACHE_*: кэш процесса, без общего состояния между запусками тестов и процессами
+        self.assertEqual(cache_settings({}), {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+
+    def test_hits_and_invalidation_across_workers(self):
+        self.a.set('homepage', {'sections': [1]})
+        self.assertEqual(self.b.get('homepage'), {'sections': [1]})
+        self.assertEqual(self.b.get('homepage'), {'sections': [1]})
+        self.assertEqual((self.b.stats()['shared_hits'], self.b.stats()['local_hits']), (1, 1))
+
+        # Локальная копия - снимок: изменение полученного объекта не попадает в кэш
+        self.b.get('homepage')['sections'].append(2)
+        self.assertEqual(self.b.get('homepage'), {'sections': [1]})
+
+        self.a.set('homepage', {'sections': [3]})
+        self.assertEqual(self.b.get('homepage'), {'sections': [3]})
+        self.assertEqual(self.b.stats()['invalidations'], 1)
+        self.a.delete('homepage')
+        self.assertIsNone(self.b.get('homepage'))
+        self.assertEqual(self.b.stats()['misses'], 1)
+
+    def test_lru_eviction(self):
+        self.a.set_many({'one': 1, 'two': 2, 'three': 3})
+        self.assertEqual(self.a.stats()['local_entries'], 0)  # запись не заполняет локальный уровень
+        self.assertEqual(self.a.get_many(['one', 'two']), {'one': 1, 'two': 2})
+        self.assertEqual(self.a.get('one'), 1)
+        self.assertEqual(self.a.get('three'), 3)
+        # Вытеснен давно не читавшийся 'two', значение остаётся в общем уровне
+        self.assertEqual(self.a.stats()['evictions'], 1)
+        self.assertEqual(self.a.get_many(['one', 'two', 'three']), {'one': 1, 'two': 2, 'three': 3})
+        self.assertEqual(self.a.incr('one'), 2)
+        self.assertEqual(self.b.get('one'), 2)
+
+    def test_concurrent_writes(self):
+        # A записал значение, B записал своё и сменил поколение, A сменил поколение последним
+        bump = self.a._bump
+
+        def late_bump():
+            self.b.set('homepage', 'от B')
+            return bump()
+
+        with mock.patch.object(self.a, '_bump', late_bump):
+            self.a.set('homepage', 'от A')
+        self.assertEqual(self.a.get('homepage'), self.a.shared.get('homepage'))
+        self.assertEqual(self.b.get('homepage'), self.a.get('homepage'))
+
+    def test_evicted_generation_does_not_revive_local_copies(self):
+        self.a.shared.delete(TieredCache.generation_key)
+        self.a.shared.set('homepage', 'старое')
+        self.assertEqual(self.b.get('homepage'), 'старое')
+        self.a.set('homepage', 'новое')
+        # Общий уровень вытеснил ключ поколения: прежнее поколение не должно вернуться
+        self.a.shared.delete(TieredCache.generation_key)
+        self.assertEqual(self.b.get('homepage'), 'новое')
+        self.assertEqual(self.a.get('homepage'), 'новое')
+
+    def test_metrics(self):
+        self.a.get('missing')
+        exposition = cache_counters()
+        self.assertIn(f'cache_misses_total{{cache="worker_a",pid="{os.getpid()}"}} 1', exposition)
+        self.assertIn('cache="worker_b"', exposition)
+        self.assertEqual(exposition.count('# TYPE cache_misses_total counter'), 1)
+        self.assertIsInstance(caches['worker_b'], TieredCache)
+
+
+class PrebuiltSchemaTests(TestCase):
+    """/schema/ отдаёт собранную командой схему из памяти; живая генерация - только при DEBUG"""
+
+    def setUp(self):
+        schema_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(schema_dir.cleanup)
+        self.schema_dir = schema_dir.name
+        settings_override = override_settings(OPENAPI_SCHEMA_DIR=self.schema_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_not_built(self):
+        self.assertEqual(self.client.get(reverse('schema')).status_code, 503)
+        with override_settings(DEBUG=True):
+            response = self.client.get(reverse('schema'), {'format': 'json'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('/api/categories/', json.loads(response.content)['paths'])
+
+    def test_prebuilt_schema(self):
+        call_command('build_openapi_schema', stdout=io.StringIO())
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('schema'), {'format': 'json'})
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(response['Content-Type'], 'application/vnd.oai.openapi+json; charset=utf-8')
+        self.assertIn('/api/categories/', json.loads(response.content)['paths'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        compressed = self.client.get(reverse('schema'), {'format': 'json'}, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), response.content)
+        self.assertNotEqual(compressed['ETag'], response['ETag'])
+
+        cached = self.client.get(reverse('schema'), {'format': 'json'}, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(cached.status_code, 304)
+        yaml = self.client.get(reverse('schema'), headers={'If-None-Match': response['ETag']})
+        self.assertEqual(yaml.status_code, 200)
+        self.assertTrue(yaml.content.startswith(b'openapi:'))
+
+        # Повторная сборка той же схемы - та же версия, файлов прежних версий не остаётся
+        call_command('build_openapi_schema', stdout=io.StringIO())
+        self.assertEqual(self.client.get(reverse('schema'), {'format': 'json'})['ETag'], response['ETag'])
+        self.assertEqual(len(os.listdir(self.schema_dir)), 1 + 4 * len(settings.LANGUAGES))
+
+
+@override_settings(SERVER_TIMING_HEADER=True, METRICS_TOKEN='metrics-secret')
+class InstrumentationTests(TestCase):
+    """Server-Timing в ответе и гистограммы по имени URL на /metrics"""
+
+    def test_server_timing_and_metrics(self):
+        WhyChooseUs.objects.create(title='Пункт', description='Описание', order=1)
+        response = self.client.get(reverse('why-choose-us-list'))
+        timing = dict(part.split(';', 1)[0:2] for part in response['Server-Timing'].split(', '))
+        self.assertEqual(set(timing), {'total', 'db', 'render', 'app'})
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+
+        exposition = self.client.get('/metrics', headers={'Authorization': 'Bearer metrics-secret'}).content.decode()
+        self.assertIn('http_requests_total{view="why-choose-us-list",method="GET",status="200"}', exposition)
+        self.assertIn('http_request_db_queries_bucket{view="why-choose-us-list",le="2"}', exposition)
+        self.assertIn('http_request_render_duration_seconds_count{view="why-choose-us-list"}', exposition)
+
+    def test_metrics_require_token(self):
+        # Запросы через nginx приходят с localhost: адрес не даёт доступа
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='127.0.0.1').status_code, 404)
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code, 404)
+        with override_settings(METRICS_TOKEN=None):
+            self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer None'}).status_code, 404)
+
+    @override_settings(SERVER_TIMING_HEADER=False)
+    def test_server_timing_is_opt_in(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('why-choose-us-list')))
+
+
+class CreateFakeDataTests(TransactionTestCase):
+    """create_fake_data: bulk_create пачками и очистка TRUNCATE (TRUNCATE требует закоммиченных данных)"""
+
+    def test_scale_and_rerun(self):
+        ClientReview.objects.create(full_name='Старый', comment='Удалится', rating=1)
+        CallbackRequest.objects.create(name='Настоящий клиент', phone='+998901234567')
+        call_command('create_fake_data', scale=1, batch_size=100, stdout=io.StringIO())
+        # Без --include-callbacks заявки клиентов не трогаются
+        self.assertEqual(list(CallbackRequest.objects.values_list('name', flat=True)), ['Настоящий клиент'])
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                call_command('create_fake_data', scale=1, batch_size=100, include_callbacks=True, stdout=io.StringIO())
+        # Повторный запуск не копит данные, старые строки удалены
+        self.assertEqual(Category.objects.filter(parent__isnull=True).count(), 4 + 10)
+        self.assertEqual(ServiceDetails.objects.count(), 10 * 5 * 4)
+        self.assertEqual(ClientReview.objects.count(), 4 + 500)
+        self.assertFalse(ClientReview.objects.filter(full_name='Старый').exists())
+        self.assertEqual(CallbackRequest.objects.count(), 200)
+        # ~1700 строк, но число запросов зависит от числа пачек, а не строк
+        self.assertLess(len(queries), 150)
@@ -0,0 +1,172 @@
+"""Ограничение частоты публичных POST-запросов (token bucket).
+
+Для каждого представления с ``throttle_scope`` действуют два ведра:
+по IP клиента (скорость ``DEFAULT_THROTTLE_RATES[scope]``) и общее на
+эндпоинт (``DEFAULT_THROTTLE_RATES[scope + '_total']``, не задано - без
+общего лимита).
+
+Скорость задаётся как в DRF: ``'5/min'`` - ведро на 5 запросов, которое
+пополняется со скоростью 5 токенов в минуту, то есть допускает короткий
+всплеск, но не больше 5 запросов в минуту в среднем. При отказе DRF отвечает
+429 с заголовком ``Retry-After``.
+
+Хранилище ведер (``REST_FRAMEWORK['TOKEN_BUCKET_STORE']``):
+    'local' - словарь в памяти процесса, лимит на каждый воркер отдельно
+    'sqlite:<путь>' - общий для всех воркеров сервера файл SQLite; если файл
+        занят или недоступен, запрос проверяется по ведру в памяти воркера
+Основная БД не используется ни при пропуске, ни при отказе.
+"""
+import logging
+import random
+import sqlite3
+import threading
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+logger = logging.getLogger(__name__)
+
+
+def parse_rate(rate):
+    """'5/min' -> (ёмкость, токенов в секунду)"""
+    num, period = rate.split('/')
+    num = int(num)
+    return num, num / DURATIONS[period[0]]
+
+
+class LocalBucketStore:
+    """Ведра в памяти процесса"""
+    max_keys = 100000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def take(self, key, capacity, refill, now):
+        """Взять токен; возвращает 0 или число секунд до появления токена"""
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * refill)
+            wait = 0 if tokens >= 1 else (1 - tokens) / refill
+            if not wait:
+                tokens -= 1
+            # Третье значение - момент, когда ведро снова будет полным
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / refill)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return wait
+
+    def _prune(self, now):
+        # Полное ведро не отличается от отсутствующего
+        self._buckets = {key: state for key, state in self._buckets.items() if state[2] > now}
+
+
+class SQLiteBucketStore:
+    """Ведра в общем файле SQLite (один сервер, несколько воркеров)"""
+    prune_probability = 0.001
+    prune_age = 86400
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        # Ошибка хранилища не должна ронять запрос: лимит по ведру воркера
+        self._fallback = LocalBucketStore()
+
+    def _connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=1, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=OFF')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+            )
+            self._local.db = db
+        return db
+
+    def take(self, key, capacity, refill, now):
+        try:
+            return self._take(key, capacity, refill, now)
+        except sqlite3.Error as error:
+            logger.warning("Хранилище ведер %s недоступно (%s), лимит по ведру воркера", self.path, error)
+            return self._fallback.take(key, capacity, refill, now)
+
+    def _take(self, key, capacity, refill, now):
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row or (capacity, now)
+            tokens = min(capacity, tokens + (now - updated) * refill)
+            wait = 0 if tokens >= 1 else (1 - tokens) / refill
+            if not wait:
+                tokens -= 1
+            db.execute(
+                'INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                (key, tokens, now),
+            )
+            if random.random() < self.prune_probability:
+                db.execute('DELETE FROM buckets WHERE updated < ?', (now - self.prune_age,))
+            db.execute('COMMIT')
+        except BaseException:
+            if db.in_transaction:
+                db.execute('ROLLBACK')
+            raise
+        return wait
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store():
+    name = api_settings.user_settings.get('TOKEN_BUCKET_STORE', 'local')
+    store = _stores.get(name)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(name)
+            if store is None:
+                if name == 'local':
+                    store = LocalBucketStore()
+                elif name.startswith('sqlite:'):
+                    store = SQLiteBucketStore(name[len('sqlite:'):])
+                else:
+                    raise ImproperlyConfigured(f'Неизвестное хранилище TOKEN_BUCKET_STORE: {name}')
+                _stores[name] = store
+    return store
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Лимиты по IP и на эндпоинт для представлений с ``throttle_scope``.
+
+    Общее ведро эндпоинта проверяется только для запросов, прошедших лимит
+    по IP, чтобы один клиент не расходовал общий лимит своими отказами.
+    """
+
+    def get_rates(self, scope):
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        try:
+            ip_rate = rates[scope]
+        except KeyError:
+            raise ImproperlyConfigured(f'Не задана скорость для throttle_scope "{scope}"')
+        return ip_rate, rates.get(scope + '_total')
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if not scope:
+            return True
+        ip_rate, total_rate = self.get_rates(scope)
+        store = get_store()
+        now = time.time()
+        self.retry_after = store.take(f'{scope}:ip:{self.get_ident(request)}', *parse_rate(ip_rate), now)
+        if not self.retry_after and total_rate:
+            self.retry_after = store.take(f'{scope}:total', *parse_rate(total_rate), now)
+        return not self.retry_after
+
+    def wait(self):
+        return self.retry_after
@@ -1,6 +1,7 @@
 from django.urls import path
 from .views import (
     MainCategoryListView, 
+    CategoryTreeView,
     SubCategoryServiceDetailsView, 
     OurProjectListView, 
     WorkStepListView, 
@@ -8,13 +9,19 @@ from .views import (
     IncrementVideoViewsView,
     WhyChooseUsListView,
     ClientReviewListView,
+    ClientReviewSummaryView,
     ClientReviewCreateView,
-    CallbackRequestCreateView
+    CallbackRequestCreateView,
+    HomepageView,
+    SearchView,
+    CallbackRequestExportView,
+    ClientReviewExportView
 )
 
 
 urlpatterns = [
     path('categories/', MainCategoryListView.as_view(), name='main-categories-list'),
+    path('categories/tree/', CategoryTreeView.as_view(), name='category-tree'),
     path('service-details/', SubCategoryServiceDetailsView.as_view(), name='service-details'),
     path('projects/', OurProjectListView.as_view(), name='our-projects-list'),
     path('work-steps/', WorkStepListView.as_view(), name='work-steps-list'),
@@ -22,6 +29,11 @@ urlpatterns = [
     path('youtube-videos/increment-views/', IncrementVideoViewsView.as_view(), name='increment-video-views'),
     path('why-choose-us/', WhyChooseUsListView.as_view(), name='why-choose-us-list'),
     path('client-reviews/', ClientReviewListView.as_view(), name='client-reviews-list'),
+    path('client-reviews/summary/', ClientReviewSummaryView.as_view(), name='client-review-summary'),
     path('client-reviews/create/', ClientReviewCreateView.as_view(), name='client-review-create'),
     path('callback-request/', CallbackRequestCreateView.as_view(), name='callback-request-create'),
+    path('homepage/', HomepageView.as_view(), name='homepage'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('exports/callback-requests/', CallbackRequestExportView.as_view(), name='callback-requests-export'),
+    path('exports/client-reviews/', ClientReviewExportView.as_view(), name='client-reviews-export'),
 ]
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""Счетчики версий контента для валидаторов ETag / Last-Modified.
+
+Версия модели увеличивается после коммита каждой транзакции, изменившей её
+объекты (см. ``signals.py``). Проверка валидатора стоит один маленький запрос
+к ``content_versions`` вместо выборки и сериализации всего списка.
+"""
+import hashlib
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import ContentVersion
+
+
+def model_label(model):
+    return model._meta.concrete_model._meta.label_lower
+
+
+BUMP_SQL = (
+    'INSERT INTO content_versions (model, version, updated_at) VALUES {values} '
+    'ON CONFLICT (model) DO UPDATE SET version = content_versions.version + 1, updated_at = EXCLUDED.updated_at'
+)
+
+
+def bump(models):
+    """Увеличить версии указанных моделей.
+
+    Один ``INSERT ... ON CONFLICT DO UPDATE``: первая запись версии в
+    параллельных транзакциях не теряет ни одного увеличения.
+    """
+    labels = sorted({model_label(model) for model in models})
+    if not labels:
+        return
+    now = timezone.now()
+    params = []
+    for label in labels:
+        params += [label, 1, now]
+    with connection.cursor() as cursor:
+        cursor.execute(BUMP_SQL.format(values=', '.join(['(%s, %s, %s)'] * len(labels))), params)
+
+
+def request_key(request, media_type):
+    """Ключ представления: хост, путь с параметрами и формат ответа"""
+    return '%s|%s|%s' % (request.get_host(), request.get_full_path(), media_type)
+
+
+def _versions_queryset(labels):
+    return ContentVersion.objects.filter(model__in=labels).values_list('model', 'version', 'updated_at')
+
+
+def get_validators(models, key=''):
+    """Вернуть (etag, last_modified) для набора моделей.
+
+    ``key`` добавляется к хэшу, чтобы разные представления одного и того же
+    контента (параметры запроса, формат ответа) получали разные ETag.
+    """
+    labels = sorted({model_label(model) for model in models})
+    return _build_validators(labels, _versions_queryset(labels), key)
+
+
+async def aget_validators(models, key=''):
+    """Асинхронный вариант ``get_validators``"""
+    labels = sorted({model_label(model) for model in models})
+    return _build_validators(labels, [row async for row in _versions_queryset(labels)], key)
+
+
+def _build_validators(labels, versions, key):
+    rows = {label: (version, updated_at) for label, version, updated_at in versions}
+    digest = hashlib.sha1(key.encode())
+    for label in labels:
+        version = rows.get(label, (0, None))[0]
+        digest.update(f'|{label}:{version}'.encode())
+    etag = '"%s"' % digest.hexdigest()
+    timestamps = [updated_at for _, updated_at in rows.values()]
+    last_modified = max(timestamps) if timestamps else None
+    return etag, last_modified
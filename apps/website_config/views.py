@@ -1,20 +1,37 @@
+import math
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchRank
+from django.db import connection
+from django.db.models import CharField, F, TextField, Value
+from django.http import HttpResponse
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, status
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
-from .models import MainCategory, SubCategory, ServiceDetails, OurProject, WorkStep, YouTubeVideo, WhyChooseUs, ClientReview, CallbackRequest
+from . import exports, homepage, ingestion, search
+from .counters import video_views
+from .fast_serializers import compile_serializer
+from .mixins import CompiledListMixin, ConditionalGetMixin
+from .models import Category, MainCategory, SubCategory, ServiceDetails, OurProject, WorkStep, YouTubeVideo, WhyChooseUs, ClientReview, ClientReviewSummary, CallbackRequest
+from .pagination import CreatedAtKeysetPagination, ServiceDetailsKeysetPagination
 from .serializers import (
     MainCategoryWithSubsSerializer, ServiceDetailsSerializer, OurProjectSerializer, 
     WorkStepSerializer, YouTubeVideoSerializer, WhyChooseUsSerializer, 
-    ClientReviewSerializer, ClientReviewCreateSerializer, CallbackRequestSerializer
+    ClientReviewSerializer, ClientReviewCreateSerializer, ClientReviewSummarySerializer, CallbackRequestSerializer,
+    VideoViewsBatchSerializer
 )
 
 
-class MainCategoryListView(generics.ListAPIView):
+class MainCategoryListView(ConditionalGetMixin, generics.ListAPIView):
     """
     API для получения списка главных категорий с подкатегориями
     """
-    queryset = MainCategory.objects.filter(is_active=True).order_by('-id')
+    conditional_models = (Category, ServiceDetails)
+    queryset = MainCategory.objects.active_tree().order_by('-id')
     serializer_class = MainCategoryWithSubsSerializer
     
     @extend_schema(
@@ -26,27 +43,209 @@ class MainCategoryListView(generics.ListAPIView):
         return super().get(request, *args, **kwargs)
 
 
-class SubCategoryServiceDetailsView(APIView):
+class CategoryTreeView(ConditionalGetMixin, APIView):
+    """
+    API для получения дерева категорий произвольной глубины
     """
-    API для получения деталей услуг по ID подкатегории
+    conditional_models = (Category,)
+
+    @extend_schema(
+        summary="Дерево категорий",
+        description=(
+            "Получить вложенное дерево активных категорий: всё дерево или поддерево категории root. "
+            "Поддерево выбирается одним запросом по материализованному пути; ветки под неактивными "
+            "категориями не отдаются."
+        ),
+        parameters=[
+            OpenApiParameter(
+                name='root',
+                type=int,
+                location=OpenApiParameter.QUERY,
+                description='ID корня поддерева; без параметра - все главные категории',
+                required=False
+            ),
+            OpenApiParameter(
+                name='depth',
+                type=int,
+                location=OpenApiParameter.QUERY,
+                description='Сколько уровней под корнем включить (0 - только корень); без параметра - все',
+                required=False
+            )
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+        tags=["Категории"]
+    )
+    def get(self, request):
+        """Получить дерево категорий"""
+        try:
+            root_id = self.get_int_param(request, 'root')
+            depth = self.get_int_param(request, 'depth')
+        except ValueError:
+            return Response(
+                {"error": "Параметры root и depth должны быть целыми неотрицательными числами"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        categories = Category.objects.filter(is_active=True)
+        if root_id is not None:
+            root = categories.only('path', 'depth').filter(id=root_id).first()
+            if root is None:
+                return Response(
+                    {"error": "Категория не найдена"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            categories = categories.subtree(root, depth=depth)
+        elif depth is not None:
+            categories = categories.filter(depth__lte=depth)
+
+        # Родители идут раньше детей: узел без загруженного родителя лежит под неактивной веткой
+        nodes = {}
+        tree = []
+        for row in categories.order_by('depth', 'name', 'id').values('id', 'parent_id', 'name', 'depth'):
+            node = {"id": row['id'], "name": row['name'], "depth": row['depth'], "children": []}
+            nodes[row['id']] = node
+            if row['id'] == root_id or (root_id is None and row['parent_id'] is None):
+                tree.append(node)
+            elif row['parent_id'] in nodes:
+                nodes[row['parent_id']]['children'].append(node)
+        return Response(tree)
+
+    @staticmethod
+    def get_int_param(request, name):
+        value = request.query_params.get(name)
+        if not value:
+            return None
+        value = int(value)
+        if value < 0:
+            raise ValueError(name)
+        return value
+
+
+class ServiceDetailsBatch:
+    """Галереи нескольких подкатегорий одним ответом: подкатегории (IN / parent_id) и детали - два запроса.
+
+    Подкатегории задаются списком ``sub_category_ids`` (через запятую или
+    повтором параметра) или родительской категорией ``category_id``.
+    Неверные параметры - ``ValueError`` с текстом ошибки для ответа 400.
+    """
+    max_ids = 100
+
+    def __init__(self, params):
+        if params.get('cursor') or params.get('page_size'):
+            raise ValueError("Пагинация доступна только для одной подкатегории (sub_category_id)")
+        try:
+            ids = [
+                int(part) for value in params.getlist('sub_category_ids')
+                for part in value.split(',') if part.strip()
+            ]
+            self.category_id = int(params['category_id']) if params.get('category_id') else None
+        except ValueError:
+            raise ValueError("Параметры sub_category_ids и category_id должны содержать целые числа")
+        # Порядок запроса без повторов
+        self.sub_category_ids = list(dict.fromkeys(ids))
+        if bool(self.sub_category_ids) == (self.category_id is not None):
+            raise ValueError("Укажите sub_category_ids или category_id")
+        if len(self.sub_category_ids) > self.max_ids:
+            raise ValueError(f"Не больше {self.max_ids} подкатегорий за запрос")
+        self.compiled = compile_serializer(ServiceDetailsSerializer)
+
+    def sub_categories(self):
+        queryset = SubCategory.objects.filter(is_active=True)
+        if self.category_id is not None:
+            queryset = queryset.filter(parent_id=self.category_id, parent__is_active=True)
+        else:
+            queryset = queryset.filter(id__in=self.sub_category_ids)
+        return queryset.values('id', 'name')
+
+    def service_details(self, sub_categories):
+        """Детали всех найденных подкатегорий одним запросом по индексу (category, order, created_at)"""
+        return ServiceDetails.objects.filter(
+            category_id__in=[sub_category['id'] for sub_category in sub_categories]
+        ).values(*self.compiled.sources, 'category_id')
+
+    def response(self, sub_categories, service_details, request):
+        """(статус, данные): галереи по ID подкатегории и ID, которые не найдены"""
+        grouped = {}
+        for row in service_details:
+            grouped.setdefault(row['category_id'], []).append(row)
+        if self.category_id is None:
+            names = {sub_category['id']: sub_category['name'] for sub_category in sub_categories}
+            sub_categories = [{'id': pk, 'name': names[pk]} for pk in self.sub_category_ids if pk in names]
+        if not sub_categories:
+            error = "Подкатегории не найдены" if self.category_id is None else "Категория не найдена или пуста"
+            return status.HTTP_404_NOT_FOUND, {"error": error, "not_found": self.sub_category_ids}
+
+        data = {"category_id": self.category_id} if self.category_id is not None else {}
+        data["results"] = {
+            str(sub_category['id']): {
+                "sub_category_id": sub_category['id'],
+                "sub_category_name": sub_category['name'],
+                "service_details": self.compiled.serialize(grouped.get(sub_category['id'], []), request),
+            }
+            for sub_category in sub_categories
+        }
+        found = {sub_category['id'] for sub_category in sub_categories}
+        data["not_found"] = [pk for pk in self.sub_category_ids if pk not in found]
+        return status.HTTP_200_OK, data
+
+
+class SubCategoryServiceDetailsView(ConditionalGetMixin, APIView):
     """
+    API для получения деталей услуг по ID подкатегории или сразу для нескольких подкатегорий
+    """
+    conditional_models = (Category, ServiceDetails)
     
     @extend_schema(
         summary="Детали услуг подкатегории",
-        description="Получить список деталей услуг для конкретной подкатегории",
+        description=(
+            "Получить список деталей услуг для конкретной подкатегории. С sub_category_ids или category_id - "
+            "галереи нескольких подкатегорий одним ответом: results по ID подкатегории и not_found "
+            "со списком ненайденных ID (без пагинации)"
+        ),
         parameters=[
             OpenApiParameter(
                 name='sub_category_id',
                 type=int,
                 location=OpenApiParameter.QUERY,
                 description='ID подкатегории',
-                required=True
+                required=False
+            ),
+            OpenApiParameter(
+                name='sub_category_ids',
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description='ID подкатегорий через запятую (до 100)',
+                required=False
+            ),
+            OpenApiParameter(
+                name='category_id',
+                type=int,
+                location=OpenApiParameter.QUERY,
+                description='ID родительской категории: все её активные подкатегории',
+                required=False
+            ),
+            OpenApiParameter(
+                name='cursor',
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description='Курсор следующей страницы (из поля next)',
+                required=False
+            ),
+            OpenApiParameter(
+                name='page_size',
+                type=int,
+                location=OpenApiParameter.QUERY,
+                description='Размер страницы; без cursor и page_size отдаются все детали',
+                required=False
             )
         ],
         tags=["Категории"]
     )
     def get(self, request):
         """Получить детали услуг по ID подкатегории"""
+        if 'sub_category_ids' in request.query_params or 'category_id' in request.query_params:
+            return self.get_batch(request)
+
         sub_category_id = request.query_params.get('sub_category_id')
         
         if not sub_category_id:
@@ -64,6 +263,17 @@ class SubCategoryServiceDetailsView(APIView):
             )
         
         service_details = ServiceDetails.objects.filter(category=sub_category)
+        paginator = ServiceDetailsKeysetPagination()
+        page = paginator.paginate_queryset(service_details, request, view=self)
+        if page is not None:
+            serializer = ServiceDetailsSerializer(page, many=True, context={'request': request})
+            return Response({
+                "sub_category_id": sub_category.id,
+                "sub_category_name": sub_category.name,
+                "service_details": serializer.data,
+                "next": paginator.get_next_link()
+            })
+        
         serializer = ServiceDetailsSerializer(service_details, many=True, context={'request': request})
         
         return Response({
@@ -72,14 +282,26 @@ class SubCategoryServiceDetailsView(APIView):
             "service_details": serializer.data
         })
 
+    def get_batch(self, request):
+        """Галереи нескольких подкатегорий: два запроса вместо двух на каждую подкатегорию"""
+        try:
+            batch = ServiceDetailsBatch(request.query_params)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        sub_categories = list(batch.sub_categories())
+        service_details = list(batch.service_details(sub_categories)) if sub_categories else []
+        response_status, data = batch.response(sub_categories, service_details, request)
+        return Response(data, status=response_status)
+
 
-class OurProjectListView(generics.ListAPIView):
+class OurProjectListView(ConditionalGetMixin, CompiledListMixin, generics.ListAPIView):
     """
     API для получения списка наших проектов
     """
+    conditional_models = (OurProject,)
     queryset = OurProject.objects.all()
     serializer_class = OurProjectSerializer
-    pagination_class = None  # Отключаем пагинацию для простого списка
+    pagination_class = CreatedAtKeysetPagination  # Только при ?cursor= / ?page_size=, иначе весь список
     
     @extend_schema(
         summary="Список наших проектов",
@@ -90,10 +312,11 @@ class OurProjectListView(generics.ListAPIView):
         return super().get(request, *args, **kwargs)
 
 
-class WorkStepListView(generics.ListAPIView):
+class WorkStepListView(ConditionalGetMixin, CompiledListMixin, generics.ListAPIView):
     """
     API для получения списка шагов работы
     """
+    conditional_models = (WorkStep,)
     queryset = WorkStep.objects.all()
     serializer_class = WorkStepSerializer
     pagination_class = None  # Отключаем пагинацию для простого списка
@@ -107,10 +330,11 @@ class WorkStepListView(generics.ListAPIView):
         return super().get(request, *args, **kwargs)
 
 
-class YouTubeVideoListView(generics.ListAPIView):
+class YouTubeVideoListView(ConditionalGetMixin, CompiledListMixin, generics.ListAPIView):
     """
     API для получения списка YouTube видео
     """
+    conditional_models = (YouTubeVideo,)
     queryset = YouTubeVideo.objects.all()
     serializer_class = YouTubeVideoSerializer
     pagination_class = None  # Отключаем пагинацию для простого списка
@@ -128,53 +352,69 @@ class IncrementVideoViewsView(APIView):
     """
     API для увеличения счетчика просмотров видео
     """
+    # Публичный счетчик: без аутентификации, чтобы запрос не обращался к сессиям в БД
+    authentication_classes = []
+    throttle_scope = 'video_views'
     
     @extend_schema(
         summary="Увеличить просмотры видео",
-        description="Увеличить счетчик просмотров для конкретного YouTube видео на +1",
+        description=(
+            "Учесть просмотр (+1) для одного или нескольких YouTube видео. "
+            "ID передаются параметром id (можно повторять) или списком ids в теле запроса, "
+            "например через navigator.sendBeacon. Просмотры записываются в БД пакетно "
+            "в фоне, поэтому счетчик в списке видео обновляется с небольшой задержкой."
+        ),
         parameters=[
             OpenApiParameter(
                 name='id',
                 type=int,
                 location=OpenApiParameter.QUERY,
                 description='ID видео',
-                required=True
+                required=False,
+                many=True
             )
         ],
+        request=VideoViewsBatchSerializer,
+        responses={202: OpenApiTypes.OBJECT},
         tags=["YouTube Видео"]
     )
     def post(self, request):
         """Увеличить счетчик просмотров видео"""
-        video_id = request.query_params.get('id')
+        ids = request.query_params.getlist('id')
+        if not ids:
+            data = request.data
+            if hasattr(data, 'getlist'):
+                ids = data.getlist('ids')
+            elif isinstance(data, dict):
+                ids = data.get('ids')
         
-        if not video_id:
+        if not ids:
             return Response(
                 {"error": "Параметр id обязателен"},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        try:
-            video = YouTubeVideo.objects.get(id=video_id)
-            video.viewers += 1
-            video.save()
-            
-            serializer = YouTubeVideoSerializer(video, context={'request': request})
-            return Response({
+        serializer = VideoViewsBatchSerializer(data={'ids': ids})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        video_ids = serializer.validated_data['ids']
+        video_views.add(video_ids)
+        return Response(
+            {
                 "success": True,
-                "message": "Просмотры увеличены",
-                "video": serializer.data
-            })
-        except YouTubeVideo.DoesNotExist:
-            return Response(
-                {"error": "Видео не найдено"},
-                status=status.HTTP_404_NOT_FOUND
-            )
+                "message": "Просмотры учтены",
+                "accepted": len(video_ids)
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
 
 
-class WhyChooseUsListView(generics.ListAPIView):
+class WhyChooseUsListView(ConditionalGetMixin, CompiledListMixin, generics.ListAPIView):
     """
     API для получения списка преимуществ
     """
+    conditional_models = (WhyChooseUs,)
     queryset = WhyChooseUs.objects.filter(is_active=True)
     serializer_class = WhyChooseUsSerializer
     pagination_class = None  # Отключаем пагинацию для простого списка
@@ -188,13 +428,14 @@ class WhyChooseUsListView(generics.ListAPIView):
         return super().get(request, *args, **kwargs)
 
 
-class ClientReviewListView(generics.ListAPIView):
+class ClientReviewListView(ConditionalGetMixin, CompiledListMixin, generics.ListAPIView):
     """
     API для получения списка отзывов клиентов
     """
+    conditional_models = (ClientReview,)
     queryset = ClientReview.objects.filter(is_active=True)
     serializer_class = ClientReviewSerializer
-    pagination_class = None  # Отключаем пагинацию для простого списка
+    pagination_class = CreatedAtKeysetPagination  # Только при ?cursor= / ?page_size=, иначе весь список
     
     @extend_schema(
         summary="Отзывы клиентов",
@@ -205,11 +446,44 @@ class ClientReviewListView(generics.ListAPIView):
         return super().get(request, *args, **kwargs)
 
 
+class ClientReviewSummaryView(ConditionalGetMixin, APIView):
+    """
+    API для получения сводки рейтинга отзывов
+    """
+    conditional_models = (ClientReview,)
+
+    @extend_schema(
+        summary="Рейтинг отзывов",
+        description=(
+            "Число опубликованных отзывов, средняя оценка и распределение по звёздам. "
+            "Сводка поддерживается при каждом изменении отзывов и читается одной строкой"
+        ),
+        responses={200: ClientReviewSummarySerializer},
+        tags=["Отзывы"]
+    )
+    def get(self, request):
+        """Получить сводку рейтинга"""
+        return Response(ClientReviewSummarySerializer(ClientReviewSummary.objects.get_summary()).data)
+
+
+def ingestion_busy_response():
+    """429, если буфер отложенной записи заполнен (см. ingestion.py)"""
+    retry_after = math.ceil(ingestion.callback_requests.flush_interval or 1)
+    return Response(
+        {"error": "Слишком много запросов, попробуйте позже"},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={'Retry-After': str(retry_after)}
+    )
+
+
 class ClientReviewCreateView(generics.CreateAPIView):
     """
     API для создания отзыва клиента
     """
     serializer_class = ClientReviewCreateSerializer
+    # Анонимная форма: без сессии, отказ по лимиту не обращается к БД
+    authentication_classes = []
+    throttle_scope = 'client_review'
     
     @extend_schema(
         summary="Оставить отзыв",
@@ -221,7 +495,13 @@ class ClientReviewCreateView(generics.CreateAPIView):
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            review = serializer.save(is_active=False)  # По умолчанию неактивен (модерация)
+            if settings.WRITE_BEHIND_INGESTION:
+                try:
+                    review = ingestion.client_reviews.add({**serializer.validated_data, 'is_active': False})
+                except ingestion.BufferFull:
+                    return ingestion_busy_response()
+            else:
+                review = serializer.save(is_active=False)  # По умолчанию неактивен (модерация)
             return Response(
                 {
                     "success": True,
@@ -238,6 +518,9 @@ class CallbackRequestCreateView(generics.CreateAPIView):
     API для создания заявки на обратный звонок
     """
     serializer_class = CallbackRequestSerializer
+    # Анонимная форма: без сессии, отказ по лимиту не обращается к БД
+    authentication_classes = []
+    throttle_scope = 'callback_request'
     
     @extend_schema(
         summary="Заказать обратный звонок",
@@ -249,7 +532,13 @@ class CallbackRequestCreateView(generics.CreateAPIView):
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            callback = serializer.save()
+            if settings.WRITE_BEHIND_INGESTION:
+                try:
+                    callback = ingestion.callback_requests.add(dict(serializer.validated_data))
+                except ingestion.BufferFull:
+                    return ingestion_busy_response()
+            else:
+                callback = serializer.save()
             return Response(
                 {
                     "success": True,
@@ -259,3 +548,200 @@ class CallbackRequestCreateView(generics.CreateAPIView):
                 status=status.HTTP_201_CREATED
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class HomepageView(APIView):
+    """
+    API для получения всего публичного контента главной страницы одним ответом
+    """
+    # Ответ отдаётся из кэша как есть: без аутентификации и запросов к БД
+    authentication_classes = []
+    permission_classes = []
+
+    @extend_schema(
+        summary="Главная страница",
+        description="Получить категории, проекты, шаги работы, видео, преимущества, отзывы и детали услуг одним запросом",
+        responses={200: OpenApiTypes.OBJECT},
+        tags=["Главная страница"]
+    )
+    def get(self, request):
+        """Получить предварительно собранный снимок главной страницы"""
+        return HttpResponse(homepage.get_payload(), content_type='application/json')
+
+
+class SearchView(ConditionalGetMixin, APIView):
+    """
+    API полнотекстового поиска по категориям, шагам работы, преимуществам и отзывам
+    """
+    conditional_models = (Category, WorkStep, WhyChooseUs, ClientReview)
+    throttle_scope = 'search'
+    default_limit = 20
+    max_limit = 50
+    max_query_length = 200
+
+    # Тип -> (выборка, документ из search.py - тот же, что в GIN-индексе, заголовок, текст)
+    sources = {
+        'category': (Category.objects.filter(is_active=True), search.CATEGORY_DOCUMENT, 'name', None),
+        'work_step': (WorkStep.objects.all(), search.WORK_STEP_DOCUMENT, 'title', 'description'),
+        'why_choose_us': (
+            WhyChooseUs.objects.filter(is_active=True), search.WHY_CHOOSE_US_DOCUMENT, 'title', 'description'
+        ),
+        'client_review': (
+            ClientReview.objects.filter(is_active=True), search.CLIENT_REVIEW_DOCUMENT, 'full_name', 'comment'
+        ),
+    }
+
+    @extend_schema(
+        summary="Поиск",
+        description=(
+            "Полнотекстовый поиск (русский со стеммингом и узбекский/точные слова) по категориям, "
+            "шагам работы, преимуществам и опубликованным отзывам. Результаты отсортированы по релевантности "
+            "(ts_rank) среди всех совпадений, без выборки кандидатов: время ответа растёт с числом совпадений "
+            "частого слова. Поддерживается синтаксис веб-поиска: \"фраза\", -исключение, or."
+        ),
+        parameters=[
+            OpenApiParameter(name='q', type=str, location=OpenApiParameter.QUERY, description='Запрос', required=True),
+            OpenApiParameter(
+                name='type',
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description='Типы через запятую: category, work_step, why_choose_us, client_review',
+                required=False
+            ),
+            OpenApiParameter(
+                name='limit', type=int, location=OpenApiParameter.QUERY, description='Не больше 50', required=False
+            ),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+        tags=["Поиск"]
+    )
+    def get(self, request):
+        """Найти контент по запросу"""
+        if connection.vendor != 'postgresql':
+            return Response(
+                {"error": "Поиск доступен только с PostgreSQL"},
+                status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+
+        text = request.query_params.get('q', '').strip()
+        if not text or len(text) > self.max_query_length:
+            return Response(
+                {"error": f"Параметр q обязателен (до {self.max_query_length} символов)"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        types = request.query_params.get('type')
+        types = [item for item in types.split(',') if item] if types else list(self.sources)
+        unknown = [item for item in types if item not in self.sources]
+        if unknown:
+            return Response(
+                {"error": f"Неизвестный тип: {', '.join(unknown)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            limit = self.default_limit
+        limit = max(limit, 1)
+
+        query = search.query(text)
+        parts = []
+        for result_type in types:
+            queryset, document, title, body = self.sources[result_type]
+            # filter(document=query) - оператор @@ по выражению GIN-индекса: ts_rank считается только
+            # для совпадений. Лучшие limit строк ответа входят в лучшие limit строк своего типа,
+            # поэтому каждая часть сортируется по rank и ограничивается limit - результат точный
+            parts.append(
+                queryset.annotate(document=document)
+                .filter(document=query)
+                .values(
+                    'id',
+                    result_type=Value(result_type, output_field=CharField()),
+                    result_title=F(title),
+                    result_text=F(body) if body else Value('', output_field=TextField()),
+                    rank=SearchRank(document, query),
+                )
+                .order_by('-rank', '-id')[:limit]
+            )
+        # Пустая часть делает запрос составным и для одного типа: сортировка идёт поверх LIMIT частей
+        rows = parts[0].union(*parts[1:] or [parts[0].none()], all=True).order_by('-rank', '-id')[:limit]
+
+        results = [
+            {
+                "type": row['result_type'],
+                "id": row['id'],
+                "title": row['result_title'],
+                "text": row['result_text'],
+                "rank": round(row['rank'], 6),
+            }
+            for row in rows
+        ]
+        return Response({"query": text, "count": len(results), "results": results})
+
+
+class ExportView(generics.GenericAPIView):
+    """
+    Базовое представление потоковой выгрузки (exports.py) для сотрудников
+    """
+    permission_classes = [IsAdminUser]
+    filter_backends = [DjangoFilterBackend]
+    pagination_class = None
+
+    def get(self, request):
+        export_format = request.query_params.get('output', 'csv')
+        if export_format not in exports.FORMATS:
+            return Response(
+                {"error": f"Параметр output: {', '.join(exports.FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return exports.export_response(
+            self.filter_queryset(self.get_queryset()), export_format, asynchronous=exports.is_asgi(request)
+        )
+
+
+export_parameters = [
+    OpenApiParameter(
+        name='output',
+        type=str,
+        location=OpenApiParameter.QUERY,
+        description='csv (по умолчанию) или ndjson',
+        required=False
+    ),
+]
+
+
+class CallbackRequestExportView(ExportView):
+    """
+    API выгрузки заявок на обратный звонок
+    """
+    queryset = CallbackRequest.objects.all()
+    filterset_class = exports.CallbackRequestExportFilter
+
+    @extend_schema(
+        summary="Выгрузка заявок",
+        description="Потоковая выгрузка заявок в CSV или NDJSON с фильтрами по периоду (date_from, date_to) и is_processed",
+        parameters=export_parameters,
+        responses={200: OpenApiTypes.BINARY},
+        tags=["Выгрузки"]
+    )
+    def get(self, request):
+        return super().get(request)
+
+
+class ClientReviewExportView(ExportView):
+    """
+    API выгрузки отзывов клиентов
+    """
+    queryset = ClientReview.objects.all()
+    filterset_class = exports.ClientReviewExportFilter
+
+    @extend_schema(
+        summary="Выгрузка отзывов",
+        description="Потоковая выгрузка отзывов в CSV или NDJSON с фильтрами по периоду (date_from, date_to) и is_active",
+        parameters=export_parameters,
+        responses={200: OpenApiTypes.BINARY},
+        tags=["Выгрузки"]
+    )
+    def get(self, request):
+        return super().get(request)
@@ -0,0 +1,256 @@
+"""Двухуровневый кэш: LRU в памяти процесса перед общим для воркеров кэшем.
+
+``TieredCache`` - бэкенд ``django.core.cache``. Значения хранятся в общем
+уровне (другой алиас ``CACHES``: файловый кэш на диске сервера или Redis),
+а прочитанные копии - в ограниченном LRU каждого процесса. Повторное чтение
+горячего ключа не передаёт и не распаковывает значение из общего уровня.
+
+Согласованность между воркерами обеспечивает поколение: небольшой ключ в
+общем уровне, который меняется при каждой записи (``set``, ``delete``,
+``incr``, ``clear``...). Каждое чтение сначала получает текущее поколение, а
+локальная копия используется, только если записана в том же поколении.
+Поэтому изменение в одном воркере видно остальным уже при следующем чтении.
+Запись сначала сохраняет значение, потом меняет поколение; чтение - наоборот.
+Запись не кладёт значение в локальный уровень: при параллельных записях
+поколение писателя может оказаться текущим, а его значение - уже нет.
+Локальную копию создаёт следующее чтение из общего уровня.
+Ключ поколения может быть вытеснен из общего уровня (отсечение файлового
+кэша по ``MAX_ENTRIES``, ``maxmemory`` Redis). Тогда читатель создаёт новое
+случайное поколение: значение, которое было до вытеснения, не повторяется,
+и старые локальные копии не оживают.
+
+Любая запись сбрасывает локальные копии всех ключей во всех процессах:
+уровень рассчитан на контент, который читается намного чаще, чем меняется
+(снимок главной страницы и т.п.).
+
+Переменные окружения:
+    CACHE_REDIS_URL - общий уровень в Redis (нужен пакет redis)
+    CACHE_DIR - общий уровень - файловый кэш в этом каталоге (общий для
+        воркеров одного сервера)
+    Без них - ``LocMemCache`` процесса, как у Django по умолчанию: тесты и
+    ``runserver`` не делят состояние между запусками и процессами.
+    CACHE_LOCAL_MAX_ENTRIES - размер LRU процесса (0 - без локального уровня)
+    CACHE_LOCAL_TIMEOUT - максимальный срок жизни локальной копии в секундах
+"""
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Значения этих типов не копируются: изменить их на месте нельзя
+IMMUTABLE_TYPES = (bytes, str, int, float, bool, type(None))
+
+
+def cache_settings(environ=os.environ):
+    """Настройка CACHES: ``default`` - TieredCache поверх алиаса ``shared``"""
+    redis_url = environ.get('CACHE_REDIS_URL')
+    cache_dir = environ.get('CACHE_DIR')
+    if redis_url:
+        shared = {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': redis_url,
+        }
+    elif cache_dir:
+        shared = {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': cache_dir,
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    else:
+        # Общего уровня нет: локальный LRU поверх него ничего бы не дал
+        return {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    shared['KEY_PREFIX'] = 'pbb'
+
+    local_max_entries = int(environ.get('CACHE_LOCAL_MAX_ENTRIES', 1000))
+    if not local_max_entries:
+        return {'default': shared, 'shared': shared}
+    return {
+        'default': {
+            'BACKEND': 'config.cache.TieredCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {
+                'MAX_ENTRIES': local_max_entries,
+                'LOCAL_TIMEOUT': float(environ.get('CACHE_LOCAL_TIMEOUT', 300)),
+            },
+        },
+        'shared': shared,
+    }
+
+
+class TieredCache(BaseCache):
+    """LRU процесса перед общим кэшем ``LOCATION`` с инвалидацией по поколению"""
+    generation_key = 'tiered-cache:generation'
+    counter_names = ('local_hits', 'shared_hits', 'misses', 'sets', 'evictions', 'invalidations')
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = location
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 300)
+        self._local = OrderedDict()  # ключ -> (поколение, срок, значение, pickled)
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(self.counter_names, 0)
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def stats(self):
+        """Счётчики процесса и число ключей в локальном уровне"""
+        with self._lock:
+            return {**self._counters, 'local_entries': len(self._local)}
+
+    # Поколение
+
+    def _generation(self):
+        generation = self.shared.get(self.generation_key)
+        if generation is None:
+            # Ключ вытеснен или ещё не создан; add() - одно новое поколение на все процессы
+            generation = uuid.uuid4().hex
+            if not self.shared.add(self.generation_key, generation, None):
+                generation = self.shared.get(self.generation_key) or generation
+        return generation
+
+    def _bump(self):
+        # Уникальное значение, а не incr: одновременные записи не могут получить одно поколение
+        generation = uuid.uuid4().hex
+        self.shared.set(self.generation_key, generation, None)
+        return generation
+
+    # Локальный уровень
+
+    def _local_key(self, key, version):
+        return self.make_and_validate_key(key, version=version)
+
+    def _local_get(self, local_key, generation):
+        with self._lock:
+            entry = self._local.get(local_key)
+            if entry is None:
+                return self._missing_key
+            entry_generation, expires, value, pickled = entry
+            if entry_generation != generation or expires <= time.monotonic():
+                del self._local[local_key]
+                if entry_generation != generation:
+                    self._counters['invalidations'] += 1
+                return self._missing_key
+            self._local.move_to_end(local_key)
+            self._counters['local_hits'] += 1
+        return pickle.loads(value) if pickled else value
+
+    def _local_set(self, local_key, generation, value):
+        lifetime = self.local_timeout
+        if lifetime <= 0:
+            return
+        pickled = not isinstance(value, IMMUTABLE_TYPES)
+        if pickled:
+            # Как у LocMemCache: изменения полученного объекта не попадают в кэш
+            value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local[local_key] = (generation, time.monotonic() + lifetime, value, pickled)
+            self._local.move_to_end(local_key)
+            while len(self._local) > self._max_entries:
+                self._local.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def _local_delete(self, *local_keys):
+        with self._lock:
+            for local_key in local_keys:
+                self._local.pop(local_key, None)
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self._counters[name] += value
+
+    # API django.core.cache
+
+    def get(self, key, default=None, version=None):
+        local_key = self._local_key(key, version)
+        generation = self._generation()
+        value = self._local_get(local_key, generation)
+        if value is not self._missing_key:
+            return value
+        value = self.shared.get(key, self._missing_key, version=version)
+        if value is self._missing_key:
+            self._count('misses')
+            return default
+        self._count('shared_hits')
+        self._local_set(local_key, generation, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        generation = self._generation()
+        found = {}
+        missing = {}
+        for key in keys:
+            local_key = self._local_key(key, version)
+            value = self._local_get(local_key, generation)
+            if value is self._missing_key:
+                missing[key] = local_key
+            else:
+                found[key] = value
+        if missing:
+            fetched = self.shared.get_many(list(missing), version=version)
+            self._count('shared_hits', len(fetched))
+            self._count('misses', len(missing) - len(fetched))
+            for key, value in fetched.items():
+                self._local_set(missing[key], generation, value)
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self._local_key(key, version)
+        self.shared.set(key, value, timeout, version=version)
+        self._count('sets')
+        self._bump()
+        self._local_delete(local_key)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self._local_key(key, version)
+        if not self.shared.add(key, value, timeout, version=version):
+            return False
+        self._count('sets')
+        self._bump()
+        self._local_delete(local_key)
+        return True
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        local_keys = [self._local_key(key, version) for key in data]
+        failed = self.shared.set_many(data, timeout, version=version)
+        self._count('sets', len(data))
+        self._bump()
+        self._local_delete(*local_keys)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        local_key = self._local_key(key, version)
+        deleted = self.shared.delete(key, version=version)
+        self._bump()
+        self._local_delete(local_key)
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        local_keys = [self._local_key(key, version) for key in keys]
+        self.shared.delete_many(keys, version=version)
+        self._bump()
+        self._local_delete(*local_keys)
+
+    def incr(self, key, delta=1, version=None):
+        local_key = self._local_key(key, version)
+        value = self.shared.incr(key, delta, version=version)
+        self._bump()
+        self._local_delete(local_key)
+        return value
+
+    def clear(self):
+        self.shared.clear()
+        with self._lock:
+            self._local.clear()
+        self._bump()
@@ -0,0 +1,76 @@
+"""Настройки подключения к БД из переменных окружения и статистика пула.
+
+Переменные окружения:
+    DB_ENGINE - 'postgresql' (по умолчанию) или 'sqlite'
+    DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT - параметры подключения
+    DB_CONN_MAX_AGE - время жизни постоянного соединения в секундах
+        (0 - новое соединение на каждый запрос)
+    DB_POOL=1 - пул соединений psycopg (psycopg_pool) вместо постоянных соединений
+    DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE - размер пула на процесс
+    DB_POOL_TIMEOUT - сколько секунд запрос ждёт свободное соединение
+"""
+import os
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def database_settings(environ=os.environ):
+    engine = environ.get('DB_ENGINE', 'postgresql')
+    if engine == 'sqlite':
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': environ.get('DB_NAME', str(BASE_DIR / 'db.sqlite3')),
+        }
+
+    database = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': environ.get('DB_NAME', 'pbb'),
+        'USER': environ.get('DB_USER', 'postgres'),
+        'PASSWORD': environ.get('DB_PASSWORD', '0576'),
+        'HOST': environ.get('DB_HOST', 'localhost'),
+        'PORT': int(environ.get('DB_PORT', 5432)),
+        # Соединение проверяется перед повторным использованием в новом запросе
+        'CONN_HEALTH_CHECKS': True,
+    }
+    if environ.get('DB_POOL') == '1':
+        # Пул несовместим с постоянными соединениями Django (CONN_MAX_AGE)
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS'] = {
+            'pool': {
+                'min_size': int(environ.get('DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(environ.get('DB_POOL_MAX_SIZE', 10)),
+                'timeout': float(environ.get('DB_POOL_TIMEOUT', 10)),
+            },
+        }
+    else:
+        database['CONN_MAX_AGE'] = int(environ.get('DB_CONN_MAX_AGE', 60))
+    return database
+
+
+def pool_stats(alias='default'):
+    """Статистика пула соединений текущего процесса или None, если пул не используется.
+
+    ``in_use`` - выданные соединения, ``waiting`` - запросы в очереди за
+    соединением, ``wait_ms`` - суммарное время ожидания с момента запуска.
+    """
+    from django.db import connections
+
+    connection = connections[alias]
+    if connection.vendor != 'postgresql' or not connection.settings_dict.get('OPTIONS', {}).get('pool'):
+        return None
+    stats = connection.pool.get_stats()
+    return {
+        'min_size': stats.get('pool_min', 0),
+        'max_size': stats.get('pool_max', 0),
+        'size': stats.get('pool_size', 0),
+        'available': stats.get('pool_available', 0),
+        'in_use': stats.get('pool_size', 0) - stats.get('pool_available', 0),
+        'waiting': stats.get('requests_waiting', 0),
+        'requests': stats.get('requests_num', 0),
+        'queued': stats.get('requests_queued', 0),
+        'wait_ms': stats.get('requests_wait_ms', 0),
+        'errors': stats.get('requests_errors', 0),
+        'connections': stats.get('connections_num', 0),
+        'connect_ms': stats.get('connections_ms', 0),
+    }
@@ -0,0 +1,136 @@
+"""Отдача файлов из MEDIA_ROOT вместо ``django.views.static.serve``.
+
+Поддерживаются условные запросы (strong ETag / Last-Modified), запросы
+диапазонов (``Range``, один диапазон) и долгий ``immutable`` кэш для
+версионированных файлов (варианты изображений с хэшем содержимого в имени).
+
+Режимы (``MEDIA_SERVE_MODE``):
+    'python' - файл отдаётся через ``FileResponse`` (wsgi.file_wrapper / sendfile)
+    'x-accel-redirect' - передача nginx через ``X-Accel-Redirect`` на
+        internal-location ``MEDIA_ACCEL_REDIRECT_PREFIX``
+    'x-sendfile' - передача Apache/lighttpd через ``X-Sendfile``
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse, HttpResponseNotAllowed, HttpResponseNotFound, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# Имя содержит хэш содержимого: variants/projects/photo.9a35abad6d21.w320.webp
+VERSIONED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+# Сжатый файл отдаётся как есть, без Content-Encoding - как в FileResponse
+ENCODING_CONTENT_TYPES = {
+    'br': 'application/x-brotli',
+    'bzip2': 'application/x-bzip',
+    'compress': 'application/x-compress',
+    'gzip': 'application/gzip',
+    'xz': 'application/x-xz',
+}
+
+
+def cache_control(path):
+    if VERSIONED_NAME_RE.search(os.path.basename(path)):
+        return 'public, max-age=31536000, immutable'
+    return 'public, max-age=%d' % getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600)
+
+
+def parse_range(header, size):
+    """Вернуть (start, end) включительно, None если заголовок не поддерживается, или False если диапазон вне файла"""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def iter_range(path, start, length):
+    with open(path, 'rb') as source:
+        source.seek(start)
+        while length > 0:
+            chunk = source.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_media(request, path):
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        file_stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        # Ответ, а не Http404: JsonErrorResponseMiddleware превращает исключения в 500
+        return HttpResponseNotFound()
+    if not stat.S_ISREG(file_stat.st_mode):
+        return HttpResponseNotFound()
+
+    size = file_stat.st_size
+    etag = '"%x-%x"' % (file_stat.st_mtime_ns, size)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(file_stat.st_mtime),
+        'Cache-Control': cache_control(full_path),
+        'Accept-Ranges': 'bytes',
+    }
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(file_stat.st_mtime))
+    if response is not None:
+        for header, value in headers.items():
+            response.headers[header] = value
+        return response
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = ENCODING_CONTENT_TYPES.get(encoding, content_type) or 'application/octet-stream'
+
+    mode = getattr(settings, 'MEDIA_SERVE_MODE', 'python')
+    if mode == 'x-accel-redirect':
+        # nginx сам обработает Range и отдаст файл через sendfile
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+        return response
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response['X-Sendfile'] = full_path
+        return response
+
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and (not if_range or if_range == etag):
+        byte_range = parse_range(range_header, size)
+        if byte_range is False:
+            response = HttpResponse(status=416, headers=headers)
+            response['Content-Range'] = 'bytes */%d' % size
+            return response
+        if byte_range is not None:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                iter_range(full_path, start, length), status=206, content_type=content_type, headers=headers
+            )
+            response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+            response['Content-Length'] = str(length)
+            return response
+
+    return FileResponse(open(full_path, 'rb'), content_type=content_type, headers=headers)
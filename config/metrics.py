@@ -0,0 +1,252 @@
+"""Метрики запросов в формате Prometheus.
+
+``InstrumentationMiddleware`` (config/middleware/middleware.py) для каждого
+запроса замеряет общее время, число и время SQL-запросов и время рендеринга
+ответа и складывает их в гистограммы по имени URL. ``metrics_view`` отдаёт их
+в текстовом формате Prometheus; доступ только с заголовком
+``Authorization: Bearer <METRICS_TOKEN>``. Адрес клиента не проверяется: за
+nginx все запросы приходят с 127.0.0.1. Без ``METRICS_TOKEN`` ответ 404.
+
+Гистограммы живут в памяти процесса. При нескольких воркерах (gunicorn)
+задайте ``METRICS_DIR``: каждый воркер раз в ``METRICS_DUMP_INTERVAL`` секунд
+сохраняет свой снимок в ``<METRICS_DIR>/metrics.<pid>.json``, а ``/metrics``
+суммирует снимки всех воркеров.
+"""
+import bisect
+import glob
+import hmac
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseNotFound
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Статистика SQL текущего запроса: [число запросов, время в секундах]
+current_queries = ContextVar('current_queries', default=None)
+
+
+def record_queries(execute, sql, params, many, context):
+    """execute_wrapper: учитывает запросы, если идёт замер запроса"""
+    stats = current_queries.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - started
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+def install_on_open_connections():
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection)
+
+
+# Новые соединения (в том числе в потоках sync_to_async) получают обёртку сразу
+connection_created.connect(install_query_recorder)
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def expose(self, series_items):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        for labels, series in series_items:
+            base = format_labels(self.labelnames, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                yield f'{self.name}_bucket{{{base}{"," if base else ""}le="{bound}"}} {cumulative}'
+            yield f'{self.name}_sum{{{base}}} {series[-1]}'
+            yield f'{self.name}_count{{{base}}} {cumulative}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.series = {}
+
+    def inc(self, labels):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0]
+        series[0] += 1
+
+    def expose(self, series_items):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        for labels, series in series_items:
+            yield f'{self.name}{{{format_labels(self.labelnames, labels)}}} {series[0]}'
+
+
+def format_labels(names, values):
+    return ','.join(
+        '%s="%s"' % (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in zip(names, values)
+    )
+
+
+class MetricsRegistry:
+    def __init__(self, metrics):
+        self.metrics = {metric.name: metric for metric in metrics}
+        self.lock = threading.Lock()
+        self.last_dump = 0
+
+    def observe_request(self, view, method, status, total, queries, db_time, render_time):
+        with self.lock:
+            self.metrics['http_requests_total'].inc((view, method, status))
+            self.metrics['http_request_duration_seconds'].observe((view, method), total)
+            self.metrics['http_request_db_queries'].observe((view,), queries)
+            self.metrics['http_request_db_duration_seconds'].observe((view,), db_time)
+            if render_time is not None:
+                self.metrics['http_request_render_duration_seconds'].observe((view,), render_time)
+        self.maybe_dump()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: {json.dumps(labels): list(series) for labels, series in metric.series.items()}
+                for name, metric in self.metrics.items()
+            }
+
+    @staticmethod
+    def merge(target, snapshot):
+        for name, series in snapshot.items():
+            merged = target.setdefault(name, {})
+            for labels, values in series.items():
+                current = merged.get(labels)
+                merged[labels] = values if current is None else [a + b for a, b in zip(current, values)]
+        return target
+
+    def dump_path(self, pid=None):
+        return os.path.join(settings.METRICS_DIR, f'metrics.{pid or os.getpid()}.json')
+
+    def maybe_dump(self, force=False):
+        directory = getattr(settings, 'METRICS_DIR', None)
+        now = time.monotonic()
+        if not directory or (not force and now - self.last_dump < settings.METRICS_DUMP_INTERVAL):
+            return
+        self.last_dump = now
+        os.makedirs(directory, exist_ok=True)
+        path = self.dump_path()
+        with open(path + '.tmp', 'w') as dump:
+            json.dump(self.snapshot(), dump)
+        os.replace(path + '.tmp', path)
+
+    def collect(self):
+        """Снимок всех воркеров: файлы из METRICS_DIR + свежие данные этого процесса"""
+        merged = {}
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if directory:
+            own = self.dump_path()
+            for path in glob.glob(os.path.join(directory, 'metrics.*.json')):
+                if path == own:
+                    continue
+                try:
+                    with open(path) as dump:
+                        self.merge(merged, json.load(dump))
+                except (OSError, ValueError):
+                    continue
+        return self.merge(merged, self.snapshot())
+
+    def expose(self):
+        lines = []
+        for name, series in self.collect().items():
+            items = sorted((tuple(json.loads(labels)), values) for labels, values in series.items())
+            lines.extend(self.metrics[name].expose(items))
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry([
+    Counter('http_requests_total', 'Запросы по имени URL, методу и статусу', ('view', 'method', 'status')),
+    Histogram('http_request_duration_seconds', 'Общее время запроса', ('view', 'method'), DURATION_BUCKETS),
+    Histogram('http_request_db_queries', 'SQL-запросов на запрос', ('view',), QUERY_BUCKETS),
+    Histogram('http_request_db_duration_seconds', 'Время SQL-запросов', ('view',), DURATION_BUCKETS),
+    Histogram('http_request_render_duration_seconds', 'Время рендеринга ответа', ('view',), DURATION_BUCKETS),
+])
+
+
+def pool_gauges():
+    # Статистика пула соединений этого процесса (config/database.py)
+    from config.database import pool_stats
+
+    stats = pool_stats()
+    if not stats:
+        return ''
+    lines = []
+    for key in ('size', 'max_size', 'available', 'in_use', 'waiting'):
+        lines.append(f'# TYPE db_pool_{key} gauge')
+        lines.append(f'db_pool_{key}{{pid="{os.getpid()}"}} {stats[key]}')
+    return '\n'.join(lines) + '\n'
+
+
+def cache_counters():
+    # Счётчики двухуровневого кэша этого процесса (config/cache.py)
+    from django.core.cache import caches
+
+    from config.cache import TieredCache
+
+    samples = {f'cache_{key}_total': [] for key in TieredCache.counter_names}
+    samples['cache_local_entries'] = []
+    for alias in settings.CACHES:
+        # Создание бэкенда не открывает соединений: экземпляр нужен запросам этого процесса
+        cache = caches[alias]
+        if not isinstance(cache, TieredCache):
+            continue
+        stats = cache.stats()
+        labels = f'cache="{alias}",pid="{os.getpid()}"'
+        for key in TieredCache.counter_names:
+            samples[f'cache_{key}_total'].append(f'cache_{key}_total{{{labels}}} {stats[key]}')
+        samples['cache_local_entries'].append(f'cache_local_entries{{{labels}}} {stats["local_entries"]}')
+
+    # Строка TYPE - одна на семейство метрик, все образцы семейства идут за ней
+    lines = []
+    for name, family in samples.items():
+        if family:
+            lines.append(f'# TYPE {name} {"gauge" if name == "cache_local_entries" else "counter"}')
+            lines.extend(family)
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def metrics_view(request):
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if not token or not hmac.compare_digest(
+        request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()
+    ):
+        return HttpResponseNotFound()
+    return HttpResponse(
+        registry.expose() + pool_gauges() + cache_counters(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
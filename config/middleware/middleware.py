@@ -1,17 +1,28 @@
 # Import necessary modules and functions
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
 from django.http import JsonResponse
 from rest_framework import status
 
+from config import metrics
+
 
 # Middleware for handling JSON error responses
 class JsonErrorResponseMiddleware:
+    # Поддерживает оба режима, чтобы под ASGI цепочка не переключалась в поток
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        # Get the response from the view function
-        response = self.get_response(request)
-        return response
+        # Get the response from the view function (в async режиме - корутина)
+        return self.get_response(request)
 
     def process_exception(self, request, exception):
         # Process exceptions and return JSON error response
@@ -22,13 +33,26 @@ class JsonErrorResponseMiddleware:
 
 # Middleware for handling custom 404 responses
 class Custom404Middleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
         # Get the response from the view function
         response = self.get_response(request)
-        
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
         # Check if path is admin or API (exclude from JSON 404 handling)
         is_admin = request.path.startswith('/admin/') or '/admin/' in request.path
         is_api = request.path.startswith('/api/')
@@ -46,3 +70,74 @@ class Custom404Middleware:
         data = {"detail": "Not Found"}
         return JsonResponse(data, status=status.HTTP_404_NOT_FOUND)
 
+
+
+# Middleware for request timing metrics (Server-Timing header and /metrics)
+class InstrumentationMiddleware:
+    """Замеряет время запроса, SQL и рендеринга по имени URL (см. config/metrics.py)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'SERVER_TIMING_HEADER', False)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Иначе Django вызывал бы синхронный хук через sync_to_async
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics.install_on_open_connections()
+        stats = [0, 0.0]
+        token = metrics.current_queries.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current_queries.reset(token)
+        return self.finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        stats = [0, 0.0]
+        token = metrics.current_queries.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_queries.reset(token)
+        return self.finish(request, response, stats, started)
+
+    def process_template_response(self, request, response):
+        # Вызывается перед response.render(); время рендеринга DRF/шаблона - до post-render callback
+        render_started = time.perf_counter()
+
+        def render_finished(rendered):
+            request.render_time = time.perf_counter() - render_started
+
+        response.add_post_render_callback(render_finished)
+        return response
+
+    async def aprocess_template_response(self, request, response):
+        return InstrumentationMiddleware.process_template_response(self, request, response)
+
+    def finish(self, request, response, stats, started):
+        total = time.perf_counter() - started
+        queries, db_time = stats
+        render_time = getattr(request, 'render_time', None)
+        match = request.resolver_match
+        view = match.view_name if match and match.view_name else 'unmatched'
+        metrics.registry.observe_request(view, request.method, response.status_code, total, queries, db_time, render_time)
+        if self.server_timing:
+            timings = [
+                'total;dur=%.2f' % (total * 1000),
+                'db;dur=%.2f;desc="%d queries"' % (db_time * 1000, queries),
+            ]
+            app_time = total - db_time
+            if render_time is not None:
+                timings.append('render;dur=%.2f' % (render_time * 1000))
+                app_time -= render_time
+            timings.append('app;dur=%.2f' % (max(app_time, 0) * 1000))
+            response.headers['Server-Timing'] = ', '.join(timings)
+        return response
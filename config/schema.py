@@ -0,0 +1,193 @@
+"""Отдача заранее собранной OpenAPI схемы вместо генерации на каждый запрос.
+
+``SpectacularAPIView`` на каждый запрос обходит все представления и
+сериализаторы (сотни миллисекунд CPU). Команда ``build_openapi_schema`` при
+деплое записывает схему в ``OPENAPI_SCHEMA_DIR``: для каждого языка
+``LANGUAGES`` (параметр ``?lang=``) и формата (YAML / JSON) - файл с версией
+(хэшем содержимого) в имени и заранее сжатый ``.gz`` рядом. Последним
+записывается ``openapi.manifest.json`` со ссылками на файлы текущей версии.
+
+``/schema/`` читает файлы один раз на процесс (и заново при смене манифеста),
+отдаёт их из памяти со strong ETag по содержимому варианта и, если клиент
+принимает gzip, - сжатый вариант без сжатия на запрос. Формат выбирается как у
+``SpectacularAPIView``: ``?format=json|yaml`` или по ``Accept``.
+
+Живая генерация - только при ``DEBUG``; без собранной схемы в остальных
+режимах ответ 503.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse
+from django.utils import translation
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from drf_spectacular.generators import SchemaGenerator
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.views import SpectacularAPIView
+
+SCHEMA_URLCONF = 'config.schema_urls'
+MANIFEST_NAME = 'openapi.manifest.json'
+RENDERERS = {'yaml': OpenApiYamlRenderer, 'json': OpenApiJsonRenderer}
+CONTENT_TYPES = {
+    'yaml': 'application/vnd.oai.openapi; charset=utf-8',
+    'json': 'application/vnd.oai.openapi+json; charset=utf-8',
+}
+
+live_schema_view = SpectacularAPIView.as_view(urlconf=SCHEMA_URLCONF)
+
+
+def schema_dir():
+    return getattr(settings, 'OPENAPI_SCHEMA_DIR', os.path.join(settings.BASE_DIR, 'var', 'openapi'))
+
+
+def render_schemas():
+    """{(язык, формат): bytes} для всех ``LANGUAGES``"""
+    rendered = {}
+    for language, _name in settings.LANGUAGES:
+        with translation.override(language):
+            # Новый генератор на язык: переводы подставляются при построении схемы
+            schema = SchemaGenerator(urlconf=SCHEMA_URLCONF).get_schema(request=None, public=True)
+            for schema_format, renderer in RENDERERS.items():
+                rendered[language, schema_format] = renderer().render(schema, renderer_context={})
+    return rendered
+
+
+def write_atomic(path, content):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as target:
+        target.write(content)
+    os.replace(temporary, path)
+
+
+def build(directory=None):
+    """Записать схему и манифест, удалить файлы прежних версий; вернуть манифест"""
+    directory = directory or schema_dir()
+    os.makedirs(directory, exist_ok=True)
+    rendered = render_schemas()
+
+    digest = hashlib.sha256()
+    for key in sorted(rendered):
+        digest.update(rendered[key])
+    version = digest.hexdigest()[:12]
+
+    files = {}
+    for (language, schema_format), content in rendered.items():
+        name = f'openapi.{language}.{version}.{schema_format}'
+        write_atomic(os.path.join(directory, name), content)
+        # mtime=0: одинаковая схема - одинаковые байты и ETag на всех серверах
+        write_atomic(os.path.join(directory, name + '.gz'), gzip.compress(content, compresslevel=9, mtime=0))
+        files.setdefault(language, {})[schema_format] = name
+
+    manifest = {'version': version, 'default_language': settings.LANGUAGE_CODE, 'files': files}
+    write_atomic(os.path.join(directory, MANIFEST_NAME), json.dumps(manifest, indent=2).encode())
+
+    current = {name for names in files.values() for name in names.values()}
+    for name in os.listdir(directory):
+        if name.startswith('openapi.') and name != MANIFEST_NAME and name.removesuffix('.gz') not in current:
+            os.remove(os.path.join(directory, name))
+    return manifest
+
+
+class SchemaVariant:
+    """Схема одного языка и формата в памяти: исходные и сжатые байты и их ETag"""
+
+    def __init__(self, content, compressed):
+        self.content = content
+        self.compressed = compressed
+        digest = hashlib.sha256(content).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        # Другое представление - другой strong ETag
+        self.compressed_etag = f'"{digest}-gzip"'
+
+
+class PrebuiltSchema:
+    """Схема из ``OPENAPI_SCHEMA_DIR``; перечитывается, только если изменился манифест"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self.manifest = None
+        self.variants = {}
+
+    def load(self):
+        directory = schema_dir()
+        manifest_path = os.path.join(directory, MANIFEST_NAME)
+        try:
+            key = (manifest_path, os.stat(manifest_path).st_mtime_ns)
+        except OSError:
+            return None
+        with self._lock:
+            if key != self._key:
+                with open(manifest_path, 'rb') as source:
+                    manifest = json.load(source)
+                variants = {}
+                for language, names in manifest['files'].items():
+                    for schema_format, name in names.items():
+                        path = os.path.join(directory, name)
+                        with open(path, 'rb') as content, open(path + '.gz', 'rb') as compressed:
+                            variants[language, schema_format] = SchemaVariant(content.read(), compressed.read())
+                self.manifest, self.variants, self._key = manifest, variants, key
+            return self
+
+    def variant(self, language, schema_format):
+        return self.variants.get((language, schema_format)) or self.variants[
+            self.manifest['default_language'], schema_format
+        ]
+
+
+prebuilt = PrebuiltSchema()
+
+
+def requested_format(request):
+    schema_format = request.GET.get('format')
+    if schema_format in RENDERERS:
+        return schema_format
+    accept = request.headers.get('Accept', '')
+    return 'json' if 'json' in accept and 'yaml' not in accept else 'yaml'
+
+
+def accepts_gzip(request):
+    for coding in request.headers.get('Accept-Encoding', '').split(','):
+        name, _, params = coding.strip().partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def schema_view(request):
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    if settings.DEBUG:
+        return live_schema_view(request)
+    schema = prebuilt.load()
+    if schema is None:
+        return JsonResponse(
+            {'detail': 'Схема не собрана: python manage.py build_openapi_schema'}, status=503,
+            json_dumps_params={'ensure_ascii': False},
+        )
+
+    schema_format = requested_format(request)
+    variant = schema.variant(request.GET.get('lang') or schema.manifest['default_language'], schema_format)
+    compressed = accepts_gzip(request)
+    etag = variant.compressed_etag if compressed else variant.etag
+    headers = {
+        'ETag': etag,
+        'Cache-Control': 'public, max-age=%d' % getattr(settings, 'OPENAPI_SCHEMA_MAX_AGE', 300),
+        'X-Schema-Version': schema.manifest['version'],
+    }
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(
+            variant.compressed if compressed else variant.content, content_type=CONTENT_TYPES[schema_format]
+        )
+        if compressed:
+            response['Content-Encoding'] = 'gzip'
+    for header, value in headers.items():
+        response.headers[header] = value
+    patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+    return response
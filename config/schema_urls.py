@@ -0,0 +1,11 @@
+"""URLconf для генерации OpenAPI схемы.
+
+drf-spectacular описывает только DRF-представления, поэтому схема всегда
+строится по синхронным маршрутам: async-версии (``ASYNC_READ_VIEWS``) имеют
+те же пути, параметры и ответы.
+"""
+from django.urls import path, include
+
+urlpatterns = [
+    path('api/', include("apps.website_config.urls")),
+]
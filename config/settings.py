@@ -1,6 +1,9 @@
 from pathlib import Path
 import os
 
+from config.cache import cache_settings
+from config.database import database_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -30,6 +33,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'apps.website_config',
 ]
 LOCAL_MIDDLEWARE = [
@@ -38,6 +42,8 @@ LOCAL_MIDDLEWARE = [
 ]
 
 MIDDLEWARE = [
+    # Первым, чтобы замер включал всю цепочку middleware
+    'config.middleware.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -51,6 +57,11 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'config.urls'
 
+# Нативные async-версии публичных GET эндпоинтов (apps/website_config/async_urls.py).
+# Включать только при запуске под ASGI (uvicorn/daphne): под WSGI каждый такой
+# запрос выполняется в отдельном event loop и работает медленнее синхронного.
+ASYNC_READ_VIEWS = os.environ.get("ASYNC_READ_VIEWS", "") == "1"
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -75,16 +86,14 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'pbb',
-        'USER': 'postgres',
-        "PASSWORD": "0576",
-        "HOST": "localhost",
-        "PORT": 5432,
-    }
+    # Параметры из переменных окружения DB_* (см. config/database.py)
+    'default': database_settings(),
 }
 
+# Кэш: LRU процесса перед общим для воркеров кэшем (CACHE_REDIS_URL или CACHE_DIR, см. config/cache.py);
+# без переменных CACHE_* - LocMemCache процесса
+CACHES = cache_settings()
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -126,6 +135,19 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "/var/www/media/")
 
+# Метрики запросов (config/metrics.py): Server-Timing и /metrics для Prometheus
+# Server-Timing раскрывает время SQL любому клиенту - только для отладки
+SERVER_TIMING_HEADER = os.environ.get("SERVER_TIMING_HEADER", "") == "1"
+# /metrics отвечает только с "Authorization: Bearer <METRICS_TOKEN>"; без токена - 404
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN") or None
+METRICS_DIR = os.environ.get("METRICS_DIR") or None  # общий каталог снимков воркеров
+METRICS_DUMP_INTERVAL = 5  # секунд
+
+# Отдача медиа (config/media.py): 'python', 'x-accel-redirect' (nginx) или 'x-sendfile'
+MEDIA_SERVE_MODE = os.environ.get("MEDIA_SERVE_MODE", "python")
+MEDIA_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+MEDIA_CACHE_MAX_AGE = 3600  # для файлов без хэша в имени
+
 LANGUAGES = [
     ('ru', 'Russian'),
     ('uz', 'Uzbek'),
@@ -144,8 +166,48 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Token bucket по IP и на эндпоинт (apps/website_config/throttling.py);
+    # действует только для представлений с throttle_scope
+    'DEFAULT_THROTTLE_CLASSES': [
+        'apps.website_config.throttling.TokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'callback_request': '5/min',
+        'callback_request_total': '600/min',
+        'client_review': '3/min',
+        'client_review_total': '300/min',
+        'video_views': '120/min',
+        'video_views_total': '20000/min',
+        'search': '60/min',
+        'search_total': '6000/min',
+    },
+    # 'local' - в памяти воркера, 'sqlite:<путь>' - общий для воркеров сервера
+    'TOKEN_BUCKET_STORE': os.environ.get("TOKEN_BUCKET_STORE", "local"),
+    # Число доверенных прокси перед Django (nginx); 0 - IP из REMOTE_ADDR, X-Forwarded-For не читается
+    'NUM_PROXIES': int(os.environ.get("NUM_PROXIES", "0")),
 }
 
+# Буферизованный счетчик просмотров видео (apps/website_config/counters.py)
+VIDEO_VIEWS_FLUSH_INTERVAL = 5  # секунд
+VIDEO_VIEWS_FLUSH_THRESHOLD = 1000
+VIDEO_VIEWS_PUBLISH_INTERVAL = 300  # секунд между обновлениями версии видео (ETag, главная)
+
+# Отложенная пакетная запись заявок и отзывов (apps/website_config/ingestion.py)
+WRITE_BEHIND_INGESTION = os.environ.get("WRITE_BEHIND_INGESTION", "") == "1"
+INGESTION_FLUSH_INTERVAL = 2  # секунд
+INGESTION_FLUSH_THRESHOLD = 200
+INGESTION_MAX_PENDING = 5000  # дальше 429
+INGESTION_SPILL_DIR = os.environ.get("INGESTION_SPILL_DIR", os.path.join(BASE_DIR, "var", "ingestion"))
+INGESTION_FSYNC = True
+
+# Собранная OpenAPI схема (config/schema.py, команда build_openapi_schema); при DEBUG - живая генерация
+OPENAPI_SCHEMA_DIR = os.environ.get("OPENAPI_SCHEMA_DIR", os.path.join(BASE_DIR, "var", "openapi"))
+OPENAPI_SCHEMA_MAX_AGE = 300  # секунд
+
+# Уменьшенные варианты изображений (apps/website_config/images.py)
+IMAGE_VARIANTS_WORKERS = 2
+IMAGE_VARIANTS_SYNC = False
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'PBB Backend API',
     'DESCRIPTION': 'API documentation for PBB Backend',
@@ -3,21 +3,24 @@ from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.conf.urls.i18n import i18n_patterns
-from django.views.static import serve
-from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularRedocView, SpectacularSwaggerView
+from config.media import serve_media
+from config.metrics import metrics_view
+from config.schema import schema_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     
-    path('schema/', SpectacularAPIView.as_view(), name='schema'),
+    path('schema/', schema_view, name='schema'),
     path('docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
 
-    path('api/', include("apps.website_config.urls")),
+    path('metrics', metrics_view, name='metrics'),
+
+    path('api/', include("apps.website_config.async_urls" if settings.ASYNC_READ_VIEWS else "apps.website_config.urls")),
     
 ]
 
 
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-urlpatterns += [re_path(r"^media/(?P<path>.*)$", serve, {"document_root": settings.MEDIA_ROOT, }, ), ]
+urlpatterns += [re_path(r"^%s(?P<path>.*)$" % settings.MEDIA_URL.lstrip("/"), serve_media, name="media"), ]